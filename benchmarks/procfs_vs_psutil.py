@@ -0,0 +1,42 @@
+"""
+对比/proc快速后端与psutil的单次采集耗时
+
+    $ python benchmarks/procfs_vs_psutil.py [次数]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psutil
+
+from mm.sensor.procfs import available, ProcStat, ProcMeminfo, ProcDiskstats, ProcNetDev
+
+
+def main():
+    if not available():
+        print("procfs backend is not available on this platform")
+        return
+
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    proc_stat, proc_meminfo, proc_diskstats, proc_net_dev = ProcStat(), ProcMeminfo(), ProcDiskstats(), ProcNetDev()
+
+    cases = [
+        ("cpu percent", psutil.cpu_percent, proc_stat.cpu_percent),
+        ("memory percent", lambda: psutil.virtual_memory().percent, proc_meminfo.memory_percent),
+        ("disk io total", psutil.disk_io_counters, proc_diskstats.total),
+        ("disk io perdisk", lambda: psutil.disk_io_counters(perdisk=True), proc_diskstats.counters),
+        ("net io total", psutil.net_io_counters, proc_net_dev.total),
+        ("net io pernic", lambda: psutil.net_io_counters(pernic=True), proc_net_dev.counters),
+    ]
+
+    print(f"{'case':<18}{'psutil(us)':>12}{'procfs(us)':>12}{'speedup':>10}")
+    for name, psutil_fn, procfs_fn in cases:
+        psutil_us = timeit.timeit(psutil_fn, number=number) / number * 1e6
+        procfs_us = timeit.timeit(procfs_fn, number=number) / number * 1e6
+        print(f"{name:<18}{psutil_us:>12.1f}{procfs_us:>12.1f}{psutil_us / procfs_us:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import logging
+import os
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from mm.config import AlertSettings
+from mm.data import DataStore
+from mm.utils import compile_location
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AlertEvent:
+    settings: AlertSettings
+    active: bool
+    value: float
+
+    @property
+    def name(self) -> str:
+        return self.settings.name
+
+
+class AlertRule:
+    """单条告警规则的状态机，每个sample的计算量为O(1)"""
+
+    def __init__(self, settings: AlertSettings):
+        assert settings.kind in ["value", "rate"]
+        assert settings.direction in ["above", "below"]
+        self.settings = settings
+        self.extract = compile_location(settings.location_in_sample)
+        self.sign = 1 if settings.direction == "above" else -1
+        self.threshold = settings.threshold
+        self.clear_threshold = settings.threshold if settings.clear_threshold is None else settings.clear_threshold
+        self.duration = settings.duration / 1000
+
+        self.active = False
+        self.pending_since: Optional[float] = None
+        self.last_value: Optional[float] = None
+        self.last_timestamp = 0.0
+
+    def _observe(self, sample: Any, timestamp: float) -> Optional[float]:
+        value = float(self.extract(sample))
+        if self.settings.kind == "value":
+            return value
+        last_value, last_timestamp = self.last_value, self.last_timestamp
+        self.last_value, self.last_timestamp = value, timestamp
+        if last_value is None or timestamp <= last_timestamp:
+            return None
+        return (value - last_value) / (timestamp - last_timestamp)
+
+    def feed(self, sample: Any, timestamp: float) -> Optional[AlertEvent]:
+        """:return: 状态发生变化时返回AlertEvent"""
+        value = self._observe(sample, timestamp)
+        if value is None:
+            return None
+
+        if not self.active:
+            if self.sign * (value - self.threshold) > 0:
+                if self.pending_since is None:
+                    self.pending_since = timestamp
+                if timestamp - self.pending_since >= self.duration:
+                    self.active = True
+                    return AlertEvent(settings=self.settings, active=True, value=value)
+            else:
+                self.pending_since = None
+        elif self.sign * (value - self.clear_threshold) <= 0:
+            self.active = False
+            self.pending_since = None
+            return AlertEvent(settings=self.settings, active=False, value=value)
+        return None
+
+
+AlertListener = Callable[[AlertEvent], None]
+
+
+class AlertEngine:
+    """
+    订阅DataStore，在写入sample的线程(CollectThread)中同步计算告警规则，不依赖GUI刷新
+    """
+
+    def __init__(self, settings_list: List[AlertSettings], data_store: DataStore):
+        self.data_store = data_store
+        self.rules: List[AlertRule] = []
+        self.listeners: List[AlertListener] = []
+        # 尚未结束的告警命令，每次计算规则时回收
+        self.processes: List[subprocess.Popen] = []
+
+        for settings in settings_list:
+            try:
+                self.rules.append(AlertRule(settings))
+            except Exception as e:
+                logger.error(f"alert '{settings.name}' build failed: {e}")
+
+    def attach(self):
+        for rule in self.rules:
+            self.data_store.subscribe(rule.settings.sensor, self._make_callback(rule))
+
+    def add_listener(self, listener: AlertListener):
+        self.listeners.append(listener)
+
+    def _make_callback(self, rule: AlertRule):
+        def callback(identifier: str, seq: int, sample: Any):
+            if self.processes:
+                self.reap()
+            event = rule.feed(sample, time.monotonic())
+            if event is not None:
+                self.dispatch(event)
+
+        return callback
+
+    def dispatch(self, event: AlertEvent):
+        logger.info(f"alert '{event.name}' {'fired' if event.active else 'cleared'}, value: {event.value}")
+        if event.settings.command:
+            self.run_command(event)
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"alert listener failed: {e}")
+
+    def reap(self):
+        """回收已结束的告警命令，避免产生僵尸进程"""
+        self.processes = [process for process in self.processes if process.poll() is None]
+
+    def run_command(self, event: AlertEvent):
+        env = dict(os.environ,
+                   MM_ALERT_NAME=event.name,
+                   MM_ALERT_STATE="fired" if event.active else "cleared",
+                   MM_ALERT_VALUE=str(event.value))
+        try:
+            # 不等待命令结束，避免阻塞采集
+            self.processes.append(subprocess.Popen(event.settings.command, shell=True, env=env,
+                                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                                   stderr=subprocess.DEVNULL))
+        except Exception as e:
+            logger.error(f"alert '{event.name}' command failed: {e}")
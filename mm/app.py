@@ -2,54 +2,249 @@ import asyncio
 import logging
 import os
 import sys
+import threading
 from asyncio import AbstractEventLoop
 from threading import Thread
-from typing import Optional
+from typing import Optional, List, Any, AsyncIterator, Dict, Tuple
 
 from PyQt5 import QtWidgets
 
+from mm.alert import AlertEngine
 from mm.config import SettingsStore, SensorSettings
 from mm.data import DataStore
+from mm.derived import build_derived_sensors
+from mm.executor import DaemonThreadExecutor
+from mm.sampling import AdaptiveInterval, BurstAggregator
 from mm.utils import dynamic_load
-from mm.gui import MainWindow
+from mm.gui import MainWindow, AsyncioDriver
 
 logger = logging.getLogger(__name__)
 
 
-class CollectThread(Thread):
+class Collector:
+    """
+    在asyncio事件循环中运行所有sensor的采集任务
+    事件循环可以运行在独立线程(CollectThread)，或由Qt事件循环驱动(QtCollector)
+    """
 
     def __init__(self, config_store: SettingsStore, data_store: DataStore):
-        super(CollectThread, self).__init__()
         self.config_store = config_store
         self.data_store = data_store
-        self.is_end: Optional[asyncio.Future] = None
+        self.loop: Optional[AbstractEventLoop] = None
+        self.executor: Optional[DaemonThreadExecutor] = None
+        self.derived_sensors = []
 
-    async def run_collect_job(self, sensor_config: SensorSettings, loop: AbstractEventLoop):
-        sensor_cls = dynamic_load(sensor_config.type)
+        # 采集延迟统计(s)：实际唤醒时间与计划唤醒时间之差
+        self.lag_max = 0.0
+        self.lag_total = 0.0
+        self.lag_count = 0
+
+    def create_loop(self) -> AbstractEventLoop:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        # 阻塞的sensor调用在线程池中执行
+        self.executor = DaemonThreadExecutor()
+        loop.set_default_executor(self.executor)
+        self.loop = loop
+        return loop
+
+    def create_tasks(self, loop: AbstractEventLoop) -> List[asyncio.Task]:
+        self.derived_sensors = build_derived_sensors(self.config_store.config.derived_sensors_settings,
+                                                     self.data_store)
+        return [loop.create_task(self.run_collect_job(identifier, sensor_cls, sensor_settings, loop))
+                for identifier, (sensor_cls, sensor_settings) in
+                self.plan_jobs(self.config_store.config.sensors_settings).items()]
+
+    def plan_jobs(self, settings_list: List[SensorSettings]) -> Dict[str, Tuple[type, SensorSettings]]:
+        """
+        按实例标识(type + kwargs)去重，标识相同的配置只采集一次，以第一个配置的interval与store为准
+        name与type注册为实例标识的别名；同一type的多个实例时，type指向第一个实例
+        :return: {实例标识: (sensor类, 配置)}
+        """
+        jobs: Dict[str, Tuple[type, SensorSettings]] = {}
+        aliases: List[Tuple[str, str]] = []
+        for settings in settings_list:
+            try:
+                sensor_cls = dynamic_load(settings.type)
+            except Exception as e:
+                logger.error(f"load sensor '{settings.type}' failed: {e}")
+                continue
+            identifier = sensor_cls.instance_key(settings.type, settings.kwargs)
+            if identifier in jobs:
+                first = jobs[identifier][1]
+                if (first.interval, first.store) != (settings.interval, settings.store):
+                    logger.warning(f"sensor '{settings.name}' is the same instance as '{first.name}', "
+                                   f"use the interval and store settings of '{first.name}'")
+            else:
+                jobs[identifier] = (sensor_cls, settings)
+            aliases.append((settings.name, identifier))
+        aliases.extend((settings.type, identifier) for identifier, (_, settings) in list(jobs.items()))
+
+        types = {settings.type for _, settings in jobs.values()}
+        resolved: Dict[str, str] = {}
+        for name, identifier in aliases:
+            if name in jobs:
+                continue
+            bound = resolved.setdefault(name, identifier)
+            if bound != identifier:
+                # 未设置name时name即为type，指向第一个实例是预期的行为
+                if name not in types:
+                    logger.warning(f"sensor name '{name}' is ambiguous, bound to '{bound}'")
+                continue
+            self.data_store.alias(name, identifier)
+        return jobs
+
+    async def run_collect_job(self, identifier: str, sensor_cls: type, sensor_config: SensorSettings,
+                              loop: AbstractEventLoop):
         sensor = sensor_cls(**sensor_config.kwargs)
-        logger.debug(f"register '{sensor_config.type}'")
-        self.data_store.register(identifier=sensor_config.type, cfg=sensor_config.store)
+        logger.debug(f"register '{identifier}'")
+        self.data_store.register(identifier=identifier, cfg=sensor_config.store)
+
+        adaptive = AdaptiveInterval(sensor_config.interval, sensor_config.adaptive) if sensor_config.adaptive else None
+        burst = BurstAggregator(sensor_config.interval, sensor_config.burst) if sensor_config.burst else None
 
+        events = sensor.watch()
+        watcher = loop.create_task(self.run_event_job(identifier, events)) if events is not None else None
+
+        interval = sensor_config.interval
+        try:
+            while True:
+                if burst:
+                    val = await self.collect_burst(sensor, burst, interval, loop)
+                else:
+                    val = await sensor.collect()
+                if val is not None or not burst:
+                    self.data_store.store(identifier, val)
+                interval = adaptive.next_interval(val) if adaptive else sensor_config.interval
+                if burst:
+                    # 子采样本身占满了整个间隔
+                    continue
+                wake_at = loop.time() + interval / 1000
+                await asyncio.sleep(interval / 1000)
+                self.record_lag(loop.time() - wake_at)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+                await asyncio.gather(watcher, return_exceptions=True)
+            try:
+                sensor.close()
+            except Exception as e:
+                logger.error(f"close sensor '{identifier}' failed: {e}")
+
+    async def run_event_job(self, identifier: str, events: AsyncIterator[Any]):
+        """事件驱动的sample不等待采样间隔，立即存储"""
+        async for val in events:
+            self.data_store.store(identifier, val)
+
+    async def collect_burst(self, sensor, burst: BurstAggregator, interval: int, loop: AbstractEventLoop):
+        """在interval(ms)内按burst.interval高频采样，返回聚合结果"""
+        burst.reset()
+        deadline = loop.time() + interval / 1000
         while True:
-            val = await sensor.collect()
-            self.data_store.store(sensor_config.type, val)
-            await asyncio.sleep(sensor_config.interval / 1000, loop=loop)
+            burst.add(await sensor.collect())
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return burst.result()
+            delay = min(burst.interval / 1000, remaining)
+            wake_at = loop.time() + delay
+            await asyncio.sleep(delay)
+            self.record_lag(loop.time() - wake_at)
+
+    def record_lag(self, lag: float):
+        self.lag_max = max(self.lag_max, lag)
+        self.lag_total += lag
+        self.lag_count += 1
+
+
+class CollectThread(Collector, Thread):
+
+    def __init__(self, config_store: SettingsStore, data_store: DataStore):
+        Collector.__init__(self, config_store, data_store)
+        # 守护线程：即使有sensor卡在系统调用中，也不阻塞进程退出
+        Thread.__init__(self, name="CollectThread", daemon=True)
+        self._stop_requested = threading.Event()
+        self._stop_event: Optional[asyncio.Event] = None
+
+    def _wake(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    def stop(self, timeout: float = 0.1) -> bool:
+        """
+        可在任意线程调用．通知事件循环退出，并最多等待timeout秒
+        :return: 线程是否已经结束
+        """
+        self._stop_requested.set()
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+        self.join(timeout)
+        if self.is_alive():
+            logger.warning(f"collect thread is still alive after {timeout}s")
+        return not self.is_alive()
+
+    async def _main(self, tasks: List[asyncio.Task]):
+        self._stop_event = asyncio.Event()
+        if self._stop_requested.is_set():
+            self._stop_event.set()
+        await self._stop_event.wait()
+
+        for task in tasks:
+            task.cancel()
+        # 等待中的run_in_executor会随task一起取消，不等待执行中的同步调用
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     def run(self) -> None:
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        self.is_end = asyncio.Future()
-        tasks = [loop.create_task(self.run_collect_job(sensor_settings, loop)) for sensor_settings in
-                 self.config_store.config.sensors_settings]
+        loop = self.create_loop()
+        tasks = self.create_tasks(loop)
 
-        async def waiting_quit():
-            await self.is_end
-            for task in tasks:
-                task.cancel()
+        try:
+            loop.run_until_complete(self._main(tasks))
+        finally:
+            self.executor.shutdown(wait=False)
+            loop.close()
 
-        task = loop.create_task(waiting_quit())
-        loop.run_until_complete(task)
+
+class QtCollector(Collector):
+    """
+    单循环模式：采集任务运行在GUI线程中由Qt事件循环驱动的asyncio事件循环上
+    sample写入DataStore与指示器读取在同一线程，没有跨线程交接．需在QApplication创建之后启动
+    """
+
+    def __init__(self, config_store: SettingsStore, data_store: DataStore):
+        super(QtCollector, self).__init__(config_store, data_store)
+        self.driver: Optional[AsyncioDriver] = None
+        self.tasks: List[asyncio.Task] = []
+
+    def start(self):
+        loop = self.create_loop()
+        self.driver = AsyncioDriver(loop)
+        self.tasks = self.create_tasks(loop)
+        self.driver.start()
+
+    def stop(self, timeout: float = 0.1) -> bool:
+        """在GUI线程中、Qt事件循环退出后调用．取消所有任务并最多等待timeout秒"""
+        if self.loop is None or self.loop.is_closed():
+            return True
+        self.driver.stop()
+        for task in self.tasks:
+            task.cancel()
+        done = True
+        try:
+            self.loop.run_until_complete(
+                asyncio.wait_for(asyncio.gather(*self.tasks, return_exceptions=True), timeout))
+        except asyncio.TimeoutError:
+            logger.warning(f"collect tasks are still running after {timeout}s")
+            done = False
+        finally:
+            self.executor.shutdown(wait=False)
+            self.loop.close()
+        return done
 
 
 class Application:
@@ -57,26 +252,41 @@ class Application:
     def __init__(self):
         self.config_store = self.build_config_store()
         self.data_store = self.build_data_store()
+        self.alert_engine = self.build_alert_engine()
 
     def build_config_store(self) -> SettingsStore:
         config = SettingsStore(os.environ.get("MM_HOME", "~/.mm"))
         return config
 
     def build_data_store(self) -> DataStore:
-        return DataStore()
+        return DataStore(shared_memory=self.config_store.config.shared_memory)
+
+    def build_alert_engine(self) -> AlertEngine:
+        alert_engine = AlertEngine(self.config_store.config.alerts_settings, self.data_store)
+        alert_engine.attach()
+        return alert_engine
+
+    def build_collector(self) -> Collector:
+        if self.config_store.config.collect_mode == "qt":
+            return QtCollector(config_store=self.config_store, data_store=self.data_store)
+        if self.config_store.config.collect_mode != "thread":
+            logger.warning(f"unknown collect_mode '{self.config_store.config.collect_mode}', use thread")
+        return CollectThread(config_store=self.config_store, data_store=self.data_store)
 
     def run(self):
-        collect_thread = CollectThread(config_store=self.config_store, data_store=self.data_store)
-        collect_thread.start()
+        collector = self.build_collector()
+        if isinstance(collector, CollectThread):
+            collector.start()
 
         app = QtWidgets.QApplication(sys.argv)
-        self.win = MainWindow(self.config_store, self.data_store)
+        if isinstance(collector, QtCollector):
+            collector.start()
+        self.win = MainWindow(self.config_store, self.data_store, self.alert_engine)
         ret = app.exec_()
 
         logger.info("GUI is existed.")
 
-        # TODO Thread退出有延迟，asyncio增加一个0.1s间隔的状态检测
-        collect_thread.is_end.set_result(True)
-        collect_thread.join()
-        logger.info("Collect Thread is existed.")
+        if collector.stop(timeout=0.1):
+            logger.info("Collector is existed.")
+        self.data_store.close()
         sys.exit(ret)
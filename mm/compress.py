@@ -0,0 +1,215 @@
+"""
+Gorilla风格的时序压缩：时间戳使用delta-of-delta编码，浮点数使用XOR编码，整数使用delta-of-delta编码
+"""
+import struct
+from numbers import Number
+from typing import List, Any, Optional, Tuple
+
+_pack_double = struct.Struct(">d").pack
+_unpack_double = struct.Struct(">d").unpack
+_pack_u64 = struct.Struct(">Q").pack
+_unpack_u64 = struct.Struct(">Q").unpack
+
+_MASK64 = (1 << 64) - 1
+# 限制整数范围，保证delta-of-delta的zigzag结果不超过64位
+_INT_LIMIT = 1 << 60
+
+# delta-of-delta分桶: (前缀, 前缀位数, 数值位数)
+_DOD_BUCKETS = [
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+    (0b11110, 5, 32),
+    (0b11111, 5, 64),
+]
+
+
+class BitWriter:
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.acc = 0
+        self.nacc = 0
+
+    def write(self, value: int, nbits: int):
+        self.acc = (self.acc << nbits) | value
+        self.nacc += nbits
+        if self.nacc >= 64:
+            rest = self.nacc & 7
+            self.buf += (self.acc >> rest).to_bytes((self.nacc - rest) >> 3, "big")
+            self.acc &= (1 << rest) - 1
+            self.nacc = rest
+
+    def getvalue(self) -> bytes:
+        if self.nacc:
+            pad = -self.nacc & 7
+            return bytes(self.buf + (self.acc << pad).to_bytes((self.nacc + pad) >> 3, "big"))
+        return bytes(self.buf)
+
+
+class BitReader:
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self.acc = 0
+        self.nacc = 0
+
+    def read(self, nbits: int) -> int:
+        while self.nacc < nbits:
+            chunk = self.data[self.pos:self.pos + 8]
+            self.pos += 8
+            self.acc = (self.acc << (len(chunk) * 8)) | int.from_bytes(chunk, "big")
+            self.nacc += len(chunk) * 8
+        self.nacc -= nbits
+        value = self.acc >> self.nacc
+        self.acc &= (1 << self.nacc) - 1
+        return value
+
+
+def _zigzag(v: int) -> int:
+    return (v << 1) ^ (v >> 63)
+
+
+def _unzigzag(v: int) -> int:
+    return (v >> 1) ^ -(v & 1)
+
+
+def _write_ints(writer: BitWriter, values: List[int]):
+    writer.write(_zigzag(values[0]) & _MASK64, 64)
+    prev, prev_delta = values[0], 0
+    for v in values[1:]:
+        delta = v - prev
+        dod = _zigzag(delta - prev_delta) & _MASK64
+        if dod == 0:
+            writer.write(0, 1)
+        else:
+            for prefix, prefix_bits, value_bits in _DOD_BUCKETS:
+                if dod < (1 << value_bits):
+                    writer.write(prefix, prefix_bits)
+                    writer.write(dod, value_bits)
+                    break
+        prev, prev_delta = v, delta
+
+
+def _read_ints(reader: BitReader, count: int) -> List[int]:
+    prev = _unzigzag(reader.read(64))
+    values = [prev]
+    prev_delta = 0
+    for _ in range(count - 1):
+        if reader.read(1) == 0:
+            dod = 0
+        else:
+            # 前缀中1的个数决定数值位数
+            ones = 1
+            while ones < len(_DOD_BUCKETS) and reader.read(1):
+                ones += 1
+            dod = _unzigzag(reader.read(_DOD_BUCKETS[ones - 1][2]))
+        prev_delta += dod
+        prev += prev_delta
+        values.append(prev)
+    return values
+
+
+def _write_floats(writer: BitWriter, values: List[float]):
+    prev = _unpack_u64(_pack_double(values[0]))[0]
+    writer.write(prev, 64)
+    prev_leading, prev_trailing = 65, 0
+    for v in values[1:]:
+        bits = _unpack_u64(_pack_double(v))[0]
+        xor = bits ^ prev
+        prev = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if leading >= prev_leading and trailing >= prev_trailing:
+            # 复用上一个有效位窗口
+            writer.write(0b10, 2)
+            writer.write(xor >> prev_trailing, 64 - prev_leading - prev_trailing)
+        else:
+            meaningful = 64 - leading - trailing
+            writer.write(0b11, 2)
+            writer.write(leading, 5)
+            writer.write(meaningful - 1, 6)
+            writer.write(xor >> trailing, meaningful)
+            prev_leading, prev_trailing = leading, trailing
+
+
+def _read_floats(reader: BitReader, count: int) -> List[float]:
+    prev = reader.read(64)
+    values = [_unpack_double(_pack_u64(prev))[0]]
+    leading, trailing = 0, 0
+    for _ in range(count - 1):
+        if reader.read(1):
+            if reader.read(1):
+                leading = reader.read(5)
+                trailing = 64 - leading - reader.read(6) - 1
+            prev ^= reader.read(64 - leading - trailing) << trailing
+        values.append(_unpack_double(_pack_u64(prev))[0])
+    return values
+
+
+def _is_int(v: Any) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool) and -_INT_LIMIT < v < _INT_LIMIT
+
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, Number) and not isinstance(v, bool)
+
+
+def infer_width(sample: Any) -> Optional[int]:
+    """
+    可压缩的sample: 数值(宽度0表示标量)或由数值构成的tuple
+    :return: 宽度，不可压缩时返回None
+    """
+    if _is_number(sample):
+        return 0
+    if isinstance(sample, tuple) and sample and all(_is_number(v) for v in sample):
+        return len(sample)
+    return None
+
+
+class SealedBlock:
+    """已封存的只读数据块．无法压缩的数据原样保存"""
+    __slots__ = ["count", "width", "kinds", "payload", "raw", "first_timestamp", "last_timestamp"]
+
+    def __init__(self, timestamps: List[float], samples: List[Any]):
+        self.count = len(samples)
+        self.first_timestamp = timestamps[0]
+        self.last_timestamp = timestamps[-1]
+        self.width: Optional[int] = infer_width(samples[0])
+        self.kinds = ""
+        self.payload = b""
+        self.raw: Optional[Tuple[Tuple[float, ...], Tuple[Any, ...]]] = None
+
+        if self.width is not None and all(infer_width(s) == self.width for s in samples):
+            columns = [samples] if self.width == 0 else [list(c) for c in zip(*samples)]
+            kinds = "".join("i" if all(_is_int(v) for v in column) else "f" for column in columns)
+            writer = BitWriter()
+            _write_ints(writer, [round(t * 1000) for t in timestamps])
+            for kind, column in zip(kinds, columns):
+                if kind == "i":
+                    _write_ints(writer, column)
+                else:
+                    _write_floats(writer, [float(v) for v in column])
+            self.kinds = kinds
+            self.payload = writer.getvalue()
+        else:
+            self.raw = tuple(timestamps), tuple(samples)
+
+    def decode(self) -> Tuple[List[float], List[Any]]:
+        """:return: (时间戳列表, sample列表)"""
+        if self.raw is not None:
+            return list(self.raw[0]), list(self.raw[1])
+        reader = BitReader(self.payload)
+        timestamps = [t / 1000 for t in _read_ints(reader, self.count)]
+        columns = [_read_ints(reader, self.count) if kind == "i" else _read_floats(reader, self.count)
+                   for kind in self.kinds]
+        samples = columns[0] if self.width == 0 else list(zip(*columns))
+        return timestamps, samples
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.payload)
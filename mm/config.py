@@ -1,13 +1,14 @@
+import inspect
 import logging
 import os
 import sys
 from dataclasses import dataclass, field, asdict
 from itertools import chain
 from pathlib import Path
-from typing import Dict, Any, List, Iterator
+from typing import Dict, Any, List, Iterator, Optional
 
 import dacite
-from mm.sensor import Sensor, SensorStoreSettings
+from mm.sensor import Sensor, SensorStoreSettings, SensorAdaptiveSettings, SensorBurstSettings
 
 from mm.indicator import Indicator, IndicatorData
 
@@ -23,6 +24,10 @@ class IndicatorSettings:
     name: str = ""
     kwargs: Dict[str, Any] = field(default_factory=dict)
     interval: int = 2000
+    # 单帧超出预算时，优先级低的指示器推迟到下一帧
+    priority: int = 0
+    # 所属页面，同一时间只显示一个页面．页面按首次出现的顺序排列
+    page: str = ""
 
     def __post_init__(self):
         if not self.name:
@@ -36,19 +41,87 @@ class SensorSettings:
     interval: int = 2000
     name: str = ""
     kwargs: Dict[str, Any] = field(default_factory=dict)
+    # 自适应采样，None表示固定间隔
+    adaptive: Optional[SensorAdaptiveSettings] = None
+    # 高频子采样，每个间隔存储一个聚合后的sample，None表示每个间隔只采样一次
+    burst: Optional[SensorBurstSettings] = None
 
     def __post_init__(self):
         if not self.name:
             self.name = self.type
 
 
+@dataclass
+class DerivedInputSettings:
+    sensor: str
+    # 取值路径，如"[1]"．None表示使用sample本身
+    location_in_sample: Optional[str] = None
+
+
+@dataclass
+class DerivedSensorSettings:
+    """
+    由其他sensor的数据计算得到的派生sensor，不产生额外的系统调用
+    op: rate / ewma / sum / ratio
+    """
+    name: str
+    op: str
+    inputs: List[DerivedInputSettings]
+    store: SensorStoreSettings
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class AlertSettings:
+    """
+    :param kind: value 直接比较数值; rate 比较每秒变化率
+    :param direction: above 高于阈值触发; below 低于阈值触发
+    :param clear_threshold: 恢复阈值(滞回)，None表示与threshold相同
+    :param duration: 持续越过阈值多久(ms)后才触发
+    :param indicator: 触发时变色的指示器名称
+    :param command: 状态变化时执行的shell命令，可通过环境变量MM_ALERT_NAME/MM_ALERT_STATE/MM_ALERT_VALUE获取信息
+    """
+    name: str
+    sensor: str
+    threshold: float
+    location_in_sample: Optional[str] = None
+    kind: str = "value"
+    direction: str = "above"
+    clear_threshold: Optional[float] = None
+    duration: int = 0
+    notify: bool = True
+    indicator: str = ""
+    color: str = "#FF0000"
+    command: str = ""
+
+
+@dataclass
+class SharedMemorySettings:
+    """
+    将最新数据同步到命名共享内存，其他进程可通过 mm.shm.SharedMemoryReader 读取
+    :param max_samples: 每个sensor在共享内存中保留的最大sample数
+    """
+    name: str = "mm"
+    size: int = 4 * 1024 * 1024
+    max_sensors: int = 64
+    max_samples: int = 1024
+
+
 @dataclass
 class Config:
     ui_file: str = ""
     pos_x: int = 400
     pos_y: int = 400
+    # 渲染时钟的最小帧间隔(ms)与单帧耗时预算(ms)
+    frame_interval: int = 50
+    frame_budget: int = 8
     indicators_settings: List[IndicatorSettings] = field(default_factory=list)
     sensors_settings: List[SensorSettings] = field(default_factory=list)
+    derived_sensors_settings: List[DerivedSensorSettings] = field(default_factory=list)
+    alerts_settings: List[AlertSettings] = field(default_factory=list)
+    shared_memory: Optional[SharedMemorySettings] = None
+    # 采集方式 thread: 独立线程中的asyncio事件循环; qt: 由GUI线程的Qt事件循环驱动
+    collect_mode: str = "thread"
 
 
 class SettingsStore:
@@ -129,7 +202,8 @@ class SettingsStore:
                     continue
                 val = getattr(mod, attr)
                 try:
-                    if val != Sensor and issubclass(val, Sensor):
+                    # 抽象的基类(如CgroupSensor)不能实例化
+                    if val != Sensor and issubclass(val, Sensor) and not inspect.isabstract(val):
                         yield val
                 except:
                     pass
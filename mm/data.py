@@ -1,41 +1,477 @@
+import bisect
 import logging
-from dataclasses import dataclass
-from typing import Any, List, Dict
+import math
+import threading
+import time
+from array import array
+from collections import deque, OrderedDict
+from typing import Any, List, Dict, Optional, Tuple, Callable, Union, Iterator
 
-from mm.config import SensorStoreSettings
+from mm.compress import SealedBlock
+from mm.config import SensorStoreSettings, SharedMemorySettings
+from mm.sampling import compile_aggregate
+from mm.sketch import RollingSketch
+from mm.utils import compile_location
 
 
-@dataclass
 class StoreUnit:
-    data: List[Any]
-    config: SensorStoreSettings
+    """
+    定长环形缓冲区．每个sample带有递增的序号(从1开始)，写入与读取均在锁内完成，读取返回副本
+    采集时间(time.monotonic)保存在并行的环形array中，按时间查询时二分查找
+    """
 
-    def store(self, sample: Any):
-        if len(self.data) >= self.config.length:
-            self.data = self.data[len(self.data) - self.config.length + 1:]
-        self.data.append(sample)
+    def __init__(self, config: SensorStoreSettings):
+        self.config = config
+        self.capacity = max(config.length, 1)
+        self.lock = threading.Lock()
+
+        self._buffer: List[Any] = [None] * self.capacity
+        self._timestamps = array("d", [0.0]) * self.capacity
+        self._start = 0
+        self._count = 0
+        # 最新sample的序号，0表示尚无数据
+        self.seq = 0
+
+    def store(self, sample: Any, timestamp: Optional[float] = None) -> int:
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self.lock:
+            if self._count < self.capacity:
+                index = (self._start + self._count) % self.capacity
+                self._count += 1
+            else:
+                index = self._start
+                self._start = (self._start + 1) % self.capacity
+            self._buffer[index] = sample
+            self._timestamps[index] = timestamp
+            self.seq += 1
+            return self.seq
+
+    def _slice(self, buffer, begin: int, end: int):
+        """按逻辑下标[begin, end)读取(0为最旧的sample)，调用方需持有锁"""
+        if begin >= end:
+            return buffer[:0]
+        first = (self._start + begin) % self.capacity
+        last = first + end - begin
+        if last <= self.capacity:
+            return buffer[first:last]
+        return buffer[first:] + buffer[:last - self.capacity]
+
+    def _tail(self, n: int) -> List[Any]:
+        """返回最新的n个sample，调用方需持有锁"""
+        n = max(min(n, self._count), 0)
+        return self._slice(self._buffer, self._count - n, self._count)
+
+    def _bisect(self, t: float, right: bool) -> int:
+        """时间戳大于(right)或不小于t的第一个逻辑下标，调用方需持有锁"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            ts = self._timestamps[(self._start + mid) % self.capacity]
+            if ts < t or (right and ts == t):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def snapshot(self, limit: Optional[int] = None) -> Tuple[int, List[Any]]:
+        """:return: (最新序号, 最新的limit个sample)"""
+        with self.lock:
+            return self.seq, self._tail(self._count if limit is None else limit)
+
+    def since(self, seq: int) -> Tuple[int, List[Any]]:
+        """:return: (最新序号, 序号大于seq的sample)．seq过旧时返回缓冲区内全部sample"""
+        with self.lock:
+            return self.seq, self._tail(self.seq - seq)
+
+    def range(self, begin: float, end: Optional[float] = None) -> List[Tuple[float, Any]]:
+        """:return: 采集时间在[begin, end]内的[(timestamp, sample), ...]"""
+        with self.lock:
+            first = self._bisect(begin, right=False)
+            last = self._count if end is None else self._bisect(end, right=True)
+            return list(zip(self._slice(self._timestamps, first, last), self._slice(self._buffer, first, last)))
+
+    def at(self, t: float) -> Optional[Tuple[float, Any]]:
+        """:return: 采集时间不晚于t的最新(timestamp, sample)，不存在时返回None"""
+        with self.lock:
+            index = self._bisect(t, right=True) - 1
+            if index < 0:
+                return None
+            index = (self._start + index) % self.capacity
+            return self._timestamps[index], self._buffer[index]
+
+    @property
+    def data(self) -> List[Any]:
+        return self.snapshot()[1]
+
+
+class CompressedStoreUnit:
+    """
+    压缩存储，用于长时间保留历史数据．最新的数据块保持未压缩，写满block_size后压缩封存
+    淘汰以数据块为单位，读取时只解码请求范围涉及的数据块
+    """
+
+    # 最近解码的数据块缓存数量
+    DECODE_CACHE_SIZE = 4
+
+    def __init__(self, config: SensorStoreSettings):
+        self.config = config
+        self.capacity = max(config.length, 1)
+        self.block_size = max(config.block_size, 2)
+        self.lock = threading.Lock()
+
+        self.blocks: deque = deque()
+        self._sealed_count = 0
+        self._hot_timestamps: List[float] = []
+        self._hot_samples: List[Any] = []
+        self._decoded: OrderedDict = OrderedDict()
+        self.seq = 0
+
+    def store(self, sample: Any, timestamp: Optional[float] = None) -> int:
+        with self.lock:
+            self._hot_timestamps.append(time.monotonic() if timestamp is None else timestamp)
+            self._hot_samples.append(sample)
+            if len(self._hot_samples) >= self.block_size:
+                self._seal()
+            self.seq += 1
+            return self.seq
+
+    def _seal(self):
+        block = SealedBlock(self._hot_timestamps, self._hot_samples)
+        self.blocks.append(block)
+        self._sealed_count += block.count
+        self._hot_timestamps = []
+        self._hot_samples = []
+        # 丢弃完全超出保留长度的数据块
+        while self.blocks and self._sealed_count - self.blocks[0].count >= self.capacity:
+            expired = self.blocks.popleft()
+            self._sealed_count -= expired.count
+            self._decoded.pop(id(expired), None)
+
+    def _decode(self, block: SealedBlock) -> Tuple[List[float], List[Any]]:
+        key = id(block)
+        if key in self._decoded:
+            self._decoded.move_to_end(key)
+            return self._decoded[key]
+        decoded = self._decoded[key] = block.decode()
+        if len(self._decoded) > self.DECODE_CACHE_SIZE:
+            self._decoded.popitem(last=False)
+        return decoded
+
+    def _segments(self) -> Iterator[Tuple[int, float, float, Callable[[], Tuple[List[float], List[Any]]]]]:
+        """由新到旧遍历未压缩部分与各数据块: (数量, 首个时间戳, 最后时间戳, 读取函数)，调用方需持有锁"""
+        if self._hot_samples:
+            yield (len(self._hot_samples), self._hot_timestamps[0], self._hot_timestamps[-1],
+                   lambda: (self._hot_timestamps, self._hot_samples))
+        for block in reversed(self.blocks):
+            yield block.count, block.first_timestamp, block.last_timestamp, lambda b=block: self._decode(b)
+
+    def _tail(self, n: int) -> List[Any]:
+        """返回最新的n个sample，调用方需持有锁"""
+        n = max(min(n, self.capacity, self._sealed_count + len(self._hot_samples)), 0)
+        if n <= len(self._hot_samples):
+            return self._hot_samples[len(self._hot_samples) - n:]
+        parts = [self._hot_samples]
+        rest = n - len(self._hot_samples)
+        for block in reversed(self.blocks):
+            samples = self._decode(block)[1]
+            parts.append(samples[max(block.count - rest, 0):])
+            rest -= block.count
+            if rest <= 0:
+                break
+        return [sample for part in reversed(parts) for sample in part]
+
+    def snapshot(self, limit: Optional[int] = None) -> Tuple[int, List[Any]]:
+        with self.lock:
+            return self.seq, self._tail(self.capacity if limit is None else limit)
+
+    def since(self, seq: int) -> Tuple[int, List[Any]]:
+        with self.lock:
+            return self.seq, self._tail(self.seq - seq)
+
+    def range(self, begin: float, end: Optional[float] = None) -> List[Tuple[float, Any]]:
+        """时间范围之外的数据块不解码"""
+        with self.lock:
+            parts = []
+            remaining = self.capacity
+            for count, first_ts, last_ts, load in self._segments():
+                if remaining <= 0 or last_ts < begin:
+                    break
+                # 超出保留长度的旧数据
+                skip = max(count - remaining, 0)
+                remaining -= count
+                if end is not None and first_ts > end:
+                    continue
+                timestamps, samples = load()
+                lo = bisect.bisect_left(timestamps, begin, skip)
+                hi = len(timestamps) if end is None else bisect.bisect_right(timestamps, end)
+                parts.append(list(zip(timestamps[lo:hi], samples[lo:hi])))
+            return [item for part in reversed(parts) for item in part]
+
+    def at(self, t: float) -> Optional[Tuple[float, Any]]:
+        with self.lock:
+            remaining = self.capacity
+            for count, first_ts, last_ts, load in self._segments():
+                if remaining <= 0:
+                    break
+                skip = max(count - remaining, 0)
+                remaining -= count
+                if first_ts > t:
+                    continue
+                timestamps, samples = load()
+                index = bisect.bisect_right(timestamps, t) - 1
+                if index < skip:
+                    return None
+                return timestamps[index], samples[index]
+            return None
+
+    @property
+    def data(self) -> List[Any]:
+        return self.snapshot()[1]
+
+    @property
+    def nbytes(self) -> int:
+        """已压缩数据的字节数"""
+        return sum(block.nbytes for block in self.blocks)
 
 
 logger = logging.getLogger(__name__)
 
+# (identifier, seq, sample)
+Subscriber = Callable[[str, int, Any], None]
+
 
 class DataStore:
+    # query结果缓存与预编译转换函数的数量上限
+    QUERY_CACHE_SIZE = 256
+    # 压缩存储未指定window与span时最多读取的sample数，避免每次刷新都解码整个历史
+    COMPRESSED_READ_WINDOW = 4096
 
-    def __init__(self):
-        self.data: Dict[str, StoreUnit] = {}
+    def __init__(self, shared_memory: Optional[SharedMemorySettings] = None):
+        self.data: Dict[str, Union[StoreUnit, CompressedStoreUnit]] = {}
+        self.subscribers: Dict[str, List[Subscriber]] = {}
+        # 别名 -> identifier，如sensor的name与type指向按kwargs区分的实例
+        self.aliases: Dict[str, str] = {}
+        # identifier -> [identifier, 别名...]，写入时同时通知别名的订阅者
+        self.alias_names: Dict[str, List[str]] = {}
+        # identifier -> (RollingSketch, 取值函数)
+        self.sketches: Dict[str, Tuple[RollingSketch, Callable[[Any], Any]]] = {}
+        # query的结果缓存(LRU): (identifier, window, span, field, aggregate) -> (数据版本, 失效时间, 结果)
+        self.query_cache: "OrderedDict[tuple, Tuple[int, float, List[Any]]]" = OrderedDict()
+        # (field, aggregate) -> 预编译的转换函数
+        self.selectors: Dict[Tuple[Optional[str], Optional[str]], Callable[[List[Any]], List[Any]]] = {}
+        self.lock = threading.Lock()
+
+        self.shm_writer = None
+        if shared_memory is not None:
+            from mm.shm import SharedMemoryWriter
+            try:
+                self.shm_writer = SharedMemoryWriter(name=shared_memory.name,
+                                                     size=shared_memory.size,
+                                                     max_sensors=shared_memory.max_sensors,
+                                                     max_samples=shared_memory.max_samples)
+            except FileExistsError as e:
+                logger.error(f"shared memory is disabled: {e}")
 
     def register(self, identifier: str, cfg: SensorStoreSettings):
-        self.data[identifier] = StoreUnit(data=[], config=cfg)
+        with self.lock:
+            unit_cls = CompressedStoreUnit if cfg.compression else StoreUnit
+            self.data[identifier] = unit_cls(config=cfg)
+            if cfg.quantiles is not None:
+                self.sketches[identifier] = (RollingSketch(window=cfg.quantiles.window,
+                                                           buckets=cfg.quantiles.buckets,
+                                                           relative_accuracy=cfg.quantiles.relative_accuracy),
+                                             compile_location(cfg.quantiles.location_in_sample))
+            if self.shm_writer is not None:
+                self.shm_writer.register(identifier, cfg.length)
+
+    def alias(self, name: str, identifier: str):
+        """name作为identifier的别名，读取与订阅时等同于identifier．已注册的identifier不能作为别名"""
+        with self.lock:
+            if name == identifier or name in self.data:
+                return
+            previous = self.aliases.get(name)
+            if previous is not None:
+                self.alias_names[previous].remove(name)
+            self.aliases[name] = identifier
+            self.alias_names.setdefault(identifier, [identifier]).append(name)
+
+    def resolve(self, identifier: str) -> str:
+        return self.aliases.get(identifier, identifier)
 
-    def store(self, identifier: str, val: Any):
-        if identifier not in self.data:
+    def subscribe(self, identifier: str, callback: Subscriber):
+        """
+        订阅identifier的新sample．回调在写入线程中、写入完成后同步调用，应保持轻量
+        可以在identifier注册之前订阅
+        """
+        with self.lock:
+            self.subscribers[identifier] = self.subscribers.get(identifier, []) + [callback]
+
+    def _get_unit(self, identifier: str) -> Optional[Union[StoreUnit, CompressedStoreUnit]]:
+        unit = self.data.get(self.aliases.get(identifier, identifier))
+        if unit is None:
+            logger.error(f"sensor:{identifier} is not existed.")
+        return unit
+
+    def store(self, identifier: str, val: Any, timestamp: Optional[float] = None) -> int:
+        """:param timestamp: 采集时间(time.monotonic)，默认为当前时间"""
+        identifier = self.aliases.get(identifier, identifier)
+        unit = self.data.get(identifier)
+        if unit is None:
             logger.error(f"sensor:{identifier} is not registered.")
+            return 0
+        if timestamp is None:
+            timestamp = time.monotonic()
+        seq = unit.store(val, timestamp)
+        sketch = self.sketches.get(identifier)
+        if sketch is not None:
+            self._add_to_sketch(identifier, sketch, val, timestamp)
+        if self.shm_writer is not None:
+            self.shm_writer.write(identifier, val)
+        for name in self.alias_names.get(identifier) or (identifier,):
+            # 回调收到的是订阅时使用的名称
+            for callback in self.subscribers.get(name, ()):
+                try:
+                    callback(name, seq, val)
+                except Exception as e:
+                    logger.error(f"subscriber of {name} failed: {e}")
+        return seq
+
+    @staticmethod
+    def _add_to_sketch(identifier: str, sketch: Tuple[RollingSketch, Callable[[Any], Any]], val: Any,
+                       timestamp: float):
+        try:
+            value = sketch[1](val)
+        except Exception as e:
+            logger.debug(f"sample of {identifier} is not added to quantile sketch: {e}")
             return
-        self.data[identifier].store(val)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+            sketch[0].add(value, timestamp)
 
     def get_sequence(self, identifier: str) -> List[Any]:
-        if identifier not in self.data:
-            logger.error(f"sensor:{identifier} is not existed.")
+        """返回当前数据的快照(副本)"""
+        unit = self._get_unit(identifier)
+        return unit.snapshot()[1] if unit else []
+
+    def get_snapshot(self, identifier: str, limit: Optional[int] = None) -> Tuple[int, List[Any]]:
+        """:return: (最新序号, 最新的limit个sample)"""
+        unit = self._get_unit(identifier)
+        return unit.snapshot(limit) if unit else (0, [])
+
+    def get_since(self, identifier: str, seq: int) -> Tuple[int, List[Any]]:
+        """
+        增量读取
+        :param seq: 上一次读取到的序号，首次读取传0
+        :return: (最新序号, 序号大于seq的sample)
+        """
+        unit = self._get_unit(identifier)
+        return unit.since(seq) if unit else (0, [])
+
+    def get_range(self, identifier: str, since_seconds: float, until: Optional[float] = None) -> List[Tuple[float, Any]]:
+        """
+        按时间读取
+        :param since_seconds: 最近since_seconds秒内采集的数据
+        :param until: 截止时间(time.monotonic)，None表示不限
+        :return: [(timestamp, sample), ...]，按时间先后排列
+        """
+        unit = self._get_unit(identifier)
+        return unit.range(time.monotonic() - since_seconds, until) if unit else []
+
+    def get_at(self, identifier: str, t: float) -> Optional[Tuple[float, Any]]:
+        """
+        :param t: 时间点(time.monotonic)
+        :return: 不晚于t的最新(timestamp, sample)，可用于对齐不同采样间隔的sensor
+        """
+        unit = self._get_unit(identifier)
+        return unit.at(t) if unit else None
+
+    def get_quantiles(self, identifier: str, qs: List[float], span: Optional[float] = None) -> List[Optional[float]]:
+        """
+        :param qs: 分位数(0~1)
+        :param span: 最近span秒，None表示SensorQuantileSettings.window
+        :return: 与qs对应的值，未配置分位数统计或没有数据时为None
+        """
+        sketch = self.sketches.get(self.aliases.get(identifier, identifier))
+        if sketch is None:
+            return [None] * len(qs)
+        return sketch[0].quantiles(qs, time.monotonic(), span)
+
+    def get_quantile(self, identifier: str, q: float, span: Optional[float] = None) -> Optional[float]:
+        return self.get_quantiles(identifier, [q], span)[0]
+
+    def _compile_selector(self, field: Optional[str], aggregate: Optional[str]) -> Callable[[List[Any]], List[Any]]:
+        selector = self.selectors.get((field, aggregate))
+        if selector is None:
+            extract = compile_location(field) if field else None
+            reduce = compile_aggregate(aggregate) if aggregate else None
+
+            def selector(samples: List[Any]) -> List[Any]:
+                if extract is not None:
+                    samples = [extract(sample) for sample in samples]
+                return reduce(samples) if reduce is not None else samples
+
+            self.selectors[(field, aggregate)] = selector
+            if len(self.selectors) > self.QUERY_CACHE_SIZE:
+                del self.selectors[next(iter(self.selectors))]
+        return selector
+
+    def query(self,
+              identifier: str,
+              window: Optional[int] = None,
+              span: Optional[float] = None,
+              field: Optional[str] = None,
+              aggregate: Optional[str] = None) -> List[Any]:
+        """
+        按选择器读取：最新window个、最近span秒内的sample，取field后按aggregate聚合
+        结果按(identifier, 选择器, 数据版本)缓存，相同的请求在每个新sample之后只计算一次
+        :param field: 取值路径，如"[0]"，None表示使用sample本身
+        :param aggregate: 见compile_aggregate，None表示不聚合
+        :return: 结果被多个调用方共享，不能修改
+        压缩存储在window与span均为None时只读取最新的COMPRESSED_READ_WINDOW个，需要更长的历史时显式设置window
+        """
+        identifier = self.aliases.get(identifier, identifier)
+        unit = self._get_unit(identifier)
+        if unit is None:
             return []
+        key = (identifier, window, span, field, aggregate)
+        # 先取版本号：计算期间写入的sample只会使缓存提前失效
+        version = unit.seq
+        now = time.monotonic()
+        with self.lock:
+            cached = self.query_cache.get(key)
+            if cached is not None and cached[0] == version and now < cached[1]:
+                self.query_cache.move_to_end(key)
+                return cached[2]
+
+        if span is None:
+            if window is None and isinstance(unit, CompressedStoreUnit):
+                window = self.COMPRESSED_READ_WINDOW
+            _, samples = unit.snapshot(window)
+            expires_at = math.inf
         else:
-            return self.data[identifier].data
+            records = unit.range(now - span, None)
+            if window is not None:
+                # window为0时为空，与不设置span时一致
+                records = records[max(len(records) - window, 0):]
+            samples = [sample for _, sample in records]
+            # 没有新sample时，最早的sample超出span后结果失效
+            expires_at = records[0][0] + span if records else math.inf
+        result = self._compile_selector(field, aggregate)(samples)
+        with self.lock:
+            self.query_cache[key] = (version, expires_at, result)
+            self.query_cache.move_to_end(key)
+            while len(self.query_cache) > self.QUERY_CACHE_SIZE:
+                self.query_cache.popitem(last=False)
+        return result
+
+    def get_version(self, identifier: str) -> int:
+        """最新sample的序号，可作为数据版本号使用"""
+        unit = self.data.get(self.aliases.get(identifier, identifier))
+        return unit.seq if unit else 0
+
+    def close(self):
+        """退出前调用，释放共享内存等资源"""
+        if self.shm_writer is not None:
+            self.shm_writer.close()
+            self.shm_writer = None
+        logger.debug("data store closed")
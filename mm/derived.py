@@ -0,0 +1,159 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Type, Tuple
+
+from mm.config import DerivedSensorSettings
+from mm.data import DataStore
+from mm.utils import compile_location
+
+logger = logging.getLogger(__name__)
+
+
+class DerivedOperator(ABC):
+    """增量算子，每个输入产生新值时调用update，状态大小与历史长度无关"""
+
+    arity: Optional[int] = None
+
+    def __init__(self, inputs: int, **kwargs):
+        if self.arity is not None and inputs != self.arity:
+            raise ValueError(f"{self.__class__.__name__} requires {self.arity} inputs, got {inputs}")
+
+    @abstractmethod
+    def update(self, values: List[Tuple[int, float]], timestamp: float) -> Optional[float]:
+        """
+        :param values: 同一个sample中产生的新输入值 [(输入序号, 值), ...]
+        :param timestamp: 单调时钟(秒)
+        :return: 新的输出值，None表示本次无输出
+        """
+
+
+class RateOperator(DerivedOperator):
+    """累计值 -> 每秒变化率．计数器回退(重置)时跳过本次输出"""
+    arity = 1
+
+    def __init__(self, inputs: int, scale: float = 1.0, **kwargs):
+        super(RateOperator, self).__init__(inputs)
+        self.scale = scale
+        self.last_value: Optional[float] = None
+        self.last_timestamp = 0.0
+
+    def update(self, values: List[Tuple[int, float]], timestamp: float) -> Optional[float]:
+        _, value = values[-1]
+        last_value, last_timestamp = self.last_value, self.last_timestamp
+        self.last_value, self.last_timestamp = value, timestamp
+        if last_value is None or timestamp <= last_timestamp or value < last_value:
+            return None
+        return (value - last_value) / (timestamp - last_timestamp) * self.scale
+
+
+class EwmaOperator(DerivedOperator):
+    """指数加权移动平均"""
+    arity = 1
+
+    def __init__(self, inputs: int, alpha: float = 0.3, **kwargs):
+        super(EwmaOperator, self).__init__(inputs)
+        assert 0 < alpha <= 1
+        self.alpha = alpha
+        self.value: Optional[float] = None
+
+    def update(self, values: List[Tuple[int, float]], timestamp: float) -> Optional[float]:
+        _, value = values[-1]
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class SumOperator(DerivedOperator):
+    """各输入最新值之和，所有输入都产生过数据后才输出"""
+
+    def __init__(self, inputs: int, **kwargs):
+        super(SumOperator, self).__init__(inputs)
+        self.latest: List[Optional[float]] = [None] * inputs
+        self.missing = inputs
+
+    def update(self, values: List[Tuple[int, float]], timestamp: float) -> Optional[float]:
+        for index, value in values:
+            if self.latest[index] is None:
+                self.missing -= 1
+            self.latest[index] = value
+        if self.missing:
+            return None
+        return sum(self.latest)
+
+
+class RatioOperator(DerivedOperator):
+    """inputs[0] / inputs[1]，乘以scale(如100得到百分比)"""
+    arity = 2
+
+    def __init__(self, inputs: int, scale: float = 1.0, **kwargs):
+        super(RatioOperator, self).__init__(inputs)
+        self.scale = scale
+        self.latest: List[Optional[float]] = [None, None]
+
+    def update(self, values: List[Tuple[int, float]], timestamp: float) -> Optional[float]:
+        for index, value in values:
+            self.latest[index] = value
+        numerator, denominator = self.latest
+        if numerator is None or not denominator:
+            return None
+        return numerator / denominator * self.scale
+
+
+OPERATORS: Dict[str, Type[DerivedOperator]] = {
+    "rate": RateOperator,
+    "ewma": EwmaOperator,
+    "sum": SumOperator,
+    "ratio": RatioOperator,
+}
+
+
+class DerivedSensor:
+    """订阅输入sensor的DataStore数据，增量计算后作为普通序列写回DataStore"""
+
+    def __init__(self, settings: DerivedSensorSettings, data_store: DataStore):
+        if settings.op not in OPERATORS:
+            raise ValueError(f"unknown derived op '{settings.op}', available: {list(OPERATORS)}")
+        self.settings = settings
+        self.data_store = data_store
+        self.operator = OPERATORS[settings.op](len(settings.inputs), **settings.kwargs)
+        # 同一sensor的多个输入在一次回调中一起更新，避免产生混合了新旧sample的中间结果
+        self.inputs_by_sensor: Dict[str, List[Tuple[int, Any]]] = {}
+        for index, input_settings in enumerate(settings.inputs):
+            self.inputs_by_sensor.setdefault(input_settings.sensor, []).append(
+                (index, compile_location(input_settings.location_in_sample)))
+        self._busy = False
+
+    def attach(self):
+        self.data_store.register(identifier=self.settings.name, cfg=self.settings.store)
+        for sensor in self.inputs_by_sensor:
+            self.data_store.subscribe(sensor, self.on_sample)
+
+    def on_sample(self, identifier: str, seq: int, sample: Any):
+        # 防止派生sensor循环引用导致无限递归
+        if self._busy:
+            return
+        self._busy = True
+        try:
+            values = [(index, float(extract(sample))) for index, extract in self.inputs_by_sensor[identifier]]
+            value = self.operator.update(values, time.monotonic())
+            if value is not None:
+                self.data_store.store(self.settings.name, value)
+        finally:
+            self._busy = False
+
+
+def build_derived_sensors(settings_list: List[DerivedSensorSettings], data_store: DataStore) -> List[DerivedSensor]:
+    derived_sensors = []
+    for settings in settings_list:
+        try:
+            derived = DerivedSensor(settings, data_store)
+        except Exception as e:
+            logger.error(f"derived sensor '{settings.name}' build failed: {e}")
+            continue
+        derived.attach()
+        logger.debug(f"register derived '{settings.name}'")
+        derived_sensors.append(derived)
+    return derived_sensors
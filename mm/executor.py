@@ -0,0 +1,69 @@
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List
+
+
+class DaemonThreadExecutor(ThreadPoolExecutor):
+    """
+    使用守护线程的线程池．与ThreadPoolExecutor不同，进程退出时不会等待仍在执行的任务，
+    阻塞在系统调用中的sensor不会拖慢退出
+    loop.set_default_executor要求ThreadPoolExecutor的实例，因此继承它并重写submit与shutdown，
+    map、with语句等继承的方法经由这两个方法工作
+    """
+
+    def __init__(self, max_workers: int = 4, thread_name_prefix: str = "mm-executor"):
+        super(DaemonThreadExecutor, self).__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        # 工作线程，ThreadPoolExecutor的_threads不使用
+        self._workers: List[threading.Thread] = []
+        self._idle = threading.Semaphore(0)
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            future = Future()
+            self._queue.put((future, fn, args, kwargs))
+            if not self._idle.acquire(blocking=False) and len(self._workers) < self.max_workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f"{self.thread_name_prefix}_{len(self._workers)}")
+                thread.start()
+                self._workers.append(thread)
+            return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            self._idle.release()
+
+    def shutdown(self, wait: bool = True, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            # 取消尚未开始的任务
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+            for _ in self._workers:
+                self._queue.put(None)
+        if wait:
+            for thread in self._workers:
+                thread.join()
@@ -1 +1,2 @@
-from .win import MainWindow
\ No newline at end of file
+from .loop import AsyncioDriver
+from .win import MainWindow
@@ -0,0 +1,95 @@
+import logging
+import time
+from typing import Callable, Dict, List
+
+from PyQt5 import QtCore, QtWidgets
+
+from mm.config import IndicatorSettings
+
+logger = logging.getLogger(__name__)
+
+
+class FrameClock(QtCore.QObject):
+    """
+    统一的渲染时钟．每帧批量更新所有到期的指示器，内容变化的控件各自调用update()，由Qt合并为一次重绘
+    单帧耗时超过预算时，按优先级推迟剩余的指示器到下一帧
+    """
+
+    def __init__(self,
+                 widget: QtWidgets.QWidget,
+                 render: Callable[[IndicatorSettings], None],
+                 frame_interval: int = 50,
+                 frame_budget: int = 8,
+                 *args, **kwargs):
+        """
+        :param render: 渲染单个指示器
+        :param frame_interval: 最小帧间隔(ms)，到期时间落在同一帧间隔内的指示器合并到一帧更新
+        :param frame_budget: 单帧耗时预算(ms)
+        """
+        super(FrameClock, self).__init__(*args, **kwargs)
+        self.widget = widget
+        self.render = render
+        self.frame_interval = frame_interval / 1000
+        self.frame_budget = frame_budget / 1000
+
+        self.indicators_settings: List[IndicatorSettings] = []
+        self.next_due: Dict[str, float] = {}
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.timer.timeout.connect(self.on_frame)
+
+        # 统计
+        self.frames = 0
+        self.renders = 0
+        self.deferred = 0
+        self.last_frame_cost = 0.0
+
+    def set_indicators(self, indicators_settings: List[IndicatorSettings]):
+        self.indicators_settings = sorted(indicators_settings, key=lambda s: -s.priority)
+        now = time.monotonic()
+        self.next_due = {s.name: self.next_due.get(s.name, now) for s in self.indicators_settings}
+        if self.is_active():
+            self._schedule(now)
+
+    def is_active(self) -> bool:
+        return self.timer.isActive()
+
+    def start(self):
+        """所有指示器立即到期并渲染一帧"""
+        now = time.monotonic()
+        for name in self.next_due:
+            self.next_due[name] = now
+        self.on_frame()
+
+    def stop(self):
+        self.timer.stop()
+
+    def _schedule(self, now: float):
+        if not self.next_due:
+            return
+        delay = max(min(self.next_due.values()) - now, self.frame_interval)
+        self.timer.start(int(delay * 1000))
+
+    def on_frame(self):
+        now = time.monotonic()
+        horizon = now + self.frame_interval / 2
+        # indicators_settings已按优先级排序
+        due = [s for s in self.indicators_settings if self.next_due[s.name] <= horizon]
+
+        if due:
+            begin = time.perf_counter()
+            for idx, settings in enumerate(due):
+                if idx and time.perf_counter() - begin > self.frame_budget:
+                    self.deferred += len(due) - idx
+                    logger.debug(f"frame over budget, {len(due) - idx} indicators deferred")
+                    break
+                self.render(settings)
+                self.renders += 1
+                next_due = self.next_due[settings.name] + settings.interval / 1000
+                self.next_due[settings.name] = next_due if next_due > now else now + settings.interval / 1000
+            self.frames += 1
+            self.last_frame_cost = time.perf_counter() - begin
+
+        self._schedule(time.monotonic())
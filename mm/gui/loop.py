@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import math
+
+from PyQt5 import QtCore
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncioDriver(QtCore.QObject):
+    """
+    由Qt事件循环驱动asyncio事件循环，不使用额外线程
+    selector的fd可读(IO就绪或call_soon_threadsafe唤醒)时，或下一个定时回调到期时，执行一次不阻塞的迭代
+
+    selector与就绪/定时回调队列是BaseEventLoop的内部属性．事件循环没有这些属性时(如uvloop)，
+    退化为按poll_interval定时迭代
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, poll_interval: int = 10, *args, **kwargs):
+        """:param poll_interval: 退化模式下的迭代间隔(ms)"""
+        super(AsyncioDriver, self).__init__(*args, **kwargs)
+        self.loop = loop
+        self.poll_interval = poll_interval
+
+        selector = getattr(loop, "_selector", None)
+        self.notifier = None
+        if selector is not None and hasattr(selector, "fileno"):
+            self.notifier = QtCore.QSocketNotifier(selector.fileno(), QtCore.QSocketNotifier.Read, self)
+            self.notifier.activated.connect(self.step)
+            self.notifier.setEnabled(False)
+        # 能否得知下一个回调的时间
+        self.precise = self.notifier is not None and hasattr(loop, "_ready") and hasattr(loop, "_scheduled")
+        if not self.precise:
+            logger.info(f"{type(loop).__name__} internals are not available, poll every {poll_interval}ms")
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.timer.timeout.connect(self.step)
+
+        # 迭代次数
+        self.steps = 0
+
+    def start(self):
+        if self.notifier is not None:
+            self.notifier.setEnabled(True)
+        self.step()
+
+    def stop(self):
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+        self.timer.stop()
+
+    def step(self):
+        if self.loop.is_closed() or self.loop.is_running():
+            return
+        # run_forever之前调用stop：以0超时轮询一次selector，执行所有就绪的回调后返回(公开的行为)
+        self.loop.stop()
+        self.loop.run_forever()
+        self.steps += 1
+        self._schedule()
+
+    def _schedule(self):
+        if not self.precise:
+            self.timer.start(self.poll_interval)
+            return
+        try:
+            if self.loop._ready:
+                delay = 0.0
+            elif self.loop._scheduled:
+                delay = max(self.loop._scheduled[0].when() - self.loop.time(), 0.0)
+            else:
+                self.timer.stop()
+                return
+        except (AttributeError, IndexError, TypeError) as e:
+            logger.warning(f"cannot read the schedule of {type(self.loop).__name__}, "
+                           f"poll every {self.poll_interval}ms: {e}")
+            self.precise = False
+            delay = self.poll_interval / 1000
+        self.timer.start(math.ceil(delay * 1000))
@@ -1,3 +1,5 @@
+from typing import List
+
 from PyQt5 import QtWidgets
 from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtWidgets import QMenu
@@ -7,6 +9,9 @@ class PopupMenu(QMenu):
 
     sig_quit = pyqtSignal()
     sig_settings = pyqtSignal()
+    sig_profile = pyqtSignal()
+    # 页面序号
+    sig_page = pyqtSignal(int)
 
     def __init__(self, *args, **kwargs):
         super(PopupMenu, self).__init__(*args, **kwargs)
@@ -16,5 +21,25 @@ class PopupMenu(QMenu):
         self.act_quit.triggered.connect(self.sig_quit.emit)
         self.act_settings.triggered.connect(self.sig_settings.emit)
 
+        self.act_profile = QtWidgets.QAction('性能分析 30s', parent=self)
+        self.act_profile.triggered.connect(self.sig_profile.emit)
+
         self.addAction(self.act_quit)
         self.addAction(self.act_settings)
+        self.addAction(self.act_profile)
+
+        self.page_menu = self.addMenu('页面')
+        self.page_menu.menuAction().setVisible(False)
+        self.page_group = QtWidgets.QActionGroup(self)
+
+    def set_pages(self, pages: List[str], current: int):
+        self.page_menu.clear()
+        for index, page in enumerate(pages):
+            action = QtWidgets.QAction(page or '默认', parent=self.page_menu)
+            action.setCheckable(True)
+            action.setChecked(index == current)
+            action.setActionGroup(self.page_group)
+            action.triggered.connect(lambda _, i=index: self.sig_page.emit(i))
+            self.page_menu.addAction(action)
+        # 只有一个页面时不显示
+        self.page_menu.menuAction().setVisible(len(pages) > 1)
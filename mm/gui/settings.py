@@ -277,6 +277,11 @@ class IndicatorTab(ListItemEditWidget):
             settings: IndicatorSettings = item.data(Qt.Qt.UserRole)
             settings.data.sensor = value
 
+        def page_handler(value: str):
+            item = self.list.currentItem()
+            settings: IndicatorSettings = item.data(Qt.Qt.UserRole)
+            settings.page = value
+
         name_edit = QLineEdit(parent=self)
         name_edit.textChanged.connect(name_handler)
 
@@ -307,11 +312,15 @@ class IndicatorTab(ListItemEditWidget):
         )
         data_sensor_edit.currentTextChanged.connect(data_sensor_handler)
 
+        page_edit = QLineEdit(parent=self)
+        page_edit.textChanged.connect(page_handler)
+
         self.edit_fields["name"] = QLabel("Name"), name_edit
         self.edit_fields["type"] = QLabel(text="Type"), type_edit
         self.edit_fields["param"] = QLabel(text="Param"), param_edit
         self.edit_fields["interval"] = QLabel(text="Interval(ms)"), interval_edit
         self.edit_fields["data_sensor"] = QLabel(text="Data.Sensor"), data_sensor_edit
+        self.edit_fields["page"] = QLabel(text="Page"), page_edit
 
     def set_form_data(self, data: IndicatorSettings):
         self.edit_fields['name'][1].setText(data.name)
@@ -319,6 +328,7 @@ class IndicatorTab(ListItemEditWidget):
         self.edit_fields['param'][1].setText(json.dumps(data.kwargs, ensure_ascii=False, indent=4))
         self.edit_fields['interval'][1].setText(str(data.interval))
         self.edit_fields['data_sensor'][1].setCurrentText(str(data.data.sensor))
+        self.edit_fields['page'][1].setText(data.page)
 
     def new_data(self) -> IndicatorSettings:
         return IndicatorSettings(
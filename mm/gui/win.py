@@ -1,45 +1,67 @@
 import logging
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from PyQt5 import QtCore, QtGui, Qt
+from PyQt5 import QtCore, QtGui, Qt, QtWidgets
 
+from mm.alert import AlertEngine, AlertEvent
 from mm.config import SettingsStore, IndicatorSettings, SensorSettings
 from mm.data import DataStore
 from mm.gui.draggable import Draggable
+from mm.gui.frame import FrameClock
 from mm.gui.popup_menu import PopupMenu
 from mm.gui.settings import SettingsDialog
 from mm.indicator import Indicator
+from mm.profiler import SamplingProfiler
 from mm.utils import dynamic_load, relaunch
 
 logger = logging.getLogger(__name__)
 
 
 class MainWindow(Draggable):
+    # 告警事件由采集线程发出，经信号转到GUI线程处理
+    sig_alert = QtCore.pyqtSignal(object)
+    # 性能分析结束，参数为汇总文件路径
+    sig_profile_finished = QtCore.pyqtSignal(object)
 
-    def __init__(self, config_store: SettingsStore, data_store: DataStore):
+    def __init__(self, config_store: SettingsStore, data_store: DataStore,
+                 alert_engine: Optional[AlertEngine] = None):
         super(MainWindow, self).__init__()
 
         self.config_store = config_store
         self.data_store = data_store
+        self.alert_engine = alert_engine
+        self.tray_icon: Optional[QtWidgets.QSystemTrayIcon] = None
+        self.popup_menu: Optional[PopupMenu] = None
+        self.profiler: Optional[SamplingProfiler] = None
 
-        self.indicators = self.build_indicators()
+        # 指示器按页面分组，页面首次显示时才创建
+        self.pages = self.collect_pages()
+        self.page_index = 0
+        self.page_layouts: Dict[str, QtWidgets.QLayout] = {}
+        self.stack: Optional[QtWidgets.QStackedWidget] = None
+        self.indicators: Dict[str, Indicator] = {}
+        # 指示器名称 -> 数据源在DataStore中的标识
+        self.sources: Dict[str, str] = {}
+        # 尚未创建的指示器的告警颜色，创建时应用
+        self.alert_colors: Dict[str, Optional[str]] = {}
 
         self.setFont(self._get_font())
         self._init_frameless_transparent()
         self._init_ui()
         self.move(self.config_store.config.pos_x, self.config_store.config.pos_y)
         self.connect_signals()
-        self.show()
-
-        self.timer_id_indicator_settings_map: Dict[int, IndicatorSettings] = {}
-        for indicator_settings in self.config_store.config.indicators_settings:
-            timer_id = self.startTimer(indicator_settings.interval)
-            self.timer_id_indicator_settings_map[timer_id] = indicator_settings
 
-        # 初始渲染
-        for indicator_settings in self.config_store.config.indicators_settings:
-            self.render_indicator(indicator_settings)
+        # 所有指示器共用一个渲染时钟，只调度当前页面；窗口不可见(隐藏/最小化/被遮挡)时挂起
+        self.frame_clock = FrameClock(self, self.render_indicator,
+                                      frame_interval=self.config_store.config.frame_interval,
+                                      frame_budget=self.config_store.config.frame_budget,
+                                      parent=self)
+        self.show_page(0)
+        self._window_exposed = True
+        self.show()
+        if self.windowHandle() is not None:
+            self.windowHandle().installEventFilter(self)
 
         self.setting_dialog = self.init_settings_dialog()
         self.popup_menu = self.init_popup_menu(self.setting_dialog)
@@ -56,6 +78,9 @@ class MainWindow(Draggable):
         popup_menu = PopupMenu(parent=self)
         popup_menu.sig_quit.connect(self.quit)
         popup_menu.sig_settings.connect(settings_dialog.exec_)
+        popup_menu.sig_page.connect(self.show_page)
+        popup_menu.sig_profile.connect(self.start_profiler)
+        popup_menu.set_pages(self.pages, self.page_index)
         return popup_menu
 
     def init_settings_dialog(self):
@@ -81,16 +106,104 @@ class MainWindow(Draggable):
             self.config_store.update_config_file()
 
         self.sig_windowed_moved.connect(on_window_moved)
+        self.sig_alert.connect(self.on_alert)
+        self.sig_profile_finished.connect(self.on_profile_finished)
 
-    def build_indicators(self) -> Dict[str, Indicator]:
-        type_map = {}
+        if self.alert_engine is not None:
+            self.alert_engine.add_listener(self.sig_alert.emit)
+
+    def on_alert(self, event: AlertEvent):
+        settings = event.settings
+        color = settings.color if event.active else None
+        indicator = self.indicators.get(settings.indicator)
+        if indicator is not None:
+            indicator.set_alert_color(color)
+        else:
+            self.alert_colors[settings.indicator] = color
+
+        if settings.notify and event.active:
+            self.notify(f"Alert: {settings.name}", f"{settings.sensor}: {round(event.value, 2)}")
+
+    def start_profiler(self, duration: float = 30.0):
+        if self.profiler is not None and self.profiler.is_alive():
+            return
+        output_dir = Path(self.config_store.settings_home, "profiles")
+        self.profiler = SamplingProfiler(output_dir, duration=duration, on_finished=self.sig_profile_finished.emit)
+        self.profiler.start()
+        self.popup_menu.act_profile.setEnabled(False)
+
+    def on_profile_finished(self, summary: Path):
+        self.popup_menu.act_profile.setEnabled(True)
+        self.notify("Profile finished", str(summary))
+
+    def notify(self, title: str, message: str):
+        if not QtWidgets.QSystemTrayIcon.isSystemTrayAvailable():
+            logger.warning(f"system tray not available, notification dropped: {title} {message}")
+            return
+        if self.tray_icon is None:
+            icon = self.style().standardIcon(QtWidgets.QStyle.SP_MessageBoxWarning)
+            self.tray_icon = QtWidgets.QSystemTrayIcon(icon, self)
+            self.tray_icon.show()
+        self.tray_icon.showMessage(title, message, QtWidgets.QSystemTrayIcon.Warning)
+
+    def collect_pages(self) -> List[str]:
+        pages = []
         for ic in self.config_store.config.indicators_settings:
+            if ic.page not in pages:
+                pages.append(ic.page)
+        return pages or [""]
+
+    def page_settings(self, page: str) -> List[IndicatorSettings]:
+        return [ic for ic in self.config_store.config.indicators_settings if ic.page == page]
+
+    def build_indicators(self, indicators_settings: List[IndicatorSettings]) -> Dict[str, Indicator]:
+        type_map = {}
+        for ic in indicators_settings:
             indicator_cls = dynamic_load(ic.type)
             params = indicator_cls.infer_preferred_params()
             params.update(ic.kwargs)
             type_map[ic.name] = indicator_cls(**params)
+            self.sources[ic.name] = ic.data.identifier()
         return type_map
 
+    def build_page(self, page: str):
+        indicators = self.build_indicators(self.page_settings(page))
+        layout = self.page_layouts[page]
+        for name, indicator in indicators.items():
+            layout.addWidget(indicator.get_widget())
+            if self.alert_colors.get(name):
+                indicator.set_alert_color(self.alert_colors[name])
+        self.indicators.update(indicators)
+        logger.debug(f"page '{page}' built, {len(indicators)} indicators")
+
+    def show_page(self, index: int):
+        """切换页面．首次显示时创建指示器，之后立即从DataStore追赶渲染一次"""
+        self.page_index = index % len(self.pages)
+        page = self.pages[self.page_index]
+        settings = self.page_settings(page)
+        if any(ic.name not in self.indicators for ic in settings):
+            self.build_page(page)
+        if self.stack is not None:
+            # 窗口大小只跟随当前页面
+            for idx in range(self.stack.count()):
+                policy = QtWidgets.QSizePolicy.Preferred if idx == self.page_index else QtWidgets.QSizePolicy.Ignored
+                self.stack.widget(idx).setSizePolicy(policy, policy)
+            self.stack.setCurrentIndex(self.page_index)
+            self.adjustSize()
+        # 其余页面的指示器不再调度
+        self.frame_clock.set_indicators(settings)
+        if self.frame_clock.is_active():
+            self.frame_clock.start()
+        if self.popup_menu is not None:
+            self.popup_menu.set_pages(self.pages, self.page_index)
+
+    def wheelEvent(self, e: QtGui.QWheelEvent) -> None:
+        if len(self.pages) > 1 and e.angleDelta().y():
+            self.show_page(self.page_index + (1 if e.angleDelta().y() < 0 else -1))
+            e.accept()
+        else:
+            super(MainWindow, self).wheelEvent(e)
+
     def _get_font(self) -> QtGui.QFont:
         return QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont)
 
@@ -104,17 +217,81 @@ class MainWindow(Draggable):
         ui_file = self.config_store.config.ui_file or Path(__file__).parent.joinpath("default.ui")
         loadUi(ui_file, self)
 
-        for indicator in self.indicators.values():
-            self.wrapper.layout().addWidget(indicator.get_widget())
+        if len(self.pages) == 1:
+            self.page_layouts[self.pages[0]] = self.wrapper.layout()
+            return
+        # 各页面使用与ui文件中wrapper相同的布局方向与间距
+        wrapper_layout = self.wrapper.layout()
+        self.stack = QtWidgets.QStackedWidget(self.wrapper)
+        for page in self.pages:
+            widget = QtWidgets.QWidget(self.stack)
+            if isinstance(wrapper_layout, QtWidgets.QBoxLayout):
+                layout = QtWidgets.QBoxLayout(wrapper_layout.direction(), widget)
+            else:
+                layout = type(wrapper_layout)(widget)
+            layout.setContentsMargins(0, 0, 0, 0)
+            layout.setSpacing(wrapper_layout.spacing())
+            self.stack.addWidget(widget)
+            self.page_layouts[page] = layout
+        self.wrapper.layout().addWidget(self.stack)
 
     def render_indicator(self, indicator_settings: IndicatorSettings):
         indicator = self.indicators[indicator_settings.name]
         try:
-            sequence = self.data_store.get_sequence(indicator_settings.data.sensor)
+            data = indicator_settings.data
+            source = self.sources[indicator_settings.name]
+            window = data.window
+            if window is None and data.aggregate is None:
+                # 只读取指示器用到的sample，压缩存储不必解码整个历史
+                window = indicator.required_samples()
+            # 结果在DataStore中缓存，多个指示器的相同请求只计算一次
+            sequence = self.data_store.query(source, window, data.span, data.field, data.aggregate)
+            qs = indicator.required_quantiles()
+            if qs:
+                values = self.data_store.get_quantiles(source, qs, indicator.quantile_span())
+                indicator.update_quantiles(dict(zip(qs, values)))
             indicator.update(sequence)
         except Exception as e:
             logger.error(f"{indicator.__class__.__name__} update failed: {e}")
 
-    def timerEvent(self, e: QtCore.QTimerEvent) -> None:
-        indicator_settings = self.timer_id_indicator_settings_map[e.timerId()]
-        self.render_indicator(indicator_settings)
+    def is_exposed(self) -> bool:
+        return self.isVisible() and not self.isMinimized() and self._window_exposed
+
+    def resume_indicators(self):
+        if self.frame_clock.is_active():
+            return
+        logger.debug("indicators resumed")
+        # 恢复时立即渲染一次
+        self.frame_clock.start()
+
+    def suspend_indicators(self):
+        if not self.frame_clock.is_active():
+            return
+        logger.debug("indicators suspended")
+        self.frame_clock.stop()
+
+    def _on_exposure_changed(self):
+        if self.is_exposed():
+            self.resume_indicators()
+        else:
+            self.suspend_indicators()
+
+    def showEvent(self, e: QtGui.QShowEvent) -> None:
+        super(MainWindow, self).showEvent(e)
+        self._window_exposed = True
+        self._on_exposure_changed()
+
+    def hideEvent(self, e: QtGui.QHideEvent) -> None:
+        super(MainWindow, self).hideEvent(e)
+        self._on_exposure_changed()
+
+    def changeEvent(self, e: QtCore.QEvent) -> None:
+        super(MainWindow, self).changeEvent(e)
+        if e.type() == QtCore.QEvent.WindowStateChange:
+            self._on_exposure_changed()
+
+    def eventFilter(self, obj: QtCore.QObject, e: QtCore.QEvent) -> bool:
+        if obj is self.windowHandle() and e.type() == QtCore.QEvent.Expose:
+            self._window_exposed = self.windowHandle().isExposed()
+            self._on_exposure_changed()
+        return super(MainWindow, self).eventFilter(obj, e)
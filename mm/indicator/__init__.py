@@ -1,13 +1,38 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from PyQt5 import QtWidgets
 
 
+def set_label_text(label: QtWidgets.QLabel, text: str):
+    """文本未变化时不调用setText，避免无意义的重新布局与重绘"""
+    if label.text() != text:
+        label.setText(text)
+
+
 @dataclass
 class IndicatorData:
     sensor: str
+    # 只读取最新的window个sample，None表示全部
+    window: Optional[int] = None
+    # 只读取最近span秒内采集的sample，与window同时设置时取两者的交集
+    span: Optional[float] = None
+    # sensor的实例参数，用于区分同一type的多个实例．None时sensor按名称或type查找
+    kwargs: Optional[Dict[str, Any]] = None
+    # 取值路径，如"[0]"，None表示使用sample本身
+    field: Optional[str] = None
+    # 对选中的数值聚合: min / max / avg / sum / pNN 得到单个值，normalize 缩放到0~1(图表指示器需设置max: 1)
+    # None表示不聚合
+    aggregate: Optional[str] = None
+
+    def identifier(self) -> str:
+        """DataStore中的标识"""
+        if self.kwargs is None:
+            return self.sensor
+        from mm.utils import dynamic_load
+        return dynamic_load(self.sensor).instance_key(self.sensor, self.kwargs)
+
 
 class Indicator(ABC):
 
@@ -20,6 +45,31 @@ class Indicator(ABC):
         """DataStore会依据配置传递值过来"""
         pass
 
+    def required_samples(self) -> Optional[int]:
+        """
+        每次update用到的最新sample数量，None表示全部
+        IndicatorData未设置window与aggregate时按此限制读取量，压缩存储只需解码最新的数据块
+        """
+        return None
+
+    def required_quantiles(self) -> List[float]:
+        """需要的分位数(0~1)，非空时每次update之前调用update_quantiles"""
+        return []
+
+    def quantile_span(self) -> Optional[float]:
+        """分位数的统计时长(s)，None表示sensor配置的整个窗口"""
+        return None
+
+    def update_quantiles(self, quantiles: Dict[float, Optional[float]]):
+        """数据源的流式分位数统计，需在sensor的store.quantiles中开启"""
+        pass
+
+    def set_alert_color(self, color: Optional[str]):
+        """告警时改变颜色，None表示恢复．默认对QLabel设置文字颜色"""
+        widget = self.get_widget()
+        if isinstance(widget, QtWidgets.QLabel):
+            widget.setStyleSheet(f"color: {color};" if color else "")
+
     @classmethod
     def infer_preferred_params(cls) -> Dict[str, Any]:
         """推测建议的实例化参数"""
@@ -1,10 +1,12 @@
 from abc import abstractmethod
-from typing import Dict, Any, List, Optional, Union
+from array import array
+from typing import Dict, Any, List, Optional, Union, Sequence
 
 from PyQt5 import QtWidgets, QtGui
 
 from mm.config import IndicatorData
 from mm.indicator import Indicator
+from mm.utils import compile_location
 
 
 class PercentHistoryWidget(QtWidgets.QWidget):
@@ -91,6 +93,7 @@ class PercentHistoryIndicator(Indicator):
                                            fg_color=QtGui.QColor(fg_color))
         self.widget.setFixedWidth(width)
         self.samples = samples
+        self.fg_color = QtGui.QColor(fg_color)
 
         self.location_in_sample = location_in_sample
         self.max = max
@@ -99,6 +102,9 @@ class PercentHistoryIndicator(Indicator):
     def get_widget(self) -> QtWidgets.QWidget:
         return self.widget
 
+    def required_samples(self) -> Optional[int]:
+        return self.samples
+
     def update(self, val: List[Any]):
 
         def extract(v):
@@ -130,6 +136,9 @@ class PercentHistoryIndicator(Indicator):
 
         self.widget.setValue(values)
 
+    def set_alert_color(self, color: Optional[str]):
+        self.widget.setFgColor(QtGui.QColor(color) if color else self.fg_color)
+
     @classmethod
     def infer_preferred_params(cls) -> Dict[str, Any]:
         return {}
@@ -152,3 +161,221 @@ class MemoryIndicator(PercentHistoryIndicator):
     def infer_preferred_data(cls) -> IndicatorData:
         return IndicatorData(sensor="mm.sensor.simple.MemorySensor")
 
+
+
+def decimate_minmax(values: Sequence[float], columns: int) -> array:
+    """
+    按像素列分桶，每列保留最小值与最大值(按出现顺序)
+    :return: 交错排列的 [x0, y0, x1, y1, ...]，x为列坐标
+    """
+    n = len(values)
+    points = array("d")
+    if n <= columns:
+        step = columns / max(n, 1)
+        for idx, v in enumerate(values):
+            points.extend((step * (idx + 0.5), v))
+        return points
+    for col in range(columns):
+        begin, end = col * n // columns, (col + 1) * n // columns
+        bucket = values[begin:end]
+        lo, hi = min(bucket), max(bucket)
+        x = col + 0.5
+        if lo == hi:
+            points.extend((x, lo))
+        elif bucket.index(lo) < bucket.index(hi):
+            points.extend((x, lo, x, hi))
+        else:
+            points.extend((x, hi, x, lo))
+    return points
+
+
+def decimate_lttb(values: Sequence[float], columns: int) -> array:
+    """
+    Largest-Triangle-Three-Buckets降采样，保留columns个点
+    :return: 交错排列的 [x0, y0, x1, y1, ...]，x已缩放到[0, columns]
+    """
+    n = len(values)
+    points = array("d")
+    scale = columns / max(n - 1, 1)
+    if n <= columns:
+        for idx, v in enumerate(values):
+            points.extend((idx * scale, v))
+        return points
+    if columns < 3:
+        # 不足以保留首尾两点之外的桶
+        return decimate_minmax(values, columns)
+
+    every = (n - 2) / (columns - 2)
+    a = 0
+    points.extend((0.0, values[0]))
+    for i in range(columns - 2):
+        # 下一个桶的平均点
+        next_begin, next_end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x = (next_begin + next_end - 1) / 2
+        avg_y = sum(values[next_begin:next_end]) / (next_end - next_begin)
+
+        begin, end = int(i * every) + 1, int((i + 1) * every) + 1
+        ax, ay = a, values[a]
+        best, best_area = begin, -1.0
+        for idx in range(begin, end):
+            area = abs((ax - avg_x) * (values[idx] - ay) - (ax - idx) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = idx, area
+        points.extend((best * scale, values[best]))
+        a = best
+    points.extend((columns, values[-1]))
+    return points
+
+
+def build_polygon(points: array) -> QtGui.QPolygonF:
+    """由交错的坐标数组直接构建QPolygonF，避免逐个创建QPointF"""
+    count = len(points) // 2
+    polygon = QtGui.QPolygonF(count)
+    if count:
+        ptr = polygon.data()
+        ptr.setsize(count * 2 * points.itemsize)
+        memoryview(ptr).cast("B")[:] = memoryview(points).cast("B")
+    return polygon
+
+
+class DecimatedHistoryWidget(QtWidgets.QWidget):
+
+    def __init__(self,
+                 fg_color: Optional[QtGui.QColor] = None,
+                 bg_color: Optional[QtGui.QColor] = None,
+                 mode: str = "minmax",
+                 fill: bool = True,
+                 *args, **kwargs):
+        """
+        :param mode: minmax 每列保留最小/最大值; lttb Largest-Triangle-Three-Buckets
+        :param fill: True绘制面积图，False绘制折线
+        """
+        super(DecimatedHistoryWidget, self).__init__(*args, **kwargs)
+        assert mode in ["minmax", "lttb"]
+        self.mode = mode
+        self.fill = fill
+        self.bg_color = bg_color or QtGui.QColor(0, 0, 0)
+        self.fg_color = fg_color or QtGui.QColor(0, 255, 0)
+        self.val: Sequence[float] = []
+        self.polygon: Optional[QtGui.QPolygonF] = None
+
+    def setValue(self, val: Sequence[float]):
+        """
+        :param val: percent value list
+        """
+        self.val = val
+        self.polygon = None
+        self.update()
+
+    def setFgColor(self, color: QtGui.QColor):
+        self.fg_color = color
+        self.update()
+
+    def resizeEvent(self, e: QtGui.QResizeEvent):
+        self.polygon = None
+        super(DecimatedHistoryWidget, self).resizeEvent(e)
+
+    def _build_polygon(self, w: int, h: int) -> QtGui.QPolygonF:
+        decimate = decimate_minmax if self.mode == "minmax" else decimate_lttb
+        points = decimate(self.val, max(w, 1))
+        # 百分比 -> 像素坐标，y轴向下
+        k = h / 100
+        for idx in range(1, len(points), 2):
+            points[idx] = h - points[idx] * k
+        if self.fill and points:
+            points = array("d", (points[0], h)) + points + array("d", (points[-2], h))
+        return build_polygon(points)
+
+    def paintEvent(self, e):
+        size = self.size()
+        w, h = size.width(), size.height()
+        if self.polygon is None:
+            self.polygon = self._build_polygon(w, h)
+
+        qp = QtGui.QPainter()
+        qp.begin(self)
+        qp.fillRect(0, 0, w, h, self.bg_color)
+        qp.setPen(self.fg_color)
+        if self.fill:
+            qp.setBrush(self.fg_color)
+            qp.drawPolygon(self.polygon)
+        else:
+            qp.drawPolyline(self.polygon)
+        qp.end()
+
+
+class DecimatedHistoryIndicator(Indicator):
+    """
+    长窗口历史图表．先按控件像素宽度降采样再绘制，绘制开销与样本数无关
+    """
+
+    def __init__(self,
+                 bg_color: str = "#000000",
+                 fg_color: str = "#00FF00",
+                 width: int = 80,
+                 samples: Optional[int] = None,
+                 location_in_sample: Optional[str] = None,
+                 max: Union[str, float] = 100,
+                 min: Union[str, float] = 0,
+                 mode: str = "minmax",
+                 fill: bool = True):
+        """
+        :param samples: 显示最新的samples个样本，None表示全部
+        :param location_in_sample: 同PercentHistoryIndicator
+        :param max: 同PercentHistoryIndicator
+        :param min: 同PercentHistoryIndicator
+        :param mode: minmax / lttb
+        :param fill: True面积图，False折线图
+        """
+        assert isinstance(max, (float, int, str))
+        if type(max) is str:
+            assert max in ['dynamic']
+        assert isinstance(min, (float, int, str))
+        if type(min) is str:
+            assert min in ['dynamic']
+        self.fg_color = QtGui.QColor(fg_color)
+        self.widget = DecimatedHistoryWidget(bg_color=QtGui.QColor(bg_color),
+                                             fg_color=self.fg_color,
+                                             mode=mode,
+                                             fill=fill)
+        self.widget.setFixedWidth(width)
+        self.samples = samples
+        self.extract = compile_location(location_in_sample)
+        self.max = max
+        self.min = min
+
+    def get_widget(self) -> QtWidgets.QWidget:
+        return self.widget
+
+    def required_samples(self) -> Optional[int]:
+        return self.samples
+
+    def update(self, val: List[Any]):
+        if self.samples is not None:
+            val = val[max(len(val) - self.samples, 0):]
+        values = [self.extract(v) for v in val]
+        if not values:
+            self.widget.setValue([])
+            return
+
+        pmax = max(values) if self.max == 'dynamic' else self.max
+        pmin = min(values) if self.min == 'dynamic' else self.min
+        prange = pmax - pmin
+        if prange == 0:
+            values = [0.0] * len(values)
+        else:
+            k = 100 / prange
+            values = [(v - pmin) * k for v in values]
+
+        self.widget.setValue(values)
+
+    def set_alert_color(self, color: Optional[str]):
+        self.widget.setFgColor(QtGui.QColor(color) if color else self.fg_color)
+
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def infer_preferred_data(cls) -> IndicatorData:
+        pass
@@ -1,12 +1,28 @@
+from string import Formatter
 from typing import Dict, Any, List, Tuple, Optional
 
 from PyQt5 import QtWidgets
 
 from mm.config import IndicatorData
-from mm.indicator import Indicator
+from mm.indicator import Indicator, set_label_text
 from mm.utils import convert_bytes_unit
 
 
+def parse_quantile_field(name: Optional[str]) -> Optional[float]:
+    """
+    格式字段对应的分位数: p5 -> 0.05, p99 -> 0.99, p999 -> 0.999, p100 -> 1.0(最大值)
+    不是分位数字段时返回None
+    """
+    if not name or len(name) < 2 or name[0] != "p" or not name[1:].isdigit():
+        return None
+    digits = name[1:]
+    if digits == "100":
+        return 1.0
+    if len(digits) <= 2:
+        return int(digits) / 100
+    return int(digits) / 10 ** len(digits)
+
+
 class NetworkIndicator(Indicator):
 
     def __init__(self):
@@ -16,9 +32,12 @@ class NetworkIndicator(Indicator):
     def get_widget(self) -> QtWidgets.QWidget:
         return self.lbl
 
+    def required_samples(self) -> Optional[int]:
+        return 1
+
     def update(self, val: List[Tuple[float, float]]):
         send_rate, recv_rate = val[-1] if val else (0, 0)
-        self.lbl.setText(self.network_fmt.format(
+        set_label_text(self.lbl, self.network_fmt.format(
             down=convert_bytes_unit(recv_rate) + '/s',
             up=convert_bytes_unit(send_rate) + '/s'
         ))
@@ -41,9 +60,12 @@ class CpuIndicator(Indicator):
     def get_widget(self) -> QtWidgets.QWidget:
         return self.lbl
 
+    def required_samples(self) -> Optional[int]:
+        return 1
+
     def update(self, val: List[float]):
         percent = val[-1] if val else 0
-        self.lbl.setText(self.format.format(round(percent)))
+        set_label_text(self.lbl, self.format.format(round(percent)))
 
     @classmethod
     def infer_preferred_params(cls) -> Dict[str, Any]:
@@ -63,9 +85,12 @@ class MemoryIndicator(Indicator):
     def get_widget(self) -> QtWidgets.QWidget:
         return self.lbl
 
+    def required_samples(self) -> Optional[int]:
+        return 1
+
     def update(self, val: List[float]):
         percent = val[-1] if val else 0
-        self.lbl.setText(self.format.format(round(percent)))
+        set_label_text(self.lbl, self.format.format(round(percent)))
 
     @classmethod
     def infer_preferred_params(cls) -> Dict[str, Any]:
@@ -85,11 +110,14 @@ class DiskIndicator(Indicator):
     def get_widget(self) -> QtWidgets.QWidget:
         return self.lbl
 
+    def required_samples(self) -> Optional[int]:
+        return 1
+
     def update(self, val: List[Tuple[float, float, float]]):
         usage, read_speed, write_speed = val[-1] if val else (0, 0, 0)
-        self.lbl.setText(self.format.format(usage=round(usage),
-                                            write=convert_bytes_unit(write_speed) + '/s',
-                                            read=convert_bytes_unit(read_speed) + '/s'))
+        set_label_text(self.lbl, self.format.format(usage=round(usage),
+                                                    write=convert_bytes_unit(write_speed) + '/s',
+                                                    read=convert_bytes_unit(read_speed) + '/s'))
 
     @classmethod
     def infer_preferred_params(cls) -> Dict[str, Any]:
@@ -116,12 +144,16 @@ class TextIndicator(Indicator, SingleDatasourceAdapter):
     def __init__(self, 
                  format: str = "{value: >3}", 
                  location_in_sample: Optional[str] = None,
-                 val_convert: str = 'none'):
+                 val_convert: str = 'none',
+                 quantile_span: Optional[float] = None):
         """
+        :param format: 可使用{value}以及分位数字段{pNN}，如{p50} {p99} {p999}(即0.999)
+                       分位数由DataStore的流式统计提供，需在sensor的store.quantiles中开启
         :param val_convert: 值转换
                             none                无缩放
                             bytes               1024缩放，并跟上容量单位
                             bytes_per_second    1024缩放，并跟上速度单位
+        :param quantile_span: 分位数的统计时长(s)，None表示sensor配置的整个窗口
         """
         SingleDatasourceAdapter.__init__(self, location_in_sample)
         Indicator.__init__(self)
@@ -129,22 +161,103 @@ class TextIndicator(Indicator, SingleDatasourceAdapter):
         self.format = format
         self.val_convert = val_convert
         self.label = QtWidgets.QLabel(text="")
+        self.span = quantile_span
+        # 格式中的分位数字段 {"p99": 0.99}
+        self.quantile_fields = {}
+        for _, name, _, _ in Formatter().parse(format):
+            q = parse_quantile_field(name)
+            if q is not None:
+                self.quantile_fields[name] = q
+        self.quantiles: Dict[str, Any] = {name: float("nan") for name in self.quantile_fields}
 
         assert val_convert in ["none", "bytes", "bytes_per_second"]
     
     def get_widget(self) -> QtWidgets.QWidget:
         return self.label
     
+    def required_quantiles(self) -> List[float]:
+        return list(self.quantile_fields.values())
+
+    def required_samples(self) -> Optional[int]:
+        return 1
+
+    def quantile_span(self) -> Optional[float]:
+        return self.span
+
+    def update_quantiles(self, quantiles: Dict[float, Optional[float]]):
+        for name, q in self.quantile_fields.items():
+            value = quantiles.get(q)
+            self.quantiles[name] = float("nan") if value is None else self.convert(value)
+
+    def convert(self, value: Any) -> Any:
+        if self.val_convert == 'bytes':
+            return convert_bytes_unit(value)
+        elif self.val_convert == 'bytes_per_second':
+            return convert_bytes_unit(value) + '/s'
+        return value
+
     def update(self, val: List[Any]):
 
         if len(val) == 0:
             return
         
-        value = self.extract_value(val[-1])
+        value = self.convert(self.extract_value(val[-1]))
+        set_label_text(self.label, self.format.format(value=value, **self.quantiles))
+        
 
-        if self.val_convert == 'bytes':
-            value = convert_bytes_unit(value)
-        elif self.val_convert == 'bytes_per_second':
-            value = convert_bytes_unit(value) + '/s'
-        self.label.setText(self.format.format(value=value))
-        
\ No newline at end of file
+class TcpStateIndicator(Indicator):
+    """TCP各状态的连接数，以及与window内最早的sample相比的变化趋势．数据源为TcpStateSensor"""
+
+    ABBREVIATIONS = {
+        "ESTABLISHED": "EST",
+        "TIME_WAIT": "TW",
+        "CLOSE_WAIT": "CW",
+        "SYN_SENT": "SS",
+        "SYN_RECV": "SR",
+        "FIN_WAIT1": "FW1",
+        "FIN_WAIT2": "FW2",
+        "LAST_ACK": "LA",
+        "LISTEN": "LSN",
+    }
+
+    def __init__(self,
+                 states: Optional[List[str]] = None,
+                 port: Optional[int] = None,
+                 format: str = "{name} {count}{trend}"):
+        """
+        :param states: 显示的状态，默认ESTABLISHED与TIME_WAIT
+        :param port: sensor按端口分组(by_port)时显示的端口
+        :param format: 每个状态的格式，可使用{name} {state} {count} {trend}
+        """
+        self.states = states or ["ESTABLISHED", "TIME_WAIT"]
+        self.port = port
+        self.format = format
+        self.lbl = QtWidgets.QLabel(text="")
+
+    def get_widget(self) -> QtWidgets.QWidget:
+        return self.lbl
+
+    def _counts(self, sample: Dict[Any, Any]) -> Dict[str, int]:
+        if self.port is None:
+            return sample
+        return sample.get(self.port) or {}
+
+    def update(self, val: List[Dict[Any, Any]]):
+        if not val:
+            return
+        latest, earliest = self._counts(val[-1]), self._counts(val[0])
+        parts = []
+        for state in self.states:
+            count, previous = latest.get(state, 0), earliest.get(state, 0)
+            trend = "↑" if count > previous else "↓" if count < previous else " "
+            parts.append(self.format.format(name=self.ABBREVIATIONS.get(state, state), state=state,
+                                            count=count, trend=trend))
+        set_label_text(self.lbl, "  ".join(parts))
+
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def infer_preferred_data(cls) -> IndicatorData:
+        return IndicatorData(sensor="mm.sensor.simple.TcpStateSensor", window=30)
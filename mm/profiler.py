@@ -0,0 +1,131 @@
+"""
+统计采样分析器．独立线程按固定间隔读取所有线程的调用栈(sys._current_frames)，不影响被分析的线程
+结果写入两个文件:
+    <name>.collapsed  折叠栈，可直接用于flamegraph.pl / speedscope
+    <name>.txt        各sensor的collect与各indicator的update/paintEvent的耗时汇总
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 按调用方法统计耗时: 方法名 -> 分类
+ATTRIBUTED_METHODS = {
+    "collect": "sensor",
+    "sync_collect": "sensor",
+    "update": "indicator",
+    "paintEvent": "paint",
+}
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _attribute(frame: FrameType) -> Optional[str]:
+    category = ATTRIBUTED_METHODS.get(frame.f_code.co_name)
+    if category is None:
+        return None
+    owner = frame.f_locals.get("self")
+    if owner is None:
+        return None
+    from mm.indicator import Indicator
+    from mm.sensor import Sensor
+    if category == "sensor" and not isinstance(owner, Sensor):
+        return None
+    if category == "indicator" and not isinstance(owner, Indicator):
+        return None
+    return f"{category} {type(owner).__name__}.{frame.f_code.co_name}"
+
+
+class SamplingProfiler(threading.Thread):
+
+    def __init__(self,
+                 output_dir: str,
+                 duration: float = 30.0,
+                 interval: float = 0.005,
+                 on_finished: Optional[Callable[[Path], None]] = None):
+        """
+        :param duration: 采样时长(s)
+        :param interval: 采样间隔(s)
+        :param on_finished: 在分析线程中调用，参数为汇总文件路径
+        """
+        super(SamplingProfiler, self).__init__(name="SamplingProfiler", daemon=True)
+        self.output_dir = Path(output_dir)
+        self.duration = duration
+        self.interval = interval
+        self.on_finished = on_finished
+
+        self.stacks: Counter = Counter()
+        # (线程名, 分类) -> 样本数
+        self.attributed: Counter = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stop_requested = threading.Event()
+
+    def stop(self):
+        self._stop_requested.set()
+
+    def sample(self, thread_names: Dict[int, str]):
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            thread_name = thread_names.get(ident, str(ident))
+            stack: List[str] = []
+            component = None
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                # 取最外层的方法，如collect调用sync_collect时计入collect
+                component = _attribute(frame) or component
+                frame = frame.f_back
+            stack.append(thread_name)
+            self.stacks[";".join(reversed(stack))] += 1
+            if component is not None:
+                self.attributed[(thread_name, component)] += 1
+
+    def run(self) -> None:
+        logger.info(f"profiling for {self.duration}s")
+        started_at = time.monotonic()
+        deadline = started_at + self.duration
+        next_at = started_at
+        while not self._stop_requested.is_set() and time.monotonic() < deadline:
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            self.sample(thread_names)
+            self.samples += 1
+            next_at += self.interval
+            self._stop_requested.wait(max(next_at - time.monotonic(), 0))
+        self.elapsed = time.monotonic() - started_at
+
+        summary = self.write()
+        logger.info(f"profile written to {summary}")
+        if self.on_finished is not None:
+            self.on_finished(summary)
+
+    def summary(self) -> List[str]:
+        lines = [f"duration {self.elapsed:.1f}s, {self.samples} samples, interval {self.interval * 1000:.1f}ms", ""]
+        lines.append(f"{'thread':<24} {'component':<56} {'samples':>8} {'ms/s':>8}")
+        rows: List[Tuple[str, str, int]] = [(t, c, n) for (t, c), n in self.attributed.items()]
+        for thread_name, component, count in sorted(rows, key=lambda r: (r[0], -r[2])):
+            # 每秒在该方法中花费的时间(ms)，包括其中等待IO的时间．按实际采样次数计算，不受采样延迟影响
+            ms_per_s = count / max(self.samples, 1) * 1000
+            lines.append(f"{thread_name:<24} {component:<56} {count:>8} {ms_per_s:>8.1f}")
+        return lines
+
+    def write(self) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        name = time.strftime("mm-%Y%m%d-%H%M%S")
+        with open(self.output_dir / f"{name}.collapsed", "w") as fw:
+            for stack, count in self.stacks.most_common():
+                fw.write(f"{stack} {count}\n")
+        summary = self.output_dir / f"{name}.txt"
+        with open(summary, "w") as fw:
+            fw.write("\n".join(self.summary()) + "\n")
+        return summary
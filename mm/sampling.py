@@ -0,0 +1,156 @@
+import logging
+import math
+from array import array
+from numbers import Number
+from typing import Any, Optional, List, Callable
+
+from mm.sensor import SensorAdaptiveSettings, SensorBurstSettings
+
+logger = logging.getLogger(__name__)
+
+
+def flatten_numbers(sample: Any) -> Optional[List[float]]:
+    """将sample展开为数值列表，无法展开时返回None"""
+    if isinstance(sample, bool):
+        return None
+    if isinstance(sample, Number):
+        return [sample]
+    if isinstance(sample, (tuple, list)):
+        values = []
+        for item in sample:
+            sub = flatten_numbers(item)
+            if sub is None:
+                return None
+            values.extend(sub)
+        return values
+    if isinstance(sample, dict):
+        return flatten_numbers([sample[k] for k in sorted(sample)])
+    return None
+
+
+class AdaptiveInterval:
+    """
+    自适应采样间隔：数值持续落在容差带内时逐步拉长间隔(不超过上限)，数值变化后立即恢复基础间隔
+    """
+
+    def __init__(self, interval: int, settings: SensorAdaptiveSettings):
+        self.base_interval = interval
+        self.max_interval = max(settings.max_interval, interval)
+        self.tolerance = settings.tolerance
+        self.factor = max(settings.factor, 1.0)
+
+        self.current = interval
+        self.reference: Optional[List[float]] = None
+
+    def _is_stable(self, values: Optional[List[float]]) -> bool:
+        if values is None or self.reference is None or len(values) != len(self.reference):
+            return False
+        return all(abs(v - r) <= self.tolerance for v, r in zip(values, self.reference))
+
+    def next_interval(self, sample: Any) -> int:
+        """依据最新sample计算下一次采样前的等待时间(ms)"""
+        values = flatten_numbers(sample)
+        if self._is_stable(values):
+            self.current = min(int(self.current * self.factor), self.max_interval)
+        else:
+            if self.current != self.base_interval:
+                logger.debug(f"signal changed, interval reset to {self.base_interval}ms")
+            self.current = self.base_interval
+            self.reference = values
+        return self.current
+
+
+def _percentile(q: float) -> Callable[[array, int], float]:
+    def stat(values: array, count: int) -> float:
+        ordered = sorted(values[:count])
+        return ordered[max(math.ceil(q * count) - 1, 0)]
+
+    return stat
+
+
+def _compile_stat(name: str) -> Callable[[array, int], float]:
+    if name == "min":
+        return lambda values, count: min(values[:count])
+    if name == "max":
+        return lambda values, count: max(values[:count])
+    if name == "avg":
+        return lambda values, count: sum(values[:count]) / count
+    if name.startswith("p") and name[1:].isdigit() and 0 < int(name[1:]) <= 100:
+        return _percentile(int(name[1:]) / 100)
+    raise ValueError(f"unknown stat '{name}'")
+
+
+def compile_aggregate(name: str) -> Callable[[List[float]], List[float]]:
+    """
+    读取端的聚合，输入为数值列表
+        min / max / avg / sum / pNN  得到单个值，没有数据时为空列表
+        normalize                    按列表内的最小、最大值缩放到0~1，用于图表指示器时需设置其max为1
+    """
+    if name == "normalize":
+        def normalize(values: List[float]) -> List[float]:
+            if not values:
+                return []
+            low, high = min(values), max(values)
+            scale = high - low
+            return [(v - low) / scale if scale else 0.0 for v in values]
+
+        return normalize
+    stat = (lambda values, count: sum(values[:count])) if name == "sum" else _compile_stat(name)
+    return lambda values: [stat(values, len(values))] if values else []
+
+
+class BurstAggregator:
+    """
+    高频子采样的聚合：外层间隔内的读数写入复用的缓冲区，间隔结束时计算统计量
+    缓冲区按字段各一个array，容量按外层间隔/内层间隔预分配
+    """
+
+    def __init__(self, interval: int, settings: SensorBurstSettings):
+        self.interval = max(settings.interval, 1)
+        self.stat_names = list(settings.stats)
+        self.stats = [_compile_stat(name) for name in self.stat_names]
+        self.capacity = max(interval // self.interval + 1, 1)
+
+        self.buffers: List[array] = []
+        self.count = 0
+        # 数据格式：None标量, 否则tuple的宽度
+        self.width: Optional[int] = None
+
+    def reset(self):
+        self.count = 0
+
+    def add(self, sample: Any):
+        values = flatten_numbers(sample)
+        if values is None:
+            logger.warning(f"burst sample is not numeric: {sample!r}")
+            return
+        width = None if isinstance(sample, Number) else len(values)
+        if width != self.width or len(self.buffers) != len(values):
+            # 数据格式变化，丢弃已有读数
+            self.width = width
+            self.buffers = [array("d", [0.0]) * self.capacity for _ in values]
+            self.count = 0
+        if self.count >= self.capacity:
+            # 外层间隔被拉长(如自适应采样)，扩容
+            for buffer in self.buffers:
+                buffer.extend(array("d", [0.0]) * self.capacity)
+            self.capacity *= 2
+        for buffer, value in zip(self.buffers, values):
+            buffer[self.count] = value
+        self.count += 1
+
+    def _aggregate(self, buffer: array) -> Any:
+        if len(self.stats) == 1:
+            return self.stats[0](buffer, self.count)
+        return tuple(stat(buffer, self.count) for stat in self.stats)
+
+    def result(self) -> Any:
+        """
+        :return: 标量sample得到各统计量的tuple，tuple sample得到每个字段各统计量的tuple
+                 只有一个统计量时格式与原sample相同．没有读数时返回None
+        """
+        if not self.count:
+            return None
+        if self.width is None:
+            return self._aggregate(self.buffers[0])
+        return tuple(self._aggregate(buffer) for buffer in self.buffers)
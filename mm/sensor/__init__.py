@@ -1,11 +1,57 @@
+import inspect
+import json
+import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Any, Dict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Callable, List, AsyncIterator, Optional
+
+
+@dataclass
+class SensorQuantileSettings:
+    """
+    :param window: 分位数统计的时间窗口(s)
+    :param buckets: 窗口分桶数，窗口按window / buckets的粒度滑动
+    :param relative_accuracy: 分位数的相对误差
+    :param location_in_sample: 统计sample中的哪个值，None表示sample本身
+    """
+    window: int = 86400
+    buckets: int = 24
+    relative_accuracy: float = 0.01
+    location_in_sample: Optional[str] = None
 
 
 @dataclass
 class SensorStoreSettings:
     length: int
+    # 压缩存储，适用于长时间保留的大量历史数据
+    compression: bool = False
+    # 压缩存储时每个数据块的sample数量
+    block_size: int = 128
+    # 流式分位数统计，不受length限制
+    quantiles: Optional[SensorQuantileSettings] = None
+
+
+@dataclass
+class SensorAdaptiveSettings:
+    """
+    :param max_interval: 拉长后的采样间隔上限(ms)
+    :param tolerance: 容差带，各数值与参考值之差均不超过该值时视为稳定
+    :param factor: 每次稳定采样后间隔的放大倍数
+    """
+    max_interval: int = 30000
+    tolerance: float = 0.5
+    factor: float = 2.0
+
+
+@dataclass
+class SensorBurstSettings:
+    """
+    :param interval: 外层采样间隔内的高频采样间隔(ms)
+    :param stats: 每个外层间隔存储的统计量，min / avg / max / pNN(如p95)
+                  只有一个统计量时存储的数据格式与原sensor相同，否则为按stats顺序排列的tuple
+    """
+    interval: int = 100
+    stats: List[str] = field(default_factory=lambda: ["min", "avg", "max", "p95"])
 
 
 class Sensor(ABC):
@@ -13,10 +59,51 @@ class Sensor(ABC):
 
     DataType = None
 
+    # 各字段的刷新周期(ms)．开销大或变化慢的字段可以按更长的周期刷新，期间使用缓存值
+    field_intervals: Dict[str, int] = {}
+
+    def cached_field(self, name: str, fetch: Callable[[], Any]) -> Any:
+        """按field_intervals[name]的周期调用fetch，未声明周期的字段每次都刷新"""
+        interval = self.field_intervals.get(name)
+        if not interval:
+            return fetch()
+        cache = self.__dict__.setdefault("_field_cache", {})
+        now = time.monotonic()
+        entry = cache.get(name)
+        if entry is None or now - entry[0] >= interval / 1000:
+            entry = cache[name] = (now, fetch())
+        return entry[1]
+
     @abstractmethod
     async def collect(self) -> Any:
         """收集数据"""
 
+    def watch(self) -> Optional[AsyncIterator[Any]]:
+        """
+        事件驱动的sensor返回异步迭代器，每产生一个sample立即存储，与按间隔的collect并行
+        在采集线程的事件循环中调用．None表示只按间隔采集
+        """
+        return None
+
+    def close(self):
+        """采集任务结束(被取消)时在事件循环中调用，释放fd、事件循环中的回调等资源"""
+
+    @classmethod
+    def instance_key(cls, type: str, kwargs: Dict[str, Any]) -> str:
+        """
+        sensor实例的标识: type + 规范化的kwargs．与默认值相同的参数被忽略，没有其他参数时即为type
+        标识相同的配置只采集一次
+        """
+        try:
+            defaults = {name: param.default for name, param in inspect.signature(cls.__init__).parameters.items()
+                        if param.default is not inspect.Parameter.empty}
+        except (TypeError, ValueError):
+            defaults = {}
+        normalized = {k: v for k, v in kwargs.items() if k not in defaults or defaults[k] != v}
+        if not normalized:
+            return type
+        return f"{type}{json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)}"
+
     @classmethod
     @abstractmethod
     def infer_preferred_params(cls) -> Dict[str, Any]:
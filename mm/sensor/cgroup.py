@@ -0,0 +1,232 @@
+"""
+cgroup v2 资源采集，按cgroup(systemd slice / service / 容器)统计，数据格式为 {cgroup路径: 值}
+
+    cgroups: ["system.slice", "user.slice"]   # 指定cgroup
+    cgroups: null, top_k: 5, depth: 2         # 自动发现，每次采集只保留数值最大的top_k个
+
+每个cgroup的文件保持打开，每次采集用pread读入复用的缓冲区(见mm.sensor.procfs.ProcFile)
+"""
+import logging
+import os
+from abc import abstractmethod
+from typing import Dict, Any, Tuple, Optional, List, Iterator
+
+from mm.config import SensorStoreSettings
+from mm.sensor import Sensor
+from mm.sensor.counter import KeyedCounterRate
+from mm.sensor.procfs import ProcFile
+
+logger = logging.getLogger(__name__)
+
+# 混合模式(v1与v2共存)下v2挂载在unified
+CGROUP_ROOTS = ["/sys/fs/cgroup", "/sys/fs/cgroup/unified"]
+
+
+def find_root() -> Optional[str]:
+    for root in CGROUP_ROOTS:
+        if os.path.exists(os.path.join(root, "cgroup.controllers")):
+            return root
+    return None
+
+
+def parse_flat_keyed(data: bytes, key: bytes) -> int:
+    """解析 'key value' 格式的行，如cpu.stat"""
+    start = data.index(key + b" ")
+    end = data.find(b"\n", start)
+    return int(data[start + len(key) + 1:end if end >= 0 else None])
+
+
+def parse_io_stat(data: bytes) -> Tuple[int, int]:
+    """:return: 所有设备合计的(读字节, 写字节)"""
+    read_bytes, write_bytes = 0, 0
+    for line in data.splitlines():
+        for field in line.split()[1:]:
+            if field.startswith(b"rbytes="):
+                read_bytes += int(field[7:])
+            elif field.startswith(b"wbytes="):
+                write_bytes += int(field[7:])
+    return read_bytes, write_bytes
+
+
+def parse_pressure(data: bytes) -> Tuple[float, float]:
+    """:return: (some avg10, full avg10)，cpu.pressure在旧内核中没有full行"""
+    some, full = 0.0, 0.0
+    for line in data.splitlines():
+        kind, _, rest = line.partition(b" ")
+        avg10 = float(rest[rest.index(b"avg10=") + 6:].split(None, 1)[0])
+        if kind == b"some":
+            some = avg10
+        elif kind == b"full":
+            full = avg10
+    return some, full
+
+
+class CgroupSensor(Sensor):
+    """各cgroup v2资源采集的基类．子类声明读取的文件(FILE)并实现parse"""
+
+    FILE = ""
+    # 自动发现的cgroup列表按此周期(ms)刷新
+    field_intervals = {"cgroups": 30000}
+
+    def __init__(self,
+                 cgroups: Optional[List[str]] = None,
+                 top_k: int = 5,
+                 depth: int = 2,
+                 root: Optional[str] = None):
+        """
+        :param cgroups: cgroup路径(相对于root)，如 "system.slice/nginx.service"，None表示自动发现
+        :param top_k: 自动发现时只保留数值最大的top_k个
+        :param depth: 自动发现的目录深度
+        :param root: cgroup v2挂载点，None表示自动查找
+        """
+        self.root = root or find_root()
+        if self.root is None:
+            raise OSError("cgroup v2 is not mounted")
+        self.cgroups = cgroups
+        self.top_k = top_k
+        self.depth = depth
+        self.files: Dict[str, Optional[ProcFile]] = {}
+
+    def discover(self) -> List[str]:
+        if self.cgroups is not None:
+            return list(self.cgroups)
+        return sorted(self._walk(self.root, "", self.depth))
+
+    def _walk(self, path: str, relative: str, depth: int) -> Iterator[str]:
+        if depth <= 0:
+            return
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                name = f"{relative}/{entry.name}" if relative else entry.name
+                yield name
+                yield from self._walk(entry.path, name, depth - 1)
+
+    def _open(self, cgroup: str) -> Optional[ProcFile]:
+        try:
+            return ProcFile(os.path.join(self.root, cgroup, self.FILE), buffer_size=1024)
+        except OSError:
+            # 控制器未启用，或cgroup已不存在
+            return None
+
+    def read_all(self) -> Dict[str, bytes]:
+        """读取所有cgroup的文件，复用已打开的fd"""
+        cgroups = self.cached_field("cgroups", self.discover)
+        for cgroup in set(self.files) - set(cgroups):
+            file = self.files.pop(cgroup)
+            if file is not None:
+                file.close()
+
+        result = {}
+        for cgroup in cgroups:
+            if cgroup not in self.files:
+                self.files[cgroup] = self._open(cgroup)
+            file = self.files[cgroup]
+            if file is None:
+                continue
+            try:
+                result[cgroup] = file.read()
+            except OSError:
+                # cgroup已删除，下次发现时重新打开
+                file.close()
+                del self.files[cgroup]
+        return result
+
+    @abstractmethod
+    def parse(self, data: bytes) -> Any:
+        """解析单个cgroup的文件内容"""
+
+    def rank(self, value: Any) -> float:
+        """自动发现时的排序依据"""
+        return value[0] if isinstance(value, tuple) else value
+
+    def select(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        if self.cgroups is not None or len(values) <= self.top_k:
+            return values
+        top = sorted(values, key=lambda cgroup: self.rank(values[cgroup]), reverse=True)[:self.top_k]
+        return {cgroup: values[cgroup] for cgroup in sorted(top)}
+
+    def sync_collect(self) -> Dict[str, Any]:
+        values = {}
+        for cgroup, data in self.read_all().items():
+            try:
+                values[cgroup] = self.parse(data)
+            except (ValueError, IndexError) as e:
+                logger.debug(f"parse {cgroup}/{self.FILE} failed: {e}")
+        return self.select(self.postprocess(values))
+
+    def postprocess(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        return values
+
+    async def collect(self) -> Dict[str, Any]:
+        # 读取cgroupfs与/proc一样足够快，直接在事件循环中执行
+        return self.sync_collect()
+
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def infer_preferred_store_settings(cls) -> SensorStoreSettings:
+        return SensorStoreSettings(length=100)
+
+
+class CgroupCpuSensor(CgroupSensor):
+    """各cgroup的CPU使用率 {cgroup: 百分比}，以单核为100%"""
+    DataType = Dict[str, float]
+    FILE = "cpu.stat"
+
+    def __init__(self, *args, **kwargs):
+        super(CgroupCpuSensor, self).__init__(*args, **kwargs)
+        self.rate = KeyedCounterRate()
+
+    def parse(self, data: bytes) -> Tuple[int]:
+        return parse_flat_keyed(data, b"usage_usec"),
+
+    def postprocess(self, values: Dict[str, Tuple[int]]) -> Dict[str, float]:
+        return {cgroup: round(rate[0] / 1e4, 1) for cgroup, rate in self.rate.update(values).items()}
+
+
+class CgroupMemorySensor(CgroupSensor):
+    """各cgroup的内存用量 {cgroup: 字节}"""
+    DataType = Dict[str, int]
+    FILE = "memory.current"
+
+    def parse(self, data: bytes) -> int:
+        return int(data)
+
+
+class CgroupIoSensor(CgroupSensor):
+    """各cgroup的读写速率 {cgroup: (读速率, 写速率)}"""
+    DataType = Dict[str, Tuple[float, float]]
+    FILE = "io.stat"
+
+    def __init__(self, *args, **kwargs):
+        super(CgroupIoSensor, self).__init__(*args, **kwargs)
+        self.rate = KeyedCounterRate()
+
+    def parse(self, data: bytes) -> Tuple[int, int]:
+        return parse_io_stat(data)
+
+    def postprocess(self, values: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[float, float]]:
+        return self.rate.update(values)
+
+    def rank(self, value: Tuple[float, float]) -> float:
+        return value[0] + value[1]
+
+
+class CgroupPressureSensor(CgroupSensor):
+    """各cgroup的PSI {cgroup: (some avg10, full avg10)}"""
+    DataType = Dict[str, Tuple[float, float]]
+
+    def __init__(self, resource: str = "memory", *args, **kwargs):
+        """:param resource: memory / cpu / io"""
+        assert resource in ["memory", "cpu", "io"]
+        self.FILE = f"{resource}.pressure"
+        super(CgroupPressureSensor, self).__init__(*args, **kwargs)
+
+    def parse(self, data: bytes) -> Tuple[float, float]:
+        return parse_pressure(data)
@@ -0,0 +1,63 @@
+import time
+from typing import Sequence, List, Optional, Dict, Tuple
+
+
+class CounterRate:
+    """
+    累计计数器 -> 每秒速率．使用单调时钟，一次计算一组计数器
+    计数器回退时，若旧值接近上限则视为回绕，否则视为重置(该计数器本次速率为0)
+    """
+
+    def __init__(self, counter_bits: int = 64):
+        self.modulus = 1 << counter_bits
+        self.last: List[Optional[int]] = []
+        self.last_at = 0.0
+
+    def _delta(self, value: int, last: int) -> int:
+        delta = value - last
+        if delta >= 0:
+            return delta
+        # 回绕：旧值位于计数范围的高1/4，新值位于低1/4
+        if last >= self.modulus - (self.modulus >> 2) and value < (self.modulus >> 2):
+            return delta + self.modulus
+        return 0
+
+    def update(self, values: Sequence[int], now: Optional[float] = None) -> List[float]:
+        """
+        :param values: 本次读取的计数器值，顺序需与上次一致；长度变化时全部重新开始计算
+        :return: 各计数器的每秒速率，首次调用返回0
+        """
+        now = time.monotonic() if now is None else now
+        last, duration = self.last, now - self.last_at
+        self.last, self.last_at = list(values), now
+
+        if len(last) != len(values) or duration <= 0:
+            return [0.0] * len(values)
+        return [0.0 if l is None else self._delta(v, l) / duration for v, l in zip(values, last)]
+
+
+class KeyedCounterRate:
+    """
+    按key分组的计数器，如 {设备: (读字节, 写字节)}．key集合不变时整体一次计算
+    新出现的key首次速率为0，消失的key被丢弃
+    """
+
+    def __init__(self, counter_bits: int = 64):
+        self.rate = CounterRate(counter_bits)
+        self.keys: List[str] = []
+        self.width = 0
+
+    def update(self, counters: Dict[str, Sequence[int]],
+               now: Optional[float] = None) -> Dict[str, Tuple[float, ...]]:
+        keys = list(counters)
+        width = len(counters[keys[0]]) if keys else 0
+
+        if keys != self.keys or width != self.width:
+            # 按key保留已有的上次值
+            previous = {} if width != self.width else {
+                key: self.rate.last[i * width:(i + 1) * width] for i, key in enumerate(self.keys)}
+            self.rate.last = [v for key in keys for v in (previous.get(key) or [None] * width)]
+            self.keys, self.width = keys, width
+
+        rates = self.rate.update([v for key in keys for v in counters[key]], now)
+        return {key: tuple(rates[i * width:(i + 1) * width]) for i, key in enumerate(keys)}
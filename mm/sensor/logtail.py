@@ -0,0 +1,292 @@
+"""
+增量读取日志文件并统计正则匹配次数 {名称: (本周期匹配数, 每秒匹配数)}
+
+    kwargs:
+      paths: [/var/log/app/app.log]
+      patterns: {error: "ERROR|Traceback", slow: "took \\d{4,}ms"}
+
+Linux下使用inotify在文件写入时立即读取新增的内容，采集时只汇总计数；inotify不可用时每次采集通过stat检查
+文件被轮转(inode变化)时读完旧文件再从头读取新文件，被截断时从头读取
+数据量大时分块读取，每块之后让出事件循环
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import re
+import struct
+import time
+from typing import Dict, Any, Tuple, Optional, List, Pattern, Set
+
+from mm.config import SensorStoreSettings
+from mm.sensor import Sensor
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """通过ctypes调用inotify，不可用时抛出OSError"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not supported")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch {path} failed")
+        return wd
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """:return: [(wd, mask, 文件名)]"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class FileTail:
+    """单个文件的读取位置与未完成的行"""
+
+    def __init__(self, path: str, patterns: List[Pattern], from_start: bool, max_line: int):
+        self.path = path
+        self.patterns = patterns
+        self.max_line = max_line
+        self.fd = -1
+        self.inode: Optional[Tuple[int, int]] = None
+        self.offset = 0
+        self.partial = b""
+        # 文件已被轮转，读完旧文件后重新打开
+        self.rotated = False
+        self.counts = [0] * len(patterns)
+        self._open(from_start)
+
+    def _open(self, from_start: bool):
+        try:
+            fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        except FileNotFoundError:
+            return
+        st = os.fstat(fd)
+        self.fd, self.inode = fd, (st.st_dev, st.st_ino)
+        self.offset = 0 if from_start else st.st_size
+        self.partial = b""
+        self.rotated = False
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def check(self):
+        """检查文件是否被创建、轮转或截断"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # 已被移走，继续读完旧文件
+            self.rotated = self.fd >= 0
+            return
+        if self.fd < 0:
+            # 新出现的文件从头读取
+            self._open(from_start=True)
+        elif (st.st_dev, st.st_ino) != self.inode:
+            self.rotated = True
+        elif st.st_size < self.offset:
+            logger.info(f"{self.path} is truncated")
+            self.offset = 0
+            self.partial = b""
+
+    def read_chunk(self, size: int) -> int:
+        """:return: 读取的字节数，0表示没有新数据"""
+        if self.fd < 0:
+            return 0
+        data = os.pread(self.fd, size, self.offset)
+        if not data:
+            if self.rotated:
+                logger.info(f"{self.path} is rotated")
+                self._scan(b"\n")
+                self.close()
+                self._open(from_start=True)
+                return self.read_chunk(size)
+            return 0
+        self.offset += len(data)
+        self._scan(data)
+        return len(data)
+
+    def _scan(self, data: bytes):
+        data = self.partial + data
+        end = data.rfind(b"\n")
+        if end < 0:
+            if len(data) <= self.max_line:
+                self.partial = data
+                return
+            # 超长的行按完整的行处理
+            end = len(data) - 1
+        complete, self.partial = data[:end + 1], data[end + 1:]
+        for idx, pattern in enumerate(self.patterns):
+            self.counts[idx] += sum(1 for _ in pattern.finditer(complete))
+
+
+class LogTailSensor(Sensor):
+    DataType = Dict[str, Tuple[int, float]]
+
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self,
+                 paths: List[str],
+                 patterns: Dict[str, str],
+                 from_start: bool = False,
+                 chunk_size: int = 65536,
+                 max_bytes: int = 4 * 2 ** 20,
+                 inotify: bool = True):
+        """
+        :param patterns: {名称: 正则}，按行匹配(re.MULTILINE)
+        :param from_start: 从文件开头读取，默认只统计启动后新增的内容
+        :param chunk_size: 单次读取的字节数，每读取一块让出一次事件循环
+        :param max_bytes: 单次处理的字节数上限，超出时剩余的数据在新的任务中继续读取
+        :param inotify: False时不使用inotify，每次采集时检查文件
+        """
+        self.names = list(patterns)
+        compiled = [re.compile(patterns[name].encode(), re.MULTILINE) for name in self.names]
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.tails = [FileTail(os.path.expanduser(path), compiled, from_start, max_line=chunk_size)
+                      for path in paths]
+
+        self.use_inotify = inotify
+        self.inotify: Optional[Inotify] = None
+        # wd -> 关注的文件名
+        self.watched: Dict[int, set] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # 尚未结束的读取任务，close时取消
+        self.tasks: Set[asyncio.Task] = set()
+        self._consuming = False
+        self._dirty = False
+        self.last_at = time.monotonic()
+
+    def _start_inotify(self, loop: asyncio.AbstractEventLoop):
+        self.use_inotify = False
+        try:
+            inotify = Inotify()
+        except OSError as e:
+            logger.warning(f"inotify unavailable, fallback to polling: {e}")
+            return
+        directories: Dict[str, set] = {}
+        for tail in self.tails:
+            directories.setdefault(os.path.dirname(os.path.abspath(tail.path)), set()).add(
+                os.path.basename(tail.path))
+        try:
+            for directory, names in directories.items():
+                self.watched[inotify.add_watch(directory, self.WATCH_MASK)] = names
+        except OSError as e:
+            logger.warning(f"inotify unavailable, fallback to polling: {e}")
+            inotify.close()
+            self.watched = {}
+            return
+        self.inotify, self.loop = inotify, loop
+        loop.add_reader(inotify.fd, self._on_inotify, loop)
+
+    def _on_inotify(self, loop: asyncio.AbstractEventLoop):
+        events = self.inotify.read_events()
+        if any(name in self.watched.get(wd, ()) for wd, _, name in events):
+            self._spawn_consume(loop)
+
+    def _spawn_consume(self, loop: asyncio.AbstractEventLoop):
+        task = loop.create_task(self.consume())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def consume(self):
+        """读取所有文件的新增内容"""
+        if self._consuming:
+            self._dirty = True
+            return
+        self._consuming = True
+        try:
+            budget = self.max_bytes
+            while True:
+                self._dirty = False
+                for tail in self.tails:
+                    tail.check()
+                    while budget > 0:
+                        size = tail.read_chunk(min(self.chunk_size, budget))
+                        if not size:
+                            break
+                        budget -= size
+                        # 大量数据时让出事件循环，不阻塞其他sensor
+                        await asyncio.sleep(0)
+                if not self._dirty or budget <= 0:
+                    break
+        finally:
+            self._consuming = False
+        if budget <= 0:
+            # 超出单次上限，剩余的数据在新的任务中继续读取
+            self._spawn_consume(asyncio.get_running_loop())
+
+    async def collect(self) -> DataType:
+        if self.use_inotify:
+            self._start_inotify(asyncio.get_running_loop())
+        await self.consume()
+
+        now = time.monotonic()
+        duration = max(now - self.last_at, 1e-9)
+        self.last_at = now
+        result = {}
+        for idx, name in enumerate(self.names):
+            count = sum(tail.counts[idx] for tail in self.tails)
+            result[name] = (count, count / duration)
+        for tail in self.tails:
+            tail.counts = [0] * len(self.names)
+        return result
+
+    def close(self):
+        if self.inotify is not None:
+            if self.loop is not None and not self.loop.is_closed():
+                self.loop.remove_reader(self.inotify.fd)
+            self.inotify.close()
+            self.inotify = None
+        for task in list(self.tasks):
+            task.cancel()
+        for tail in self.tails:
+            tail.close()
+
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {"paths": [], "patterns": {"error": "ERROR"}}
+
+    @classmethod
+    def infer_preferred_store_settings(cls) -> SensorStoreSettings:
+        return SensorStoreSettings(length=100)
@@ -0,0 +1,253 @@
+"""
+Linux下直接读取/proc的快速采集后端．文件保持打开，每次使用pread从偏移0读入复用的缓冲区，只解析需要的字段
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from typing import Dict, Tuple, Optional, Type, TypeVar, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+SECTOR_SIZE = 512
+
+
+def available() -> bool:
+    return sys.platform.startswith("linux") and hasattr(os, "preadv") and os.path.exists("/proc/stat")
+
+
+class ProcFile:
+    PATH = ""
+
+    def __init__(self, path: Optional[str] = None, buffer_size: int = 4096):
+        self.path = path or self.PATH
+        self.fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        self.buffer = bytearray(buffer_size)
+
+    def read(self) -> bytes:
+        # seq_file实现的/proc文件每次最多返回一页，读到返回0为止
+        offset = 0
+        while True:
+            if offset == len(self.buffer):
+                # 缓冲区不足以容纳整个文件
+                buffer = bytearray(len(self.buffer) * 2)
+                buffer[:offset] = self.buffer
+                self.buffer = buffer
+            size = os.preadv(self.fd, [memoryview(self.buffer)[offset:]], offset)
+            if not size:
+                return bytes(memoryview(self.buffer)[:offset])
+            offset += size
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ProcStat(ProcFile):
+    PATH = "/proc/stat"
+
+    def __init__(self, *args, **kwargs):
+        super(ProcStat, self).__init__(*args, **kwargs)
+        self.last_busy = 0
+        # None表示尚未调用过cpu_percent
+        self.last_total: Optional[int] = None
+
+    def cpu_times(self) -> Tuple[int, int]:
+        """:return: (busy, total) jiffies，与psutil一致，不含guest时间，idle包含iowait"""
+        data = self.read()
+        fields = data[:data.index(b"\n")].split()[1:9]
+        times = [int(v) for v in fields]
+        total = sum(times)
+        return total - times[3] - (times[4] if len(times) > 4 else 0), total
+
+    def cpu_percent(self) -> float:
+        """自上次调用以来的CPU使用率．与psutil.cpu_percent()一致，首次调用只记录基准并返回0.0"""
+        busy, total = self.cpu_times()
+        last_busy, last_total = self.last_busy, self.last_total
+        self.last_busy, self.last_total = busy, total
+        if last_total is None:
+            return 0.0
+        busy_delta, total_delta = busy - last_busy, total - last_total
+        if total_delta <= 0:
+            return 0.0
+        return round(max(busy_delta, 0) / total_delta * 100, 1)
+
+
+class ProcMeminfo(ProcFile):
+    PATH = "/proc/meminfo"
+
+    def memory_percent(self) -> float:
+        """与psutil.virtual_memory().percent一致: (total - available) / total"""
+        data = self.read()
+        total = int(data[data.index(b"MemTotal:") + 9:data.index(b"kB", data.index(b"MemTotal:"))])
+        start = data.find(b"MemAvailable:")
+        if start < 0:
+            # 旧内核没有MemAvailable
+            available_kb = sum(
+                int(data[data.index(key) + len(key):data.index(b"kB", data.index(key))])
+                for key in [b"MemFree:", b"Buffers:", b"\nCached:"]
+            )
+        else:
+            available_kb = int(data[start + 13:data.index(b"kB", start)])
+        if total <= 0:
+            return 0.0
+        return round((total - available_kb) / total * 100, 1)
+
+
+class ProcDiskstats(ProcFile):
+    PATH = "/proc/diskstats"
+
+    def __init__(self, *args, **kwargs):
+        super(ProcDiskstats, self).__init__(*args, **kwargs)
+        self._is_storage: Dict[bytes, bool] = {}
+
+    def _is_storage_device(self, name: bytes) -> bool:
+        """与psutil一致，汇总时只统计/sys/block下的设备(不含分区)"""
+        is_storage = self._is_storage.get(name)
+        if is_storage is None:
+            is_storage = self._is_storage[name] = os.path.exists(
+                "/sys/block/{}".format(name.decode().replace("/", "!")))
+        return is_storage
+
+    def counters(self) -> Dict[str, Tuple[int, int]]:
+        """:return: {设备名: (读字节, 写字节)}"""
+        result = {}
+        for line in self.read().splitlines():
+            fields = line.split()
+            if len(fields) < 10:
+                continue
+            result[fields[2].decode()] = (int(fields[5]) * SECTOR_SIZE, int(fields[9]) * SECTOR_SIZE)
+        return result
+
+    def total(self) -> Tuple[int, int]:
+        read_bytes, write_bytes = 0, 0
+        for line in self.read().splitlines():
+            fields = line.split()
+            if len(fields) < 10 or not self._is_storage_device(fields[2]):
+                continue
+            read_bytes += int(fields[5])
+            write_bytes += int(fields[9])
+        return read_bytes * SECTOR_SIZE, write_bytes * SECTOR_SIZE
+
+
+class ProcNetDev(ProcFile):
+    PATH = "/proc/net/dev"
+
+    def counters(self) -> Dict[str, Tuple[int, int]]:
+        """:return: {网卡名: (发送字节, 接收字节)}"""
+        result = {}
+        # 前两行为表头
+        for line in self.read().splitlines()[2:]:
+            name, _, rest = line.partition(b":")
+            fields = rest.split()
+            result[name.strip().decode()] = (int(fields[8]), int(fields[0]))
+        return result
+
+    def total(self) -> Tuple[int, int]:
+        sent, recv = 0, 0
+        for sent_bytes, recv_bytes in self.counters().values():
+            sent += sent_bytes
+            recv += recv_bytes
+        return sent, recv
+
+
+TCP_STATES = {
+    b"01": "ESTABLISHED",
+    b"02": "SYN_SENT",
+    b"03": "SYN_RECV",
+    b"04": "FIN_WAIT1",
+    b"05": "FIN_WAIT2",
+    b"06": "TIME_WAIT",
+    b"07": "CLOSE",
+    b"08": "CLOSE_WAIT",
+    b"09": "LAST_ACK",
+    b"0A": "LISTEN",
+    b"0B": "CLOSING",
+    b"0C": "NEW_SYN_RECV",
+}
+
+
+class ProcNetTcp(ProcFile):
+    """
+    /proc/net/tcp与/proc/net/tcp6．连接数可能达到数万，按块顺序读取，每块用正则一次匹配出所有状态，不逐行解析
+    seq_file在非顺序的偏移上读取时需要从头遍历，因此不使用pread，而是lseek到0后顺序read
+    """
+    PATH = "/proc/net/tcp"
+    PATH6 = "/proc/net/tcp6"
+
+    # 以换行符开头(而不是^与re.MULTILINE)，正则引擎可以快速跳到下一行，速度约为3倍
+    STATE_RE = re.compile(rb"\n *\d+: \S+ \S+ ([0-9A-F]{2}) ")
+    PORT_STATE_RE = re.compile(rb"\n *\d+: [0-9A-F]+:([0-9A-F]{4}) \S+ ([0-9A-F]{2}) ")
+
+    def __init__(self, path: Optional[str] = None, buffer_size: int = 256 * 1024, ipv6: bool = True):
+        super(ProcNetTcp, self).__init__(path, buffer_size)
+        self.fds: List[int] = [self.fd]
+        if ipv6 and os.path.exists(self.PATH6):
+            self.fds.append(os.open(self.PATH6, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0)))
+
+    def stream(self, fd: int) -> Iterator[bytes]:
+        """按块读取，每块只包含完整的行，并以上一行末尾的换行符开头(第一块以表头开头)"""
+        os.lseek(fd, 0, os.SEEK_SET)
+        view = memoryview(self.buffer)
+        rest = b""
+        while True:
+            size = os.readv(fd, [self.buffer])
+            if not size:
+                break
+            chunk = rest + view[:size].tobytes()
+            end = chunk.rfind(b"\n")
+            if end <= 0:
+                # 还没有完整的行(开头的换行符属于上一行)
+                rest = chunk
+                continue
+            rest = chunk[end:]
+            yield chunk[:end]
+        if rest:
+            yield rest
+
+    def counts(self, by_port: bool = False) -> Counter:
+        """
+        :return: by_port为False时 {状态码: 数量}，如{b"01": 10}；否则 {(本地端口, 状态码): 数量}，端口为16进制
+        """
+        counter: Counter = Counter()
+        regex = self.PORT_STATE_RE if by_port else self.STATE_RE
+        for fd in self.fds:
+            for chunk in self.stream(fd):
+                counter.update(regex.findall(chunk))
+        return counter
+
+    def close(self):
+        for fd in getattr(self, "fds", [])[1:]:
+            os.close(fd)
+        self.fds = []
+        super(ProcNetTcp, self).close()
+
+
+T = TypeVar("T", bound=ProcFile)
+
+
+def open_backend(backend: str, proc_cls: Type[T]) -> Optional[T]:
+    """
+    :param backend: auto 优先使用/proc，不可用时回退到psutil; procfs 强制使用/proc; psutil 不使用/proc
+    :return: None表示使用psutil
+    """
+    assert backend in ["auto", "procfs", "psutil"]
+    if backend == "psutil":
+        return None
+    if backend == "auto" and not available():
+        return None
+    try:
+        return proc_cls()
+    except OSError as e:
+        if backend == "procfs":
+            raise
+        logger.warning(f"{proc_cls.PATH} unavailable, fallback to psutil: {e}")
+        return None
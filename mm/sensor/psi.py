@@ -0,0 +1,129 @@
+"""
+PSI(Pressure Stall Information)事件驱动采集
+
+向/proc/pressure/<resource>(或cgroup的<resource>.pressure)写入触发器后，内核在窗口内累计停顿超过阈值时
+产生POLLPRI事件．触发器fd注册到epoll，epoll fd再注册到采集线程的事件循环，平时不产生任何唤醒
+事件发生时立即采集一次并存储；按SensorSettings.interval的低频采样仍然保留，用于绘制图表
+"""
+import asyncio
+import logging
+import os
+import select
+from typing import Dict, Any, Tuple, Optional, AsyncIterator
+
+from mm.config import SensorStoreSettings
+from mm.sensor import Sensor
+from mm.sensor.cgroup import parse_pressure, find_root
+from mm.sensor.procfs import ProcFile
+
+logger = logging.getLogger(__name__)
+
+
+class PressureSensor(Sensor):
+    """(some avg10, full avg10)，单位%"""
+    DataType = Tuple[float, float]
+
+    def __init__(self,
+                 resource: str = "memory",
+                 kind: str = "some",
+                 threshold: int = 150,
+                 window: int = 2000,
+                 cgroup: Optional[str] = None):
+        """
+        :param resource: memory / cpu / io
+        :param kind: some / full，触发器统计的停顿类型
+        :param threshold: window内累计停顿超过threshold(ms)时触发
+        :param window: 触发窗口(ms)，内核要求500~10000，没有CAP_SYS_RESOURCE时需为2000的整数倍
+        :param cgroup: cgroup路径(相对于cgroup v2挂载点)，None表示整机
+        """
+        assert resource in ["memory", "cpu", "io"]
+        assert kind in ["some", "full"]
+        if cgroup is None:
+            self.path = f"/proc/pressure/{resource}"
+        else:
+            root = find_root()
+            if root is None:
+                raise OSError("cgroup v2 is not mounted")
+            self.path = os.path.join(root, cgroup, f"{resource}.pressure")
+        self.trigger = f"{kind} {threshold * 1000} {window * 1000}"
+        self.procfs = ProcFile(self.path, buffer_size=256)
+
+        self.trigger_fd = -1
+        self.epoll: Optional[select.epoll] = None
+        # 触发次数
+        self.events = 0
+
+    def sync_collect(self) -> DataType:
+        return parse_pressure(self.procfs.read())
+
+    async def collect(self) -> DataType:
+        return self.sync_collect()
+
+    def _register_trigger(self) -> bool:
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        except OSError as e:
+            logger.warning(f"cannot open {self.path} for trigger, polling only: {e}")
+            return False
+        try:
+            # 触发器以\0结尾
+            os.write(fd, self.trigger.encode() + b"\0")
+            epoll = select.epoll()
+            epoll.register(fd, select.EPOLLPRI)
+        except OSError as e:
+            os.close(fd)
+            logger.warning(f"register PSI trigger '{self.trigger}' on {self.path} failed, polling only: {e}")
+            return False
+        self.trigger_fd, self.epoll = fd, epoll
+        return True
+
+    def _unregister_trigger(self):
+        if self.epoll is not None:
+            self.epoll.close()
+            self.epoll = None
+        if self.trigger_fd >= 0:
+            os.close(self.trigger_fd)
+            self.trigger_fd = -1
+
+    def watch(self) -> Optional[AsyncIterator[DataType]]:
+        if not hasattr(select, "epoll"):
+            return None
+        return self._events()
+
+    async def _events(self) -> AsyncIterator[DataType]:
+        # 注册与清理都在生成器内：未开始迭代就被关闭时不会泄漏fd
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Optional[Tuple[float, float]]]" = asyncio.Queue()
+
+        def on_ready():
+            for _, event in self.epoll.poll(0):
+                if event & select.EPOLLERR:
+                    # 触发器已失效，如cgroup被删除
+                    logger.warning(f"PSI trigger on {self.path} is gone")
+                    queue.put_nowait(None)
+                    return
+            self.events += 1
+            queue.put_nowait(self.sync_collect())
+
+        try:
+            if not self._register_trigger():
+                return
+            loop.add_reader(self.epoll.fileno(), on_ready)
+            logger.debug(f"PSI trigger '{self.trigger}' registered on {self.path}")
+            while True:
+                val = await queue.get()
+                if val is None:
+                    return
+                yield val
+        finally:
+            if self.epoll is not None:
+                loop.remove_reader(self.epoll.fileno())
+            self._unregister_trigger()
+
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {"resource": "memory"}
+
+    @classmethod
+    def infer_preferred_store_settings(cls) -> SensorStoreSettings:
+        return SensorStoreSettings(length=100)
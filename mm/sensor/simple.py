@@ -1,20 +1,31 @@
 import asyncio
-from datetime import datetime
-from typing import Dict, Any, Tuple
+from collections import Counter
+from typing import Dict, Any, Tuple, Optional, List
 
 import psutil
 
 from mm.config import SensorStoreSettings
 from mm.sensor import Sensor
+from mm.sensor.counter import CounterRate, KeyedCounterRate
+from mm.sensor.procfs import open_backend, ProcStat, ProcMeminfo, ProcDiskstats, ProcNetDev, ProcNetTcp, TCP_STATES
 
 
 class CpuSensor(Sensor):
     DataType = float
 
+    def __init__(self, backend: str = "auto"):
+        """:param backend: auto / procfs / psutil，见 mm.sensor.procfs.open_backend"""
+        self.procfs = open_backend(backend, ProcStat)
+
     def sync_collect(self) -> float:
+        if self.procfs is not None:
+            return self.procfs.cpu_percent()
         return psutil.cpu_percent()
 
     async def collect(self) -> Any:
+        # 读取/proc足够快，直接在事件循环中执行，省去线程池切换
+        if self.procfs is not None:
+            return self.sync_collect()
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, self.sync_collect)
 
@@ -30,10 +41,17 @@ class CpuSensor(Sensor):
 class MemorySensor(Sensor):
     DataType = float
 
+    def __init__(self, backend: str = "auto"):
+        self.procfs = open_backend(backend, ProcMeminfo)
+
     def sync_collect(self) -> float:
+        if self.procfs is not None:
+            return self.procfs.memory_percent()
         return psutil.virtual_memory().percent
 
     async def collect(self) -> Any:
+        if self.procfs is not None:
+            return self.sync_collect()
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, self.sync_collect)
 
@@ -49,28 +67,26 @@ class MemorySensor(Sensor):
 class DiskSensor(Sensor):
     DataType = Tuple[float, float, float]
 
-    def __init__(self, partition: str = "/"):
-        self.partition = partition
+    # disk_usage(statvfs)在网络挂载点上可能较慢，且变化缓慢
+    field_intervals = {"usage": 30000}
 
-        self.last_read_bytes = -1
-        self.last_write_bytes = -1
-        self.last_collect_at = datetime.now()
+    def __init__(self, partition: str = "/", field_intervals: Optional[Dict[str, int]] = None, backend: str = "auto"):
+        """:param field_intervals: 覆盖各字段的刷新周期(ms)，如 {"usage": 60000}"""
+        self.partition = partition
+        self.rate = CounterRate()
+        if field_intervals:
+            self.field_intervals = dict(self.field_intervals, **field_intervals)
+        self.procfs = open_backend(backend, ProcDiskstats)
 
     def sync_collect(self) -> DataType:
-        usage = psutil.disk_usage(self.partition).percent
-        read_speed, write_speed = 0, 0
+        usage = self.cached_field("usage", lambda: psutil.disk_usage(self.partition).percent)
 
-        info = psutil.disk_io_counters()
-        curr_date = datetime.now()
-
-        if self.last_read_bytes != -1 and self.last_write_bytes != -1:
-            duration = (curr_date - self.last_collect_at).total_seconds()
-            read_speed = (info.read_bytes - self.last_read_bytes) / duration
-            write_speed = (info.write_bytes - self.last_write_bytes) / duration
-
-        self.last_read_bytes = info.read_bytes
-        self.last_write_bytes = info.write_bytes
-        self.last_collect_at = curr_date
+        if self.procfs is not None:
+            counters = self.procfs.total()
+        else:
+            info = psutil.disk_io_counters()
+            counters = info.read_bytes, info.write_bytes
+        read_speed, write_speed = self.rate.update(counters)
 
         return usage, read_speed, write_speed
 
@@ -92,28 +108,153 @@ class DiskSensor(Sensor):
 class NetworkSensor(Sensor):
     DataType = Tuple[float, float]
 
-    def __init__(self):
-        self.last_bytes_recv = -1
-        self.last_bytes_sent = -1
-        self.last_collect_at = datetime.now()
+    def __init__(self, backend: str = "auto"):
+        self.rate = CounterRate()
+        self.procfs = open_backend(backend, ProcNetDev)
 
     def sync_collect(self) -> DataType:
-        send_rate, recv_rate = 0, 0
-        info = psutil.net_io_counters()
-        curr_datetime = datetime.now()
+        if self.procfs is not None:
+            counters = self.procfs.total()
+        else:
+            info = psutil.net_io_counters()
+            counters = info.bytes_sent, info.bytes_recv
+        send_rate, recv_rate = self.rate.update(counters)
 
-        if self.last_bytes_recv != -1 and self.last_bytes_sent != -1:
-            duration = (curr_datetime - self.last_collect_at).total_seconds()
-            send_rate = (info.bytes_sent - self.last_bytes_sent) / duration
-            recv_rate = (info.bytes_recv - self.last_bytes_recv) / duration
+        return send_rate, recv_rate
 
-        self.last_collect_at = curr_datetime
-        self.last_bytes_recv = info.bytes_recv
-        self.last_bytes_sent = info.bytes_sent
+    async def collect(self) -> DataType:
+        if self.procfs is not None:
+            return self.sync_collect()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.sync_collect)
 
-        return send_rate, recv_rate
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def infer_preferred_store_settings(cls) -> SensorStoreSettings:
+        return SensorStoreSettings(length=100)
+
+
+class DiskDeviceSensor(Sensor):
+    """各磁盘设备的读写速率 {设备名: (读速率, 写速率)}，每次采集只调用一次psutil"""
+    DataType = Dict[str, Tuple[float, float]]
+
+    def __init__(self, devices: Optional[List[str]] = None, backend: str = "auto"):
+        """:param devices: 只采集指定设备，None表示全部"""
+        self.devices = set(devices) if devices else None
+        self.rate = KeyedCounterRate()
+        self.procfs = open_backend(backend, ProcDiskstats)
+
+    def sync_collect(self) -> DataType:
+        if self.procfs is not None:
+            counters = self.procfs.counters()
+        else:
+            counters = {name: (info.read_bytes, info.write_bytes)
+                        for name, info in (psutil.disk_io_counters(perdisk=True) or {}).items()}
+        return self.rate.update({
+            name: value
+            for name, value in counters.items()
+            if self.devices is None or name in self.devices
+        })
+
+    async def collect(self) -> DataType:
+        if self.procfs is not None:
+            return self.sync_collect()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.sync_collect)
+
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def infer_preferred_store_settings(cls) -> SensorStoreSettings:
+        return SensorStoreSettings(length=100)
+
+
+class NetworkInterfaceSensor(Sensor):
+    """各网卡的收发速率 {网卡名: (发送速率, 接收速率)}，每次采集只调用一次psutil"""
+    DataType = Dict[str, Tuple[float, float]]
+
+    def __init__(self, interfaces: Optional[List[str]] = None, backend: str = "auto"):
+        """:param interfaces: 只采集指定网卡，None表示全部"""
+        self.interfaces = set(interfaces) if interfaces else None
+        self.rate = KeyedCounterRate()
+        self.procfs = open_backend(backend, ProcNetDev)
+
+    def sync_collect(self) -> DataType:
+        if self.procfs is not None:
+            counters = self.procfs.counters()
+        else:
+            counters = {name: (info.bytes_sent, info.bytes_recv)
+                        for name, info in (psutil.net_io_counters(pernic=True) or {}).items()}
+        return self.rate.update({
+            name: value
+            for name, value in counters.items()
+            if self.interfaces is None or name in self.interfaces
+        })
+
+    async def collect(self) -> DataType:
+        if self.procfs is not None:
+            return self.sync_collect()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.sync_collect)
+
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def infer_preferred_store_settings(cls) -> SensorStoreSettings:
+        return SensorStoreSettings(length=100)
+
+
+class TcpStateSensor(Sensor):
+    """
+    按状态统计TCP连接数 {状态: 数量}，如 {"ESTABLISHED": 120, "TIME_WAIT": 3000, ...}
+    by_port为True时按本地端口分组 {端口: {状态: 数量}}
+    与psutil.net_connections不同，不查找连接所属的进程，也不为每个连接创建对象
+    """
+    DataType = Dict[Any, Any]
+
+    def __init__(self, local_ports: Optional[List[int]] = None, by_port: bool = False, backend: str = "auto"):
+        """
+        :param local_ports: 只统计本地端口在其中的连接，None表示全部
+        :param by_port: 按本地端口分组
+        """
+        self.local_ports = set(local_ports) if local_ports else None
+        self.by_port = by_port
+        self.procfs = open_backend(backend, ProcNetTcp)
+
+    def _counts(self) -> Counter:
+        """:return: {(本地端口, 状态): 数量}，不需要端口时端口为None"""
+        with_port = self.by_port or self.local_ports is not None
+        if self.procfs is not None:
+            counts = self.procfs.counts(by_port=with_port)
+            if not with_port:
+                return Counter({(None, TCP_STATES.get(state, "NONE")): n for state, n in counts.items()})
+            return Counter({(int(port, 16), TCP_STATES.get(state, "NONE")): n for (port, state), n in counts.items()})
+        return Counter((c.laddr.port if with_port and c.laddr else None, c.status)
+                       for c in psutil.net_connections(kind="tcp"))
+
+    def sync_collect(self) -> DataType:
+        states = {state: 0 for state in TCP_STATES.values()}
+        if not self.by_port:
+            for (port, state), n in self._counts().items():
+                if self.local_ports is None or port in self.local_ports:
+                    states[state] = states.get(state, 0) + n
+            return states
+        ports: Dict[int, Dict[str, int]] = {port: dict(states) for port in (self.local_ports or [])}
+        for (port, state), n in self._counts().items():
+            if self.local_ports is None or port in self.local_ports:
+                counts = ports.setdefault(port, dict(states))
+                counts[state] = counts.get(state, 0) + n
+        return ports
 
     async def collect(self) -> DataType:
+        # 连接数多时解析耗时较长，始终在线程池中执行
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, self.sync_collect)
 
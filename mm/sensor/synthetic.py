@@ -0,0 +1,82 @@
+import asyncio
+import math
+import random
+import time
+from typing import Dict, Any, Union, Tuple
+
+from mm.config import SensorStoreSettings
+from mm.sensor import Sensor
+
+
+class SyntheticSensor(Sensor):
+    """
+    合成数据，用于压力测试．不产生任何系统调用(除模拟的延迟外)
+    """
+    DataType = Union[float, Tuple[float, ...]]
+
+    SHAPES = ["sine", "square", "sawtooth", "noise", "spike", "constant"]
+
+    def __init__(self,
+                 shape: str = "sine",
+                 period: float = 10.0,
+                 amplitude: float = 50.0,
+                 offset: float = 50.0,
+                 width: int = 0,
+                 latency: int = 0,
+                 blocking: bool = False):
+        """
+        :param shape: sine / square / sawtooth / noise / spike / constant
+        :param period: 波形周期(s)
+        :param width: 0 产生标量; n 产生n个值的tuple，各值相位错开
+        :param latency: 模拟的采集延迟(ms)
+        :param blocking: True时在线程池中time.sleep模拟阻塞调用，否则asyncio.sleep
+        """
+        assert shape in self.SHAPES
+        self.shape = shape
+        self.period = max(period, 1e-3)
+        self.amplitude = amplitude
+        self.offset = offset
+        self.width = width
+        self.latency = latency / 1000
+        self.blocking = blocking
+        self.started_at = time.monotonic()
+
+    def value_at(self, t: float, phase: float = 0.0) -> float:
+        x = ((t / self.period) + phase) % 1.0
+        if self.shape == "sine":
+            v = math.sin(2 * math.pi * x)
+        elif self.shape == "square":
+            v = 1.0 if x < 0.5 else -1.0
+        elif self.shape == "sawtooth":
+            v = 2 * x - 1
+        elif self.shape == "noise":
+            v = random.uniform(-1, 1)
+        elif self.shape == "spike":
+            v = 1.0 if x < 0.02 else -1.0
+        else:
+            v = 0.0
+        return self.offset + self.amplitude * v
+
+    def sync_collect(self) -> DataType:
+        if self.blocking and self.latency:
+            time.sleep(self.latency)
+        t = time.monotonic() - self.started_at
+        if self.width <= 0:
+            return self.value_at(t)
+        return tuple(self.value_at(t, idx / self.width) for idx in range(self.width))
+
+    async def collect(self) -> DataType:
+        if self.blocking:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.sync_collect)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.sync_collect()
+
+    @classmethod
+    def infer_preferred_params(cls) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def infer_preferred_store_settings(cls) -> SensorStoreSettings:
+        return SensorStoreSettings(length=100)
@@ -0,0 +1,285 @@
+"""
+共享内存中的最新数据，供同一主机上的其他进程(shell提示符、tmux状态栏、脚本)零拷贝读取
+
+布局(小端):
+    头部  magic(8s) version(I) max_sensors(I) size(Q) used(Q) dir_seq(Q) sensors(I) pid(I) pad
+    目录  max_sensors * [name(96s) offset(Q) capacity(I) width(I) pad]
+    数据  每个sensor: seq(Q) count(Q) pad + capacity * [timestamp(d) values(d * width)]
+
+每个sensor的数据区(以及目录)由seqlock保护：写入前后各将seq加一，读取方在seq为奇数或前后不一致时重试
+
+    $ python -m mm.shm [name] [sensor]
+"""
+import logging
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple, Any
+
+from mm.sampling import flatten_numbers
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MMSHM001"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIIQQQII")
+HEADER_SIZE = 64
+ENTRY = struct.Struct("<96sQII")
+ENTRY_SIZE = 128
+UNIT_HEADER = struct.Struct("<QQ")
+UNIT_HEADER_SIZE = 32
+
+_U64 = struct.Struct("<Q")
+_U32 = struct.Struct("<I")
+# 头部中各字段的偏移
+_USED_OFFSET = 24
+_DIR_SEQ_OFFSET = 32
+_SENSORS_OFFSET = 40
+
+Sample = Tuple[float, Tuple[float, ...]]
+
+
+class _Unit:
+    __slots__ = ["offset", "capacity", "width", "record", "seq", "count"]
+
+    def __init__(self, offset: int, capacity: int, width: int):
+        self.offset = offset
+        self.capacity = capacity
+        self.width = width
+        self.record = struct.Struct(f"<{1 + width}d")
+        self.seq = 0
+        self.count = 0
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    # 不拥有该共享内存，避免resource_tracker在进程退出时将其删除
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """以读取方身份打开已有的共享内存"""
+    try:
+        # Python 3.13+
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+    _untrack(shm)
+    return shm
+
+
+def _is_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedMemoryWriter:
+    """由DataStore在采集线程中调用，单写者"""
+
+    def __init__(self, name: str, size: int, max_sensors: int = 64, max_samples: int = 1024):
+        self.name = name
+        self.max_sensors = max_sensors
+        self.max_samples = max_samples
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self._reclaim(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self.buf = self.shm.buf
+        self.used = HEADER_SIZE + ENTRY_SIZE * max_sensors
+        self.dir_seq = 0
+        self.units: Dict[str, Optional[_Unit]] = {}
+        self.capacities: Dict[str, int] = {}
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, max_sensors, self.shm.size, self.used, 0, 0, os.getpid())
+
+    @staticmethod
+    def _reclaim(name: str):
+        """
+        只删除上次异常退出遗留的共享内存(写入进程已不存在)
+        :raise FileExistsError: 共享内存属于其他程序，或写入进程仍在运行
+        """
+        # 由resource_tracker登记，删除时注销；不删除时取消登记
+        existing = shared_memory.SharedMemory(name=name)
+        try:
+            if existing.size < HEADER.size:
+                raise FileExistsError(f"shared memory '{name}' is used by another program")
+            magic, _, _, _, _, _, _, pid = HEADER.unpack_from(existing.buf, 0)
+            if magic != MAGIC:
+                raise FileExistsError(f"shared memory '{name}' is used by another program")
+            if _is_alive(pid):
+                raise FileExistsError(f"shared memory '{name}' is in use by process {pid}, "
+                                      f"use another shared_memory.name")
+        except FileExistsError:
+            _untrack(existing)
+            existing.close()
+            raise
+        logger.warning(f"shared memory '{name}' of exited process {pid} is stale, recreating")
+        existing.close()
+        existing.unlink()
+
+    def register(self, identifier: str, length: int):
+        """数据区在首次写入(宽度确定)时分配"""
+        self.capacities[identifier] = max(min(length, self.max_samples), 1)
+
+    def _allocate(self, identifier: str, width: int) -> Optional[_Unit]:
+        capacity = self.capacities.get(identifier, self.max_samples)
+        record_size = 8 * (1 + width)
+        free = self.shm.size - self.used - UNIT_HEADER_SIZE
+        capacity = min(capacity, free // record_size)
+        index = len([u for u in self.units.values() if u is not None])
+        if index >= self.max_sensors or capacity <= 0:
+            logger.error(f"shared memory '{self.name}' is full, '{identifier}' is not shared")
+            return None
+
+        unit = _Unit(self.used, capacity, width)
+        UNIT_HEADER.pack_into(self.buf, unit.offset, 0, 0)
+        self.used += UNIT_HEADER_SIZE + capacity * record_size
+
+        self.dir_seq += 1
+        _U64.pack_into(self.buf, _DIR_SEQ_OFFSET, self.dir_seq)
+        ENTRY.pack_into(self.buf, HEADER_SIZE + index * ENTRY_SIZE,
+                        identifier.encode()[:96], unit.offset, capacity, width)
+        _U64.pack_into(self.buf, _USED_OFFSET, self.used)
+        _U32.pack_into(self.buf, _SENSORS_OFFSET, index + 1)
+        self.dir_seq += 1
+        _U64.pack_into(self.buf, _DIR_SEQ_OFFSET, self.dir_seq)
+        return unit
+
+    def write(self, identifier: str, sample: Any, timestamp: Optional[float] = None):
+        if self.buf is None:
+            # 已关闭，退出过程中仍可能有sample写入
+            return
+        unit = self.units.get(identifier)
+        values = flatten_numbers(sample)
+        if unit is None:
+            if identifier in self.units or values is None:
+                # 已分配失败或数据不是数值
+                self.units.setdefault(identifier, None)
+                return
+            unit = self.units[identifier] = self._allocate(identifier, len(values))
+            if unit is None:
+                return
+        if values is None or len(values) != unit.width:
+            return
+
+        record_offset = unit.offset + UNIT_HEADER_SIZE + (unit.count % unit.capacity) * unit.record.size
+        unit.seq += 1
+        _U64.pack_into(self.buf, unit.offset, unit.seq)
+        unit.record.pack_into(self.buf, record_offset, time.time() if timestamp is None else timestamp, *values)
+        unit.count += 1
+        UNIT_HEADER.pack_into(self.buf, unit.offset, unit.seq + 1, unit.count)
+        unit.seq += 1
+
+    def close(self):
+        if self.buf is None:
+            return
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedMemoryReader:
+    """
+    客户端API，不依赖Qt与采集相关模块
+
+        reader = SharedMemoryReader("mm")
+        reader.latest("mm.sensor.simple.CpuSensor")   # (timestamp, (12.5,))
+        reader.window("mm.sensor.simple.CpuSensor", 10)
+    """
+
+    MAX_RETRY = 1000
+
+    def __init__(self, name: str = "mm"):
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, version, self.max_sensors, *_ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{name}' is not a mm shared memory segment")
+        self._dir_seq = -1
+        self._directory: Dict[str, Tuple[int, int, int]] = {}
+
+    def _read_directory(self) -> Dict[str, Tuple[int, int, int]]:
+        for _ in range(self.MAX_RETRY):
+            seq = _U64.unpack_from(self.buf, _DIR_SEQ_OFFSET)[0]
+            if seq == self._dir_seq:
+                return self._directory
+            if seq & 1:
+                # 写入中，让出CPU给写入方
+                time.sleep(0)
+                continue
+            count = _U32.unpack_from(self.buf, _SENSORS_OFFSET)[0]
+            directory = {}
+            for index in range(min(count, self.max_sensors)):
+                name, offset, capacity, width = ENTRY.unpack_from(self.buf, HEADER_SIZE + index * ENTRY_SIZE)
+                directory[name.rstrip(b"\0").decode()] = (offset, capacity, width)
+            if _U64.unpack_from(self.buf, _DIR_SEQ_OFFSET)[0] == seq:
+                self._dir_seq, self._directory = seq, directory
+                return directory
+        raise TimeoutError("shared memory directory is busy")
+
+    def sensors(self) -> List[str]:
+        return list(self._read_directory())
+
+    def window(self, identifier: str, n: int) -> List[Sample]:
+        """:return: 最新的n个sample [(timestamp, values), ...]，按时间先后排列"""
+        entry = self._read_directory().get(identifier)
+        if entry is None:
+            raise KeyError(identifier)
+        offset, capacity, width = entry
+        record = struct.Struct(f"<{1 + width}d")
+        data_offset = offset + UNIT_HEADER_SIZE
+
+        for _ in range(self.MAX_RETRY):
+            seq, count = UNIT_HEADER.unpack_from(self.buf, offset)
+            if seq & 1:
+                # 写入中，让出CPU给写入方
+                time.sleep(0)
+                continue
+            n = min(n, count, capacity)
+            records = []
+            for idx in range(count - n, count):
+                values = record.unpack_from(self.buf, data_offset + (idx % capacity) * record.size)
+                records.append((values[0], values[1:]))
+            if _U64.unpack_from(self.buf, offset)[0] == seq:
+                return records
+        raise TimeoutError(f"'{identifier}' is busy")
+
+    def latest(self, identifier: str) -> Optional[Sample]:
+        records = self.window(identifier, 1)
+        return records[0] if records else None
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else "mm"
+    reader = SharedMemoryReader(name)
+    identifiers = sys.argv[2:] or reader.sensors()
+    for identifier in identifiers:
+        latest = reader.latest(identifier)
+        if latest is not None:
+            print(identifier, " ".join(str(round(v, 2)) for v in latest[1]))
+    reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+流式分位数估计(DDSketch)．相对误差有保证，可合并，内存只与数值范围有关而与样本数量无关
+
+    RollingSketch按时间分桶，每个桶一个DDSketch，查询时合并时间窗口内的桶
+"""
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+class DDSketch:
+    """
+    数值v落入编号为ceil(log_gamma(|v|))的桶，gamma = (1 + a) / (1 - a)，a为相对误差
+    桶数超过max_bins时合并绝对值最小的桶(只影响最低的分位数)
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    # 小于该值的数按0计
+    MIN_VALUE = 1e-9
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, index: int) -> float:
+        # 桶内的代表值，保证相对误差不超过relative_accuracy
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        if value > self.MIN_VALUE:
+            bins = self.positive
+            key = self._index(value)
+        elif value < -self.MIN_VALUE:
+            bins = self.negative
+            key = self._index(-value)
+        else:
+            self.zero += count
+            bins, key = None, 0
+        if bins is not None:
+            bins[key] = bins.get(key, 0) + count
+            if len(bins) > self.max_bins:
+                self._collapse(bins)
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self, bins: Dict[int, int]):
+        keys = sorted(bins)
+        excess = len(bins) - self.max_bins + 1
+        merged = sum(bins.pop(k) for k in keys[:excess])
+        bins[keys[excess]] += merged
+
+    def merge(self, other: "DDSketch"):
+        assert other.gamma == self.gamma
+        for bins, other_bins in [(self.positive, other.positive), (self.negative, other.negative)]:
+            for key, count in other_bins.items():
+                bins[key] = bins.get(key, 0) + count
+            if len(bins) > self.max_bins:
+                self._collapse(bins)
+        self.zero += other.zero
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> "DDSketch":
+        sketch = DDSketch(self.relative_accuracy, self.max_bins)
+        sketch.merge(self)
+        return sketch
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        """一次遍历计算多个分位数，没有数据时返回None"""
+        if not self.count:
+            return [None] * len(qs)
+        # 由小到大：负数(绝对值由大到小)、0、正数
+        ordered: List[Tuple[float, int]] = [(-self._value(k), self.negative[k])
+                                            for k in sorted(self.negative, reverse=True)]
+        if self.zero:
+            ordered.append((0.0, self.zero))
+        ordered.extend((self._value(k), self.positive[k]) for k in sorted(self.positive))
+
+        results: List[Optional[float]] = []
+        for q in qs:
+            rank = q * (self.count - 1)
+            seen = 0
+            value = ordered[-1][0]
+            for v, count in ordered:
+                seen += count
+                if seen > rank:
+                    value = v
+                    break
+            # 不超出实际观测到的范围
+            results.append(min(max(value, self.min), self.max))
+        return results
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
+    @property
+    def bins(self) -> int:
+        return len(self.positive) + len(self.negative) + (1 if self.zero else 0)
+
+
+class RollingSketch:
+    """
+    滚动时间窗口的分位数．窗口分为固定数量的时间桶，过期的桶整体丢弃，内存上限为 桶数 * max_bins
+    已封存的桶的合并结果被缓存，查询时只需再合并当前桶
+    """
+
+    def __init__(self, window: float, buckets: int = 24, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        """
+        :param window: 窗口长度(s)
+        :param buckets: 桶数，决定窗口滑动的粒度(window / buckets)
+        """
+        self.window = window
+        self.bucket_width = window / max(buckets, 1)
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.lock = threading.Lock()
+
+        # [(桶的起始时间, DDSketch)]
+        self.buckets: deque = deque()
+        self._merged: Optional[Tuple[Tuple[float, float], DDSketch]] = None
+
+    def add(self, value: float, timestamp: float):
+        start = timestamp - timestamp % self.bucket_width
+        with self.lock:
+            if not self.buckets or self.buckets[-1][0] < start:
+                self.buckets.append((start, DDSketch(self.relative_accuracy, self.max_bins)))
+                while self.buckets[0][0] <= start - self.window:
+                    self.buckets.popleft()
+            self.buckets[-1][1].add(value)
+
+    def _merge(self, begin: float) -> DDSketch:
+        """合并起始时间不早于begin的桶，调用方需持有锁"""
+        sealed = [(start, sketch) for start, sketch in list(self.buckets)[:-1] if start >= begin]
+        key = (sealed[0][0], sealed[-1][0]) if sealed else (0.0, 0.0)
+        if self._merged is None or self._merged[0] != key:
+            merged = DDSketch(self.relative_accuracy, self.max_bins)
+            for _, sketch in sealed:
+                merged.merge(sketch)
+            self._merged = key, merged
+        result = self._merged[1].copy()
+        if self.buckets and self.buckets[-1][0] >= begin:
+            result.merge(self.buckets[-1][1])
+        return result
+
+    def quantiles(self, qs: List[float], now: float, span: Optional[float] = None) -> List[Optional[float]]:
+        """
+        :param span: 最近span秒，按桶的粒度向外取整；None表示整个窗口
+        """
+        span = self.window if span is None else min(span, self.window)
+        begin = now - now % self.bucket_width - span + self.bucket_width
+        with self.lock:
+            return self._merge(begin).quantiles(qs)
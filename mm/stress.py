@@ -0,0 +1,183 @@
+"""
+压力测试：生成指定规模的配置，在offscreen模式下运行N秒并输出统计
+
+    $ mm-stress --sensors 50 --interval 100 --indicators 200 --duration 10
+    $ mm-stress --sensors 4 --history 100000 --compression
+    $ mm-stress --sensors 50 --latency 20 --blocking --collect-mode qt
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+def build_config(args: argparse.Namespace):
+    from mm.config import Config, SensorSettings, IndicatorSettings, IndicatorData
+    from mm.sensor import SensorStoreSettings
+    from mm.indicator.chart import DecimatedHistoryIndicator
+    from mm.indicator.simple import TextIndicator
+    from mm.sensor.synthetic import SyntheticSensor
+
+    sensor_type = ".".join([SyntheticSensor.__module__, SyntheticSensor.__qualname__])
+    sensors_settings = [
+        SensorSettings(type=sensor_type,
+                       name=f"synthetic-{idx}",
+                       interval=args.interval,
+                       store=SensorStoreSettings(length=max(args.history, 100), compression=args.compression),
+                       kwargs={"shape": SyntheticSensor.SHAPES[idx % len(SyntheticSensor.SHAPES)],
+                               "period": 5 + idx % 7,
+                               "width": args.width,
+                               "latency": args.latency,
+                               "blocking": args.blocking})
+        for idx in range(args.sensors)
+    ]
+
+    location = "[0]" if args.width > 0 else None
+    indicators_settings = []
+    for idx in range(args.indicators):
+        # 指示器按name绑定到各个sensor实例
+        data = IndicatorData(sensor=f"synthetic-{idx % max(args.sensors, 1)}", window=args.window or None)
+        if idx % 2:
+            indicator_cls, kwargs = TextIndicator, {"format": "{value: >6.1f}", "location_in_sample": location}
+        else:
+            indicator_cls, kwargs = DecimatedHistoryIndicator, {"location_in_sample": location, "width": 40}
+        indicators_settings.append(
+            IndicatorSettings(type=".".join([indicator_cls.__module__, indicator_cls.__qualname__]),
+                              name=f"indicator-{idx}",
+                              data=data,
+                              kwargs=kwargs,
+                              interval=args.render_interval))
+
+    return Config(sensors_settings=sensors_settings, indicators_settings=indicators_settings)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def run(args: argparse.Namespace) -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    import psutil
+    from PyQt5 import QtWidgets, QtCore
+
+    from mm.app import CollectThread, QtCollector
+    from mm.config import SettingsStore
+    from mm.data import DataStore
+    from mm.gui import MainWindow
+
+    process = psutil.Process()
+
+    with tempfile.TemporaryDirectory(prefix="mm-stress-") as home:
+        config_store = SettingsStore(home)
+        config_store.config = build_config(args)
+        data_store = DataStore()
+
+        app = QtWidgets.QApplication(sys.argv[:1])
+        collector_cls = QtCollector if args.collect_mode == "qt" else CollectThread
+        collector = collector_cls(config_store=config_store, data_store=data_store)
+        collector.start()
+
+        identifiers = {s.name for s in config_store.config.sensors_settings}
+        deadline = time.monotonic() + 5
+        while not all(data_store.resolve(i) in data_store.data for i in identifiers) and time.monotonic() < deadline:
+            # qt模式下采集任务需要Qt事件循环驱动
+            app.processEvents()
+            time.sleep(0.01)
+
+        # 预填充历史数据
+        if args.history:
+            from mm.sensor.synthetic import SyntheticSensor
+            sensor = SyntheticSensor(width=args.width)
+            for identifier in identifiers:
+                for idx in range(args.history):
+                    data_store.store(identifier, sensor.sync_collect())
+
+        versions_before = sum(data_store.get_version(i) for i in identifiers)
+        rss_before = process.memory_info().rss
+
+        win = MainWindow(config_store, data_store)
+        frames_before = win.frame_clock.frames
+
+        # GUI线程心跳，记录事件循环的卡顿
+        heartbeat_interval = 0.01
+        stalls: List[float] = []
+        last_beat = [time.monotonic()]
+
+        def on_beat():
+            now = time.monotonic()
+            stalls.append(max(now - last_beat[0] - heartbeat_interval, 0.0))
+            last_beat[0] = now
+
+        heartbeat = QtCore.QTimer()
+        heartbeat.setTimerType(QtCore.Qt.PreciseTimer)
+        heartbeat.timeout.connect(on_beat)
+        heartbeat.start(int(heartbeat_interval * 1000))
+
+        started_at = time.monotonic()
+        stop_timer = QtCore.QTimer()
+        stop_timer.setTimerType(QtCore.Qt.PreciseTimer)
+        stop_timer.setSingleShot(True)
+        stop_timer.timeout.connect(app.quit)
+        stop_timer.start(int(args.duration * 1000))
+        app.exec_()
+        elapsed = time.monotonic() - started_at
+
+        heartbeat.stop()
+        collector.stop(timeout=1)
+
+        samples = sum(data_store.get_version(i) for i in identifiers) - versions_before
+        return {
+            "duration (s)": elapsed,
+            "sensors": args.sensors,
+            "indicators": args.indicators,
+            "sample rate (/s)": samples / elapsed,
+            "expected sample rate (/s)": args.sensors * 1000 / args.interval,
+            "render fps": (win.frame_clock.frames - frames_before) / elapsed,
+            "indicator updates (/s)": win.frame_clock.renders / elapsed,
+            "deferred indicator updates": win.frame_clock.deferred,
+            "collect mode": args.collect_mode,
+            "collect lag avg (ms)": collector.lag_total / max(collector.lag_count, 1) * 1000,
+            "collect lag max (ms)": collector.lag_max * 1000,
+            "rss before (MB)": rss_before / 2 ** 20,
+            "rss growth (MB)": (process.memory_info().rss - rss_before) / 2 ** 20,
+            "gui stall p99 (ms)": percentile(stalls, 0.99) * 1000,
+            "gui stall max (ms)": max(stalls, default=0.0) * 1000,
+            "gui stalls > 50ms": sum(1 for s in stalls if s > 0.05),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="mm-stress", description="Mini Monitor stress run")
+    parser.add_argument("--sensors", type=int, default=10, help="number of synthetic sensors")
+    parser.add_argument("--interval", type=int, default=100, help="sensor interval (ms)")
+    parser.add_argument("--width", type=int, default=0, help="sample tuple width, 0 for scalar")
+    parser.add_argument("--latency", type=int, default=0, help="simulated collect latency (ms)")
+    parser.add_argument("--blocking", action="store_true", help="simulate latency with a blocking call")
+    parser.add_argument("--history", type=int, default=0, help="prefilled history samples per sensor")
+    parser.add_argument("--compression", action="store_true", help="use the compressed store")
+    parser.add_argument("--indicators", type=int, default=20, help="number of indicators")
+    parser.add_argument("--render-interval", type=int, default=500, help="indicator interval (ms)")
+    parser.add_argument("--window", type=int, default=0, help="samples read per indicator update, 0 for all")
+    parser.add_argument("--collect-mode", choices=["thread", "qt"], default="thread", help="collector runtime")
+    parser.add_argument("--duration", type=float, default=10, help="run time (s)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run(args)
+
+    width = max(len(k) for k in report)
+    for key, value in report.items():
+        print(f"{key:<{width}}  {round(value, 2) if isinstance(value, float) else value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ import os
 import sys
 from glob import glob
 from pathlib import Path
-from typing import Optional, Iterator
+from typing import Optional, Iterator, Callable, Any
 
 
 def convert_bytes_unit(byte: int) -> str:
@@ -14,6 +14,16 @@ def convert_bytes_unit(byte: int) -> str:
         byte /= 1024
 
 
+def compile_location(location_in_sample: Optional[str]) -> Callable[[Any], Any]:
+    """
+    预编译sample取值路径，如"['value'][0]"．None表示使用sample本身
+    """
+    if not location_in_sample:
+        return lambda v: v
+    code = compile("v{}".format(location_in_sample), "<location_in_sample>", "eval")
+    return lambda v: eval(code, {}, {"v": v})
+
+
 def dynamic_load(identify: str):
     """
     动态加载目标 如加载 'pkg.module.Foo'
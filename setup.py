@@ -16,6 +16,7 @@ setup(
     entry_points='''
         [console_scripts]
         mm=mm:run
+        mm-stress=mm.stress:main
     ''',
     platforms=["all"],
     url='https://github.com/Tasse00/mm.git',
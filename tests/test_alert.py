@@ -0,0 +1,67 @@
+import time
+
+from mm.alert import AlertEngine, AlertRule
+from mm.config import AlertSettings
+from mm.data import DataStore
+from mm.sensor import SensorStoreSettings
+
+
+def test_alert_commands_are_reaped(tmp_path):
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=10))
+    marker = tmp_path / "events"
+    engine = AlertEngine([AlertSettings(name="high", sensor="x", threshold=10,
+                                        command=f"echo $MM_ALERT_STATE >> {marker}")], data_store)
+    engine.attach()
+    for value in [20, 0, 20, 0]:
+        data_store.store("x", value)
+    # 已结束的命令在后续的计算中被回收
+    assert 0 < len(engine.processes) <= 4
+    deadline = time.monotonic() + 5
+    while engine.processes and time.monotonic() < deadline:
+        time.sleep(0.01)
+        data_store.store("x", 0)
+    assert engine.processes == []
+    # 命令并发执行，写入顺序不确定
+    assert sorted(marker.read_text().split()) == ["cleared", "cleared", "fired", "fired"]
+
+
+def feed_all(rule, samples):
+    """:return: [(时间, 是否触发)]"""
+    events = []
+    for timestamp, sample in samples:
+        event = rule.feed(sample, timestamp)
+        if event is not None:
+            events.append((timestamp, event.active))
+    return events
+
+
+def test_alert_hysteresis():
+    rule = AlertRule(AlertSettings(name="high", sensor="x", threshold=80, clear_threshold=60))
+    samples = list(enumerate([50, 81, 70, 79, 61, 60, 85, 59]))
+    # 在threshold与clear_threshold之间抖动不会反复触发
+    assert feed_all(rule, samples) == [(1, True), (5, False), (6, True), (7, False)]
+
+
+def test_alert_below():
+    rule = AlertRule(AlertSettings(name="low", sensor="x", threshold=10, direction="below", clear_threshold=20))
+    assert feed_all(rule, enumerate([30, 9, 15, 21])) == [(1, True), (3, False)]
+
+
+def test_alert_duration():
+    rule = AlertRule(AlertSettings(name="high", sensor="x", threshold=10, duration=2000))
+    # 第1秒越过阈值，第2秒回落，重新计时；第4秒起持续越过阈值，第6秒触发
+    samples = [(0, 0), (1, 20), (2, 0), (3, 0), (4, 20), (5, 20), (6, 20), (7, 0)]
+    assert feed_all(rule, samples) == [(6, True), (7, False)]
+
+
+def test_alert_rate():
+    rule = AlertRule(AlertSettings(name="fast", sensor="x", threshold=5, kind="rate"))
+    # 第一个sample没有变化率
+    samples = [(0, 0), (1, 3), (2, 10), (3, 12), (3, 100)]
+    assert feed_all(rule, samples) == [(2, True), (3, False)]
+
+
+def test_alert_location_in_sample():
+    rule = AlertRule(AlertSettings(name="high", sensor="x", threshold=10, location_in_sample="[1]"))
+    assert feed_all(rule, enumerate([(100, 0), (0, 11)])) == [(1, True)]
@@ -0,0 +1,74 @@
+import pytest
+
+from mm.sensor.cgroup import (CgroupIoSensor, CgroupMemorySensor, parse_flat_keyed, parse_io_stat,
+                              parse_pressure)
+
+CPU_STAT = b"""usage_usec 1234567
+user_usec 1000000
+system_usec 234567
+nr_periods 0
+"""
+
+IO_STAT = b"""8:0 rbytes=1000 wbytes=2000 rios=10 wios=20 dbytes=0 dios=0
+259:0 rbytes=500 wbytes=0 rios=5 wios=0 dbytes=0 dios=0
+"""
+
+PRESSURE = b"""some avg10=1.50 avg60=0.80 avg300=0.20 total=123456
+full avg10=0.25 avg60=0.10 avg300=0.00 total=2345
+"""
+
+
+def test_parse_flat_keyed():
+    assert parse_flat_keyed(CPU_STAT, b"usage_usec") == 1234567
+    assert parse_flat_keyed(CPU_STAT, b"nr_periods") == 0
+    # 最后一行没有换行符
+    assert parse_flat_keyed(b"a 1\nb 2", b"b") == 2
+    with pytest.raises(ValueError):
+        parse_flat_keyed(CPU_STAT, b"throttled_usec")
+
+
+def test_parse_io_stat():
+    assert parse_io_stat(IO_STAT) == (1500, 2000)
+    assert parse_io_stat(b"") == (0, 0)
+
+
+def test_parse_pressure():
+    assert parse_pressure(PRESSURE) == (1.5, 0.25)
+    # 旧内核的cpu.pressure没有full行
+    assert parse_pressure(PRESSURE.splitlines()[0]) == (1.5, 0.0)
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / "cgroup.controllers").write_text("cpu io memory\n")
+    for cgroup, memory in [("a.slice", 300), ("a.slice/x.service", 100), ("b.slice", 200), ("c.slice", 50)]:
+        (tmp_path / cgroup).mkdir()
+        (tmp_path / cgroup / "memory.current").write_text(f"{memory}\n")
+        (tmp_path / cgroup / "io.stat").write_text("8:0 rbytes=0 wbytes=0\n")
+    # 未启用memory控制器
+    (tmp_path / "d.slice").mkdir()
+    return tmp_path
+
+
+def test_discover_and_top_k(root):
+    sensor = CgroupMemorySensor(top_k=2, root=str(root))
+    assert sensor.discover() == ["a.slice", "a.slice/x.service", "b.slice", "c.slice", "d.slice"]
+    assert CgroupMemorySensor(depth=1, root=str(root)).discover() == ["a.slice", "b.slice", "c.slice", "d.slice"]
+    assert sensor.sync_collect() == {"a.slice": 300, "b.slice": 200}
+    # 文件保持打开，内容变化后重新读取
+    (root / "c.slice" / "memory.current").write_text("1000\n")
+    assert sensor.sync_collect() == {"a.slice": 300, "c.slice": 1000}
+
+
+def test_explicit_cgroups(root):
+    sensor = CgroupMemorySensor(cgroups=["c.slice", "d.slice", "missing.slice"], root=str(root))
+    assert sensor.sync_collect() == {"c.slice": 50}
+
+
+def test_io_rate(root):
+    sensor = CgroupIoSensor(cgroups=["a.slice"], root=str(root))
+    # 第一次采集没有速率
+    assert sensor.sync_collect() == {"a.slice": (0.0, 0.0)}
+    (root / "a.slice" / "io.stat").write_text("8:0 rbytes=4096 wbytes=1024\n")
+    rate = sensor.sync_collect()["a.slice"]
+    assert rate[0] > rate[1] > 0
@@ -0,0 +1,156 @@
+import math
+import random
+import struct
+
+import pytest
+
+from mm.compress import SealedBlock, BitWriter, BitReader, infer_width
+from mm.data import CompressedStoreUnit
+from mm.sensor import SensorStoreSettings
+
+
+def _timestamps(n, start=1000.0, step=0.5):
+    return [start + i * step for i in range(n)]
+
+
+def _same_float(a, b):
+    return struct.pack(">d", a) == struct.pack(">d", b)
+
+
+def test_bits_round_trip():
+    rng = random.Random(0)
+    fields = [(rng.getrandbits(n), n) for n in (rng.randint(1, 64) for _ in range(1000))]
+    writer = BitWriter()
+    for value, nbits in fields:
+        writer.write(value, nbits)
+    reader = BitReader(writer.getvalue())
+    assert [reader.read(nbits) for _, nbits in fields] == [value for value, _ in fields]
+
+
+@pytest.mark.parametrize("samples", [
+    [0.0] * 50,
+    [float(i) for i in range(50)],
+    [math.sin(i / 7) * 1e6 for i in range(200)],
+    [-0.0, 0.0, math.inf, -math.inf, 5e-324, 1.7976931348623157e308, -1.5],
+])
+def test_floats_round_trip_bit_exact(samples):
+    timestamps = _timestamps(len(samples))
+    decoded_timestamps, decoded = SealedBlock(timestamps, samples).decode()
+    assert decoded_timestamps == timestamps
+    assert all(_same_float(a, b) for a, b in zip(decoded, samples))
+
+
+def test_nan_round_trip():
+    _, decoded = SealedBlock(_timestamps(3), [1.0, math.nan, 2.0]).decode()
+    assert decoded[0] == 1.0 and math.isnan(decoded[1]) and decoded[2] == 2.0
+
+
+@pytest.mark.parametrize("samples", [
+    [7] * 20,
+    list(range(-100, 100, 3)),
+    [0, (1 << 59), -(1 << 59), 1, -1],
+    [random.Random(1).randint(-2 ** 40, 2 ** 40) for _ in range(300)],
+])
+def test_ints_round_trip(samples):
+    _, decoded = SealedBlock(_timestamps(len(samples)), samples).decode()
+    assert decoded == samples
+    assert all(type(v) is int for v in decoded)
+
+
+def test_tuples_with_mixed_columns():
+    samples = [(i, i * 0.25, -i) for i in range(100)]
+    block = SealedBlock(_timestamps(100), samples)
+    assert block.kinds == "ifi"
+    assert block.decode()[1] == samples
+
+
+def test_irregular_timestamps_keep_millisecond_precision():
+    rng = random.Random(2)
+    timestamps, t = [], 5000.0
+    for _ in range(300):
+        t += rng.choice([0.001, 0.1, 2.0, 3600.0, 123.456])
+        timestamps.append(t)
+    decoded, _ = SealedBlock(timestamps, [1.0] * 300).decode()
+    assert all(abs(a - b) < 1e-6 for a, b in zip(decoded, timestamps))
+
+
+def test_incompressible_samples_are_kept_raw():
+    samples = [{"a": 1}, "text", None, (1, "x")]
+    block = SealedBlock(_timestamps(4), samples)
+    assert block.raw is not None
+    assert block.decode()[1] == samples
+    # 宽度不一致的tuple同样原样保存
+    assert SealedBlock(_timestamps(2), [(1, 2), (1, 2, 3)]).raw is not None
+
+
+def test_huge_ints_fall_back_to_floats():
+    samples = [1 << 62, 1]
+    block = SealedBlock(_timestamps(2), samples)
+    assert block.kinds == "f"
+    assert block.decode()[1] == [float(v) for v in samples]
+
+
+def test_infer_width():
+    assert infer_width(1) == 0
+    assert infer_width(1.5) == 0
+    assert infer_width((1, 2.0)) == 2
+    assert infer_width(True) is None
+    assert infer_width(()) is None
+    assert infer_width([1, 2]) is None
+
+
+def test_compressed_unit_matches_plain_ring_buffer():
+    unit = CompressedStoreUnit(SensorStoreSettings(length=100, compression=True, block_size=16))
+    samples = [(i, i / 3) for i in range(250)]
+    for idx, sample in enumerate(samples):
+        unit.store(sample, 1000.0 + idx)
+    seq, latest = unit.snapshot()
+    assert seq == 250
+    # 淘汰以数据块为单位，至少保留length个
+    assert latest[-100:] == samples[-100:]
+    assert unit.snapshot(10)[1] == samples[-10:]
+    assert unit.since(245) == (250, samples[245:])
+    assert [s for _, s in unit.range(1240.0, 1242.0)] == samples[240:243]
+    assert unit.at(1200.5) == (1200.0, samples[200])
+
+
+def test_tail_reads_decode_only_the_newest_blocks(monkeypatch):
+    unit = CompressedStoreUnit(SensorStoreSettings(length=100000, compression=True, block_size=128))
+    for i in range(100000):
+        unit.store(float(i), float(i))
+    decoded = []
+    original = SealedBlock.decode
+    monkeypatch.setattr(SealedBlock, "decode", lambda self: decoded.append(self) or original(self))
+    unit._decoded.clear()
+
+    # 最新的40个落在未压缩部分与最后一个数据块内
+    assert unit.snapshot(40)[1] == [float(i) for i in range(99960, 100000)]
+    assert len(decoded) <= 1
+    assert unit.snapshot(300)[1][0] == 99700.0
+    assert len(decoded) <= 3
+
+
+def test_query_window_bounds_decoding(monkeypatch):
+    from mm.data import DataStore
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=10000, compression=True, block_size=100))
+    for i in range(10000):
+        data_store.store("x", float(i))
+    decoded = []
+    original = SealedBlock.decode
+    monkeypatch.setattr(SealedBlock, "decode", lambda self: decoded.append(self) or original(self))
+    data_store.data["x"]._decoded.clear()
+    assert data_store.query("x", window=1) == [9999.0]
+    assert len(decoded) <= 1
+
+
+def test_query_without_window_is_bounded_for_compressed_units():
+    from mm.data import DataStore
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=20000, compression=True, block_size=100))
+    for i in range(20000):
+        data_store.store("x", float(i))
+    samples = data_store.query("x")
+    assert len(samples) == DataStore.COMPRESSED_READ_WINDOW
+    assert samples[-1] == 19999.0
+    assert len(data_store.query("x", window=20000)) == 20000
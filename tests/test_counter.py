@@ -0,0 +1,49 @@
+import pytest
+
+from mm.sensor.counter import CounterRate, KeyedCounterRate
+
+
+def test_first_update_is_zero():
+    rate = CounterRate()
+    assert rate.update([100, 200], now=10.0) == [0.0, 0.0]
+    assert rate.update([150, 260], now=12.0) == [25.0, 30.0]
+
+
+def test_wraparound_and_reset():
+    rate = CounterRate(counter_bits=32)
+    rate.update([2 ** 32 - 10, 1000], now=0.0)
+    # 第一个计数器回绕，第二个被重置
+    assert rate.update([10, 5], now=1.0) == [20.0, 0.0]
+    assert rate.update([30, 15], now=2.0) == [20.0, 10.0]
+
+
+def test_length_change_restarts():
+    rate = CounterRate()
+    rate.update([1, 2], now=0.0)
+    assert rate.update([5, 6, 7], now=1.0) == [0.0, 0.0, 0.0]
+    assert rate.update([6, 8, 10], now=2.0) == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize("duration", [0.0, -1.0])
+def test_non_positive_duration(duration):
+    rate = CounterRate()
+    rate.update([1], now=5.0)
+    assert rate.update([100], now=5.0 + duration) == [0.0]
+
+
+def test_keyed_counters_follow_keys():
+    rate = KeyedCounterRate()
+    rate.update({"sda": (0, 0), "sdb": (100, 100)}, now=0.0)
+    assert rate.update({"sda": (10, 20), "sdb": (110, 100)}, now=1.0) == {"sda": (10.0, 20.0),
+                                                                           "sdb": (10.0, 0.0)}
+    # 新设备首次为0，消失的设备被丢弃，已有设备不受影响
+    result = rate.update({"sdb": (130, 140), "sdc": (5, 5)}, now=2.0)
+    assert result == {"sdb": (20.0, 40.0), "sdc": (0.0, 0.0)}
+    assert rate.update({"sdb": (130, 140), "sdc": (6, 9)}, now=3.0)["sdc"] == (1.0, 4.0)
+
+
+def test_keyed_counters_width_change_restarts():
+    rate = KeyedCounterRate()
+    rate.update({"eth0": (1, 2)}, now=0.0)
+    assert rate.update({"eth0": (2, 3, 4)}, now=1.0) == {"eth0": (0.0, 0.0, 0.0)}
+    assert rate.update({}, now=2.0) == {}
@@ -0,0 +1,62 @@
+import math
+
+import pytest
+
+from mm.indicator.chart import decimate_lttb, decimate_minmax
+
+
+def pairs(points):
+    return list(zip(points[0::2], points[1::2]))
+
+
+WAVE = [math.sin(i / 50) * 100 + (500 if i == 1234 else 0) for i in range(5000)]
+
+
+@pytest.mark.parametrize("columns", [3, 100, 640])
+def test_minmax_size_and_extremes(columns):
+    points = pairs(decimate_minmax(WAVE, columns))
+    # 每列最多两个点
+    assert columns <= len(points) <= 2 * columns
+    xs = [x for x, _ in points]
+    assert xs == sorted(xs)
+    assert 0 < xs[0] and xs[-1] < columns
+    # 尖峰与全局极值不会丢失
+    ys = [y for _, y in points]
+    assert max(ys) == max(WAVE) and min(ys) == min(WAVE)
+
+
+def test_minmax_keeps_order_within_column():
+    # 第一列先降后升，第二列先升后降
+    assert pairs(decimate_minmax([5, 1, 9, 9, 1, 5], 2)) == [(0.5, 1), (0.5, 9), (1.5, 9), (1.5, 1)]
+    # 常数列只保留一个点
+    assert pairs(decimate_minmax([2, 2, 3, 3], 2)) == [(0.5, 2), (1.5, 3)]
+
+
+def test_minmax_fewer_values_than_columns():
+    assert pairs(decimate_minmax([1, 2], 4)) == [(1.0, 1), (3.0, 2)]
+    assert len(decimate_minmax([], 4)) == 0
+
+
+@pytest.mark.parametrize("columns", [3, 100, 640])
+def test_lttb_size_and_endpoints(columns):
+    points = pairs(decimate_lttb(WAVE, columns))
+    assert len(points) == columns
+    assert points[0] == (0.0, WAVE[0])
+    assert points[-1] == (columns, WAVE[-1])
+    xs = [x for x, _ in points]
+    assert all(a < b for a, b in zip(xs, xs[1:]))
+
+
+def test_lttb_keeps_spike():
+    assert max(y for _, y in pairs(decimate_lttb(WAVE, 100))) == max(WAVE)
+
+
+def test_lttb_fewer_values_than_columns():
+    # 不降采样，x缩放到[0, columns]
+    assert pairs(decimate_lttb([1, 2, 3], 10)) == [(0.0, 1), (5.0, 2), (10.0, 3)]
+    assert pairs(decimate_lttb([7], 10)) == [(0.0, 7)]
+
+
+def test_lttb_narrow_widget_is_still_bounded():
+    assert len(pairs(decimate_lttb(WAVE, 2))) <= 4
+    assert len(decimate_lttb(WAVE, 0)) == 0
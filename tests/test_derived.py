@@ -0,0 +1,65 @@
+import pytest
+
+from mm.config import DerivedInputSettings, DerivedSensorSettings
+from mm.data import DataStore
+from mm.derived import EwmaOperator, RateOperator, RatioOperator, SumOperator, build_derived_sensors
+from mm.sensor import SensorStoreSettings
+
+
+def test_rate():
+    op = RateOperator(1, scale=8)
+    assert op.update([(0, 100.0)], 0.0) is None
+    assert op.update([(0, 150.0)], 0.5) == 800.0
+    # 计数器重置时跳过本次，下一次从新的值开始计算
+    assert op.update([(0, 10.0)], 1.0) is None
+    assert op.update([(0, 20.0)], 2.0) == 80.0
+    # 时间未前进时不输出
+    assert op.update([(0, 30.0)], 2.0) is None
+
+
+def test_ewma():
+    op = EwmaOperator(1, alpha=0.5)
+    assert [op.update([(0, value)], 0.0) for value in [10.0, 20.0, 20.0, 0.0]] == [10.0, 15.0, 17.5, 8.75]
+
+
+def test_sum_waits_for_all_inputs():
+    op = SumOperator(3)
+    assert op.update([(0, 1.0)], 0.0) is None
+    assert op.update([(1, 2.0), (0, 3.0)], 0.0) is None
+    assert op.update([(2, 4.0)], 0.0) == 9.0
+    assert op.update([(1, 10.0)], 0.0) == 17.0
+
+
+def test_ratio():
+    op = RatioOperator(2, scale=100)
+    assert op.update([(0, 1.0)], 0.0) is None
+    # 分母为0时不输出
+    assert op.update([(1, 0.0)], 0.0) is None
+    assert op.update([(1, 4.0)], 0.0) == 25.0
+    assert op.update([(0, 2.0), (1, 8.0)], 0.0) == 25.0
+
+
+@pytest.mark.parametrize("cls, inputs", [(RateOperator, 2), (EwmaOperator, 0), (RatioOperator, 1)])
+def test_arity(cls, inputs):
+    with pytest.raises(ValueError):
+        cls(inputs)
+
+
+def test_derived_sensor():
+    data_store = DataStore()
+    data_store.register("mem", SensorStoreSettings(length=10))
+    build_derived_sensors([
+        DerivedSensorSettings(name="used", op="ratio", store=SensorStoreSettings(length=10), kwargs={"scale": 100},
+                              inputs=[DerivedInputSettings("mem", "[0]"), DerivedInputSettings("mem", "[1]")]),
+        # 派生sensor可以作为其他派生sensor的输入
+        DerivedSensorSettings(name="used_sum", op="sum", store=SensorStoreSettings(length=10),
+                              inputs=[DerivedInputSettings("used")]),
+        DerivedSensorSettings(name="bad", op="median", store=SensorStoreSettings(length=10),
+                              inputs=[DerivedInputSettings("mem")]),
+    ], data_store)
+    data_store.store("mem", (1, 4))
+    data_store.store("mem", (3, 4))
+    # 同一sample中的两个输入一起更新，没有混合新旧sample的中间结果
+    assert data_store.get_sequence("used") == [25.0, 75.0]
+    assert data_store.get_sequence("used_sum") == [25.0, 75.0]
+    assert data_store.get_sequence("bad") == []
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+import time
+
+from mm.executor import DaemonThreadExecutor
+
+
+def test_inherited_map_and_context_manager():
+    with DaemonThreadExecutor(max_workers=2) as executor:
+        assert list(executor.map(lambda x: x * 2, range(5))) == [0, 2, 4, 6, 8]
+
+
+def test_default_executor_of_event_loop():
+    executor = DaemonThreadExecutor()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.set_default_executor(executor)
+        assert loop.run_until_complete(loop.run_in_executor(None, sum, [1, 2, 3])) == 6
+    finally:
+        executor.shutdown(wait=False)
+        loop.close()
+
+
+def test_shutdown_does_not_wait_for_blocked_workers():
+    executor = DaemonThreadExecutor(max_workers=1)
+    release = threading.Event()
+    running = executor.submit(release.wait, 10)
+    queued = executor.submit(time.sleep, 0)
+    begin = time.monotonic()
+    executor.shutdown(wait=False)
+    assert time.monotonic() - begin < 0.1
+    # 尚未开始的任务被取消
+    assert queued.cancelled()
+    release.set()
+    assert running.result(timeout=1) is True
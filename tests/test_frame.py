@@ -0,0 +1,80 @@
+import time
+
+import pytest
+from PyQt5 import QtCore
+
+from mm.config import IndicatorSettings
+from mm.indicator import IndicatorData
+from mm.gui.frame import FrameClock
+
+
+@pytest.fixture(scope="module")
+def app():
+    # 只需要定时器，不需要窗口系统
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def perf_counter(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, "perf_counter", lambda: now[0])
+    return now
+
+
+def make_clock(app, perf_counter, cost, names):
+    rendered = []
+
+    def render(settings):
+        rendered.append(settings.name)
+        perf_counter[0] += cost
+
+    clock = FrameClock(None, render, frame_interval=50, frame_budget=8)
+    clock.set_indicators([IndicatorSettings(type="x", data=IndicatorData(sensor="x"), name=name, priority=priority,
+                                            interval=1000)
+                          for name, priority in names])
+    return clock, rendered
+
+
+def test_renders_all_due_indicators_in_one_frame(app, perf_counter):
+    clock, rendered = make_clock(app, perf_counter, 0.001, [("a", 0), ("b", 0), ("c", 0)])
+    clock.start()
+    clock.stop()
+    assert sorted(rendered) == ["a", "b", "c"]
+    assert (clock.frames, clock.renders, clock.deferred) == (1, 3, 0)
+    # 已渲染的指示器在下一个间隔之前不会再次渲染
+    clock.on_frame()
+    clock.stop()
+    assert clock.renders == 3
+
+
+def test_over_budget_defers_by_priority(app, perf_counter):
+    clock, rendered = make_clock(app, perf_counter, 0.005, [("low", 0), ("high", 10), ("mid", 5)])
+    clock.start()
+    clock.stop()
+    # 超出预算后按优先级推迟剩余的指示器
+    assert rendered == ["high", "mid"]
+    assert clock.deferred == 1
+    clock.on_frame()
+    clock.stop()
+    assert rendered == ["high", "mid", "low"]
+    assert clock.frames == 2
+
+
+def test_first_indicator_always_renders(app, perf_counter):
+    # 单个指示器超出预算时也要渲染，否则永远不会更新
+    clock, rendered = make_clock(app, perf_counter, 0.1, [("slow", 0), ("other", 0)])
+    clock.start()
+    clock.stop()
+    assert rendered == ["slow"]
+    assert clock.last_frame_cost == pytest.approx(0.1)
+
+
+def test_schedules_next_frame(app, perf_counter):
+    clock, _ = make_clock(app, perf_counter, 0.0, [("a", 0)])
+    assert not clock.is_active()
+    clock.start()
+    assert clock.is_active()
+    # 下一帧在最早的到期时间，不早于最小帧间隔
+    assert 900 <= clock.timer.remainingTime() <= 1000
+    clock.stop()
+    assert not clock.is_active()
@@ -0,0 +1,86 @@
+import logging
+
+from mm.app import Collector
+from mm.config import SensorSettings
+from mm.data import DataStore
+from mm.sensor import SensorStoreSettings
+from mm.sensor.synthetic import SyntheticSensor
+from mm.indicator import IndicatorData
+
+SYNTHETIC = "mm.sensor.synthetic.SyntheticSensor"
+
+
+def _settings(name="", interval=2000, **kwargs):
+    return SensorSettings(type=SYNTHETIC, store=SensorStoreSettings(length=10), interval=interval, name=name,
+                          kwargs=kwargs)
+
+
+def test_instance_key_normalizes_kwargs():
+    assert SyntheticSensor.instance_key(SYNTHETIC, {}) == SYNTHETIC
+    # 与默认值相同的参数被忽略
+    assert SyntheticSensor.instance_key(SYNTHETIC, {"shape": "sine"}) == SYNTHETIC
+    a = SyntheticSensor.instance_key(SYNTHETIC, {"shape": "square", "period": 3})
+    b = SyntheticSensor.instance_key(SYNTHETIC, {"period": 3, "shape": "square"})
+    assert a == b == SYNTHETIC + '{"period":3,"shape":"square"}'
+
+
+def test_plan_jobs_dedupes_and_aliases(caplog):
+    data_store = DataStore()
+    collector = Collector(config_store=None, data_store=data_store)
+    with caplog.at_level(logging.WARNING):
+        jobs = collector.plan_jobs([
+            _settings("a", shape="square"),
+            _settings("a-copy", shape="square"),
+            _settings("b", shape="sawtooth"),
+            _settings("c", interval=100, period=10.0, shape="square"),
+        ])
+    square = SyntheticSensor.instance_key(SYNTHETIC, {"shape": "square"})
+    saw = SyntheticSensor.instance_key(SYNTHETIC, {"shape": "sawtooth"})
+    assert list(jobs) == [square, saw]
+    # 与已有实例相同但间隔不同时以第一个配置为准
+    assert jobs[square][1].name == "a"
+    assert "same instance" in caplog.text
+
+    assert data_store.resolve("a") == data_store.resolve("a-copy") == data_store.resolve("c") == square
+    assert data_store.resolve("b") == saw
+    # type指向第一个实例
+    assert data_store.resolve(SYNTHETIC) == square
+
+
+def test_plan_jobs_skips_unloadable_sensor():
+    collector = Collector(config_store=None, data_store=DataStore())
+    bad = SensorSettings(type="mm.sensor.missing.Nope", store=SensorStoreSettings(length=1))
+    assert list(collector.plan_jobs([bad, _settings()])) == [SYNTHETIC]
+
+
+def test_aliases_read_and_subscribe():
+    data_store = DataStore()
+    received = []
+    # 订阅可以早于注册与别名
+    data_store.subscribe("cpu", lambda identifier, seq, val: received.append((identifier, seq, val)))
+    data_store.register("cpu-instance", SensorStoreSettings(length=10))
+    data_store.alias("cpu", "cpu-instance")
+    data_store.store("cpu-instance", 1.0)
+    data_store.store("cpu", 2.0)
+    assert received == [("cpu", 1, 1.0), ("cpu", 2, 2.0)]
+    assert data_store.get_snapshot("cpu") == data_store.get_snapshot("cpu-instance") == (2, [1.0, 2.0])
+    assert data_store.get_version("cpu") == 2
+
+
+def test_alias_cannot_shadow_registered_identifier():
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=10))
+    data_store.register("y", SensorStoreSettings(length=10))
+    data_store.alias("x", "y")
+    assert data_store.resolve("x") == "x"
+    # 重新绑定别名
+    data_store.alias("z", "x")
+    data_store.alias("z", "y")
+    assert data_store.resolve("z") == "y"
+    assert data_store.alias_names["x"] == ["x"]
+
+
+def test_indicator_data_identifier():
+    assert IndicatorData(sensor="cpu").identifier() == "cpu"
+    data = IndicatorData(sensor=SYNTHETIC, kwargs={"shape": "sawtooth"})
+    assert data.identifier() == SyntheticSensor.instance_key(SYNTHETIC, {"shape": "sawtooth"})
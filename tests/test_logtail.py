@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+import pytest
+
+from mm.sensor.logtail import LogTailSensor
+
+
+def _collect(sensor):
+    return asyncio.get_event_loop_policy().get_event_loop().run_until_complete(sensor.collect())
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+def _counts(result):
+    return {name: count for name, (count, _) in result.items()}
+
+
+def test_counts_only_new_complete_lines(tmp_path, loop):
+    log = tmp_path / "app.log"
+    log.write_text("ERROR before start\n")
+    sensor = LogTailSensor(paths=[str(log)], patterns={"error": "ERROR", "warn": "WARN"}, inotify=False)
+    with open(log, "a") as f:
+        f.write("ERROR one\nWARN two\nERROR thr")
+    assert _counts(_collect(sensor)) == {"error": 1, "warn": 1}
+    with open(log, "a") as f:
+        f.write("ee\n")
+    # 未完成的行在补全后才计数
+    assert _counts(_collect(sensor)) == {"error": 1, "warn": 0}
+    sensor.close()
+
+
+def test_rotation_reads_old_file_then_new_file(tmp_path, loop):
+    log = tmp_path / "app.log"
+    log.write_text("")
+    sensor = LogTailSensor(paths=[str(log)], patterns={"error": "ERROR"}, inotify=False)
+    with open(log, "a") as f:
+        f.write("ERROR 1\n")
+        # 轮转：旧文件被移走后仍有写入
+        os.rename(log, tmp_path / "app.log.1")
+        f.write("ERROR 2\n")
+    log.write_text("ERROR 3\nERROR 4\n")
+    assert _counts(_collect(sensor)) == {"error": 4}
+    with open(log, "a") as f:
+        f.write("ERROR 5\n")
+    assert _counts(_collect(sensor)) == {"error": 1}
+    sensor.close()
+
+
+def test_truncation_restarts_from_beginning(tmp_path, loop):
+    log = tmp_path / "app.log"
+    log.write_text("")
+    sensor = LogTailSensor(paths=[str(log)], patterns={"error": "ERROR"}, inotify=False)
+    with open(log, "a") as f:
+        f.write("ERROR x\n" * 10)
+    assert _counts(_collect(sensor)) == {"error": 10}
+    log.write_text("ERROR y\n")
+    assert _counts(_collect(sensor)) == {"error": 1}
+    sensor.close()
+
+
+def test_missing_file_is_read_from_start_once_created(tmp_path, loop):
+    log = tmp_path / "later.log"
+    sensor = LogTailSensor(paths=[str(log)], patterns={"error": "ERROR"}, inotify=False)
+    assert _counts(_collect(sensor)) == {"error": 0}
+    log.write_text("ERROR a\nERROR b\n")
+    assert _counts(_collect(sensor)) == {"error": 2}
+    sensor.close()
+
+
+def test_byte_budget_defers_the_rest(tmp_path, loop):
+    log = tmp_path / "app.log"
+    log.write_text("")
+    sensor = LogTailSensor(paths=[str(log)], patterns={"error": "ERROR"}, inotify=False,
+                           chunk_size=64, max_bytes=256)
+    line = "ERROR " + "x" * 9 + "\n"
+    with open(log, "a") as f:
+        f.write(line * 100)
+    first = _counts(_collect(sensor))["error"]
+    # 单次最多处理max_bytes，剩余的数据在后台任务中继续读取
+    assert first <= 256 // len(line) + 1
+    assert sensor.tasks
+    loop.run_until_complete(asyncio.sleep(0.05))
+    assert first + _counts(_collect(sensor))["error"] == 100
+    sensor.close()
+
+
+def test_close_releases_inotify_and_tasks(tmp_path, loop):
+    log = tmp_path / "app.log"
+    log.write_text("")
+    sensor = LogTailSensor(paths=[str(log)], patterns={"error": "ERROR"})
+    _collect(sensor)
+    if sensor.inotify is None:
+        pytest.skip("inotify is not available")
+    fd = sensor.inotify.fd
+    with open(log, "a") as f:
+        f.write("ERROR\n")
+    loop.run_until_complete(asyncio.sleep(0.05))
+    assert _counts(_collect(sensor)) == {"error": 1}
+
+    sensor.close()
+    assert sensor.inotify is None
+    assert all(tail.fd < 0 for tail in sensor.tails)
+    assert not sensor.tasks or all(task.cancelled() or task.done() for task in sensor.tasks)
+    with pytest.raises(OSError):
+        os.fstat(fd)
+    # 关闭后写入不再触发回调
+    with open(log, "a") as f:
+        f.write("ERROR\n")
+    loop.run_until_complete(asyncio.sleep(0.05))
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from mm.sensor.procfs import ProcStat
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/stat"), reason="requires /proc")
+
+
+def test_first_cpu_percent_is_zero():
+    stat = ProcStat()
+    assert stat.cpu_percent() == 0.0
+    sum(range(10 ** 6))
+    assert 0.0 <= stat.cpu_percent() <= 100.0
+
+
+def test_read_file_longer_than_one_page():
+    from mm.sensor.procfs import ProcFile
+    # /proc/self/maps由seq_file生成，超过一页时单次read只返回一部分
+    path = f"/proc/{os.getpid()}/maps"
+    with open(path, "rb") as f:
+        expected = f.read()
+    assert len(expected) > 4096
+    proc = ProcFile(path, buffer_size=256)
+    try:
+        data = proc.read()
+    finally:
+        proc.close()
+    # 读取期间映射可能变化，比较前后都稳定的部分
+    assert len(data) > 4096
+    assert data.count(b"\n") == pytest.approx(expected.count(b"\n"), abs=5)
+    assert data.endswith(b"\n")
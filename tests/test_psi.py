@@ -0,0 +1,72 @@
+import asyncio
+import os
+import select
+
+import pytest
+
+from mm.sensor import psi
+from mm.sensor.psi import PressureSensor
+
+pytestmark = pytest.mark.skipif(not hasattr(select, "epoll"), reason="requires epoll")
+
+PRESSURE = b"""some avg10=1.50 avg60=0.80 avg300=0.20 total=123456
+full avg10=0.25 avg60=0.10 avg300=0.00 total=2345
+"""
+
+
+@pytest.fixture
+def sensor(tmp_path, monkeypatch):
+    # cgroup的pressure文件用普通文件代替
+    (tmp_path / "x.slice").mkdir()
+    (tmp_path / "x.slice" / "io.pressure").write_bytes(PRESSURE)
+    monkeypatch.setattr(psi, "find_root", lambda: str(tmp_path))
+    sensor = PressureSensor(resource="io", kind="full", threshold=100, window=1000, cgroup="x.slice")
+    yield sensor
+    sensor.procfs.close()
+
+
+def test_collect(sensor):
+    assert sensor.path.endswith("x.slice/io.pressure")
+    # 内核要求的单位为us
+    assert sensor.trigger == "full 100000 1000000"
+    assert sensor.sync_collect() == (1.5, 0.25)
+
+
+async def drain(events):
+    return [val async for val in events]
+
+
+def test_falls_back_to_polling_without_trigger(sensor):
+    # 普通文件不支持注册到epoll，只保留按间隔采集
+    assert asyncio.run(drain(sensor.watch())) == []
+    assert sensor.trigger_fd == -1 and sensor.epoll is None
+
+
+def test_trigger_events(sensor, monkeypatch):
+    read_fd, write_fd = os.pipe()
+
+    def register():
+        # 用管道模拟内核的POLLPRI事件
+        sensor.trigger_fd, sensor.epoll = read_fd, select.epoll()
+        sensor.epoll.register(read_fd, select.EPOLLIN)
+        return True
+
+    monkeypatch.setattr(sensor, "_register_trigger", register)
+
+    async def main():
+        events = sensor.watch()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, os.write, write_fd, b"x")
+        val = await asyncio.wait_for(events.__anext__(), 5)
+        await events.aclose()
+        return val
+
+    try:
+        assert asyncio.run(main()) == (1.5, 0.25)
+        assert sensor.events >= 1
+        # 迭代结束后触发器fd被关闭
+        assert sensor.trigger_fd == -1 and sensor.epoll is None
+        with pytest.raises(OSError):
+            os.fstat(read_fd)
+    finally:
+        os.close(write_fd)
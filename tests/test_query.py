@@ -0,0 +1,84 @@
+import math
+import time
+
+import pytest
+
+from mm.data import DataStore
+from mm.sampling import compile_aggregate
+from mm.sensor import SensorStoreSettings
+
+
+@pytest.mark.parametrize("name, values, expected", [
+    ("min", [3.0, 1.0, 2.0], [1.0]),
+    ("max", [3.0, 1.0, 2.0], [3.0]),
+    ("avg", [1.0, 2.0, 6.0], [3.0]),
+    ("sum", [1.0, 2.0, 6.0], [9.0]),
+    ("p50", [float(i) for i in range(1, 101)], [50.0]),
+    ("p100", [5.0, 9.0, 7.0], [9.0]),
+    ("normalize", [10.0, 20.0, 15.0], [0.0, 1.0, 0.5]),
+    ("normalize", [4.0, 4.0], [0.0, 0.0]),
+])
+def test_aggregates(name, values, expected):
+    assert compile_aggregate(name)(values) == expected
+
+
+@pytest.mark.parametrize("name", ["min", "avg", "p95", "normalize"])
+def test_aggregates_of_nothing(name):
+    assert compile_aggregate(name)([]) == []
+
+
+def test_unknown_aggregate():
+    with pytest.raises(ValueError):
+        compile_aggregate("median")
+
+
+@pytest.fixture
+def store():
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=100))
+    data_store.alias("alias", "x")
+    for i in range(10):
+        data_store.store("x", (i, i * 2))
+    return data_store
+
+
+def test_query_selectors(store):
+    assert store.query("x", window=3) == [(7, 14), (8, 16), (9, 18)]
+    assert store.query("x", window=4, field="[0]") == [6, 7, 8, 9]
+    assert store.query("x", window=5, field="[1]", aggregate="avg") == [14.0]
+    assert store.query("x", field="[0]", aggregate="normalize")[-1] == 1.0
+    assert store.query("missing") == []
+
+
+def test_query_is_memoized_per_version(store):
+    first = store.query("x", window=5, field="[1]", aggregate="max")
+    # 别名与identifier共享缓存
+    assert store.query("alias", window=5, field="[1]", aggregate="max") is first
+    store.store("x", (100, 200))
+    second = store.query("x", window=5, field="[1]", aggregate="max")
+    assert second == [200] and second is not first
+
+
+def test_span_result_expires_without_new_samples():
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=10))
+    data_store.store("x", 1.0)
+    assert data_store.query("x", span=0.05, aggregate="sum") == [1.0]
+    time.sleep(0.1)
+    assert data_store.query("x", span=0.05, aggregate="sum") == []
+
+
+def test_query_cache_is_bounded(store, monkeypatch):
+    monkeypatch.setattr(DataStore, "QUERY_CACHE_SIZE", 8)
+    for window in range(1, 50):
+        store.query("x", window=window, field="[0]", aggregate="avg")
+    assert len(store.query_cache) == 8
+    # 最近使用的请求保留在缓存中
+    assert ("x", 49, None, "[0]", "avg") in store.query_cache
+    assert math.isclose(store.query("x", window=2, field="[0]", aggregate="avg")[0], 8.5)
+
+
+@pytest.mark.parametrize("span", [None, 60.0])
+def test_zero_window_is_empty_with_or_without_span(store, span):
+    assert store.query("x", window=0, span=span) == []
+    assert store.query("x", window=2, span=span) == [(8, 16), (9, 18)]
@@ -0,0 +1,74 @@
+from mm.sampling import AdaptiveInterval, BurstAggregator
+from mm.sensor import SensorAdaptiveSettings, SensorBurstSettings
+
+
+def test_adaptive_interval_backs_off_when_stable():
+    adaptive = AdaptiveInterval(1000, SensorAdaptiveSettings(max_interval=5000, tolerance=0.5, factor=2))
+    # 第一个sample作为参考值
+    assert [adaptive.next_interval(value) for value in [10, 10.2, 9.6, 10.5, 10, 10]] == \
+        [1000, 2000, 4000, 5000, 5000, 5000]
+
+
+def test_adaptive_interval_resets_on_change():
+    adaptive = AdaptiveInterval(1000, SensorAdaptiveSettings(max_interval=5000, tolerance=0.5, factor=2))
+    assert [adaptive.next_interval(value) for value in [10, 10, 10, 20, 20.4, 10.4]] == \
+        [1000, 2000, 4000, 1000, 2000, 1000]
+
+
+def test_adaptive_interval_tuple_sample():
+    adaptive = AdaptiveInterval(100, SensorAdaptiveSettings(max_interval=1000, tolerance=1, factor=3))
+    # 任意一个字段超出容差带都视为变化
+    samples = [(1, 100), (1, 101), (2, 100), (5, 100), (5, 100)]
+    assert [adaptive.next_interval(sample) for sample in samples] == [100, 300, 900, 100, 300]
+
+
+def test_adaptive_interval_non_numeric():
+    adaptive = AdaptiveInterval(100, SensorAdaptiveSettings(max_interval=1000))
+    # 无法比较的sample总是使用基础间隔
+    assert [adaptive.next_interval(sample) for sample in ["a", "a", None, None]] == [100] * 4
+    # 上限不低于基础间隔
+    assert AdaptiveInterval(2000, SensorAdaptiveSettings(max_interval=1000)).max_interval == 2000
+
+
+def burst_of(samples, stats, interval=1000, burst_interval=100):
+    burst = BurstAggregator(interval, SensorBurstSettings(interval=burst_interval, stats=stats))
+    for sample in samples:
+        burst.add(sample)
+    return burst
+
+
+def test_burst_scalar():
+    burst = burst_of([float(i) for i in range(1, 11)], ["min", "avg", "max", "p90"])
+    assert burst.result() == (1.0, 5.5, 10.0, 9.0)
+    # 只有一个统计量时格式与原sample相同
+    assert burst_of([3, 1, 2], ["max"]).result() == 3.0
+
+
+def test_burst_tuple():
+    burst = burst_of([(1, 10), (3, 30), (2, 20)], ["min", "max"])
+    assert burst.result() == ((1.0, 3.0), (10.0, 30.0))
+    assert burst_of([(1, 10), (3, 30)], ["avg"]).result() == (2.0, 20.0)
+
+
+def test_burst_reset_and_empty():
+    burst = burst_of([5, 7], ["avg"])
+    burst.reset()
+    assert burst.result() is None
+    # 缓冲区被复用，重置后只统计新的读数
+    burst.add(1)
+    assert burst.result() == 1.0
+    # 非数值的读数被忽略
+    burst.add("x")
+    assert burst.result() == 1.0
+
+
+def test_burst_grows_beyond_capacity():
+    burst = burst_of(list(range(100)), ["min", "max"], interval=1000, burst_interval=100)
+    assert burst.capacity >= 100
+    assert burst.result() == (0.0, 99.0)
+
+
+def test_burst_format_change_drops_readings():
+    burst = burst_of([100, 200], ["max"])
+    burst.add((1, 2))
+    assert burst.result() == (1.0, 2.0)
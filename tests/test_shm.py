@@ -0,0 +1,151 @@
+import subprocess
+import sys
+import threading
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+
+from mm.shm import SharedMemoryWriter, SharedMemoryReader, UNIT_HEADER, HEADER, _U64
+
+
+@pytest.fixture
+def shm(monkeypatch):
+    # 读写双方在同一进程时，由写入方负责resource_tracker的登记
+    monkeypatch.setattr("mm.shm._untrack", lambda shm: None)
+    name = f"mm-test-{uuid.uuid4().hex[:8]}"
+    writer = SharedMemoryWriter(name, size=2 ** 20, max_sensors=8, max_samples=64)
+    reader = SharedMemoryReader(name)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_round_trip(shm):
+    writer, reader = shm
+    writer.register("cpu", 10)
+    writer.register("net", 10)
+    writer.write("cpu", 12.5, timestamp=1.0)
+    writer.write("net", (100, 200), timestamp=2.0)
+    writer.write("net", {"b": 2, "a": 1}, timestamp=3.0)
+    assert reader.sensors() == ["cpu", "net"]
+    assert reader.latest("cpu") == (1.0, (12.5,))
+    assert reader.window("net", 5) == [(2.0, (100.0, 200.0)), (3.0, (1.0, 2.0))]
+
+
+def test_ring_keeps_latest_capacity(shm):
+    writer, reader = shm
+    writer.register("x", 4)
+    for i in range(10):
+        writer.write("x", float(i), timestamp=float(i))
+    assert [v[0] for _, v in reader.window("x", 100)] == [6.0, 7.0, 8.0, 9.0]
+    assert reader.latest("x") == (9.0, (9.0,))
+
+
+def test_unshareable_samples_are_skipped(shm):
+    writer, reader = shm
+    writer.write("text", "hello")
+    writer.write("x", (1, 2), timestamp=1.0)
+    # 宽度变化的sample被忽略
+    writer.write("x", (1, 2, 3), timestamp=2.0)
+    assert "text" not in reader.sensors()
+    assert reader.window("x", 10) == [(1.0, (1.0, 2.0))]
+    with pytest.raises(KeyError):
+        reader.latest("missing")
+
+
+def test_empty_window(shm):
+    writer, reader = shm
+    writer.write("x", 1.0)
+    assert reader.window("x", 0) == []
+
+
+def test_reader_retries_while_write_in_progress(shm):
+    writer, reader = shm
+    writer.write("x", 1.0, timestamp=1.0)
+    offset = reader._read_directory()["x"][0]
+    seq, _ = UNIT_HEADER.unpack_from(reader.buf, offset)
+    # 模拟写入中(seq为奇数)
+    _U64.pack_into(reader.buf, offset, seq + 1)
+    reader.MAX_RETRY = 10
+    with pytest.raises(TimeoutError):
+        reader.latest("x")
+    _U64.pack_into(reader.buf, offset, seq)
+    assert reader.latest("x") == (1.0, (1.0,))
+
+
+def test_concurrent_reads_are_consistent(shm):
+    writer, reader = shm
+    writer.register("x", 16)
+    writer.write("x", (0.0, 0.0, 0.0), timestamp=0.0)
+    stop = threading.Event()
+
+    def write():
+        i = 1
+        while not stop.is_set():
+            writer.write("x", (float(i),) * 3, timestamp=float(i))
+            i += 1
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        for _ in range(2000):
+            for timestamp, values in reader.window("x", 16):
+                # 同一条记录的所有字段来自同一次写入
+                assert values == (timestamp,) * 3
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_write_after_close_is_ignored(shm):
+    writer, reader = shm
+    writer.write("x", 1.0)
+    writer.close()
+    writer.write("x", 2.0)
+    writer.write("y", 3.0)
+
+
+def test_live_segment_is_not_reclaimed(shm):
+    writer, reader = shm
+    writer.write("x", 1.0, timestamp=1.0)
+    with pytest.raises(FileExistsError, match="in use"):
+        SharedMemoryWriter(writer.name, size=2 ** 16)
+    assert reader.latest("x") == (1.0, (1.0,))
+
+
+def test_foreign_segment_is_not_reclaimed(monkeypatch):
+    monkeypatch.setattr("mm.shm._untrack", lambda shm: None)
+    name = f"mm-test-{uuid.uuid4().hex[:8]}"
+    foreign = shared_memory.SharedMemory(name=name, create=True, size=4096)
+    try:
+        foreign.buf[:8] = b"NOTMMSHM"
+        with pytest.raises(FileExistsError, match="another program"):
+            SharedMemoryWriter(name, size=2 ** 16)
+        assert bytes(foreign.buf[:8]) == b"NOTMMSHM"
+    finally:
+        foreign.close()
+        foreign.unlink()
+
+
+def test_stale_segment_is_reclaimed(monkeypatch):
+    monkeypatch.setattr("mm.shm._untrack", lambda shm: None)
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    name = f"mm-test-{uuid.uuid4().hex[:8]}"
+    stale = SharedMemoryWriter(name, size=2 ** 16)
+    stale.write("old", 1.0)
+    # 模拟写入进程异常退出：pid改为已退出的进程，不删除共享内存
+    fields = list(HEADER.unpack_from(stale.buf, 0))
+    fields[-1] = exited.pid
+    HEADER.pack_into(stale.buf, 0, *fields)
+    stale.buf = None
+    stale.shm.close()
+
+    writer = SharedMemoryWriter(name, size=2 ** 16)
+    reader = SharedMemoryReader(name)
+    try:
+        assert reader.sensors() == []
+    finally:
+        reader.close()
+        writer.close()
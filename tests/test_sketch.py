@@ -0,0 +1,91 @@
+import math
+import random
+
+import pytest
+
+from mm.sketch import DDSketch, RollingSketch
+
+
+def _exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.mark.parametrize("values", [
+    [random.Random(0).lognormvariate(0, 2) for _ in range(10000)],
+    [random.Random(1).uniform(-1000, 1000) for _ in range(10000)],
+    [float(i) for i in range(1, 1001)],
+])
+def test_relative_accuracy(values):
+    sketch = DDSketch(relative_accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+    qs = [0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 1.0]
+    for q, estimate in zip(qs, sketch.quantiles(qs)):
+        exact = _exact(values, q)
+        assert abs(estimate - exact) <= 0.01 * abs(exact) + 1e-9
+
+
+def test_empty_and_single():
+    sketch = DDSketch()
+    assert sketch.quantiles([0.5, 0.99]) == [None, None]
+    sketch.add(42.0)
+    assert sketch.quantile(0.0) == sketch.quantile(1.0) == 42.0
+
+
+def test_zero_and_tiny_values():
+    sketch = DDSketch()
+    for v in [0.0, 1e-12, -1e-12, 0.0, 5.0]:
+        sketch.add(v)
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == 5.0
+
+
+def test_merge_equals_single_sketch():
+    rng = random.Random(2)
+    values = [rng.expovariate(0.1) for _ in range(5000)]
+    whole, left, right = DDSketch(), DDSketch(), DDSketch()
+    for i, v in enumerate(values):
+        whole.add(v)
+        (left if i % 2 else right).add(v)
+    left.merge(right)
+    qs = [0.1, 0.5, 0.99]
+    assert left.quantiles(qs) == whole.quantiles(qs)
+    assert left.count == whole.count
+
+
+def test_max_bins_bounds_memory_and_keeps_high_quantiles():
+    sketch = DDSketch(relative_accuracy=0.01, max_bins=64)
+    values = [10 ** (i / 100) for i in range(1000)]
+    for v in values:
+        sketch.add(v)
+    assert sketch.bins <= 64
+    assert math.isclose(sketch.quantile(0.99), _exact(values, 0.99), rel_tol=0.01)
+
+
+def test_rolling_window_discards_old_buckets():
+    sketch = RollingSketch(window=10, buckets=10)
+    for t in range(10):
+        sketch.add(1000.0, t)
+    for t in range(10, 20):
+        sketch.add(1.0, t + 0.5)
+    # 时间窗口内只剩下后一半的数据
+    assert sketch.quantiles([1.0], now=19.5) == [1.0]
+    assert sketch.quantiles([0.5], now=15.5, span=3) == [1.0]
+
+
+def test_rolling_span_includes_current_bucket():
+    sketch = RollingSketch(window=60, buckets=6)
+    sketch.add(5.0, 0.0)
+    sketch.add(7.0, 1.0)
+    assert sketch.quantiles([0.0, 1.0], now=1.0) == pytest.approx([5.0, 7.0], rel=0.01)
+    assert sketch.quantiles([0.5], now=200.0) == [None]
+
+
+@pytest.mark.parametrize("name, q", [
+    ("p0", 0.0), ("p5", 0.05), ("p50", 0.5), ("p99", 0.99), ("p999", 0.999), ("p100", 1.0),
+    ("value", None), ("p", None), ("pxx", None), (None, None),
+])
+def test_quantile_format_fields(name, q):
+    from mm.indicator.simple import parse_quantile_field
+    assert parse_quantile_field(name) == q
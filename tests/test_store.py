@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from mm.data import CompressedStoreUnit, DataStore, StoreUnit
+from mm.sensor import SensorStoreSettings
+
+
+def test_since_returns_only_new_samples():
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=5))
+    assert data_store.get_since("x", 0) == (0, [])
+    for i in range(3):
+        data_store.store("x", i)
+    seq, samples = data_store.get_since("x", 0)
+    assert (seq, samples) == (3, [0, 1, 2])
+    data_store.store("x", 3)
+    assert data_store.get_since("x", seq) == (4, [3])
+    assert data_store.get_since("x", 4) == (4, [])
+
+
+def test_since_after_wraparound():
+    unit = StoreUnit(SensorStoreSettings(length=4))
+    for i in range(10):
+        unit.store(i)
+    assert unit.snapshot() == (10, [6, 7, 8, 9])
+    assert unit.snapshot(2) == (10, [8, 9])
+    assert unit.since(8) == (10, [8, 9])
+    # seq过旧时返回缓冲区内全部sample
+    assert unit.since(1) == (10, [6, 7, 8, 9])
+
+
+def test_snapshot_is_a_copy():
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=4))
+    data_store.store("x", 1)
+    data_store.get_sequence("x").append(2)
+    assert data_store.get_sequence("x") == [1]
+
+
+def test_concurrent_store_and_read():
+    unit = StoreUnit(SensorStoreSettings(length=64))
+    total = 20000
+    errors = []
+
+    def reader():
+        seq = 0
+        while seq < total:
+            new_seq, samples = unit.since(seq)
+            # 读到的sample总是连续的，且最后一个对应最新序号
+            if samples and (samples[-1] != new_seq or samples != list(range(new_seq - len(samples) + 1, new_seq + 1))):
+                errors.append((seq, new_seq, samples))
+                return
+            seq = new_seq
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for i in range(1, total + 1):
+        unit.store(i)
+    thread.join(10)
+    assert not thread.is_alive()
+    assert errors == []
+
+
+def test_unknown_sensor():
+    data_store = DataStore()
+    assert data_store.get_since("missing", 0) == (0, [])
+    assert data_store.get_version("missing") == 0
+
+
+def make_unit(compressed, length=8):
+    if compressed:
+        return CompressedStoreUnit(SensorStoreSettings(length=length, compression=True, block_size=4))
+    return StoreUnit(SensorStoreSettings(length=length))
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_range_boundaries(compressed):
+    unit = make_unit(compressed)
+    assert unit.range(0.0) == []
+    # 时间戳10.0 ~ 16.0，每秒一个
+    for i in range(7):
+        unit.store(i, 10.0 + i)
+    # 两端都包含
+    assert unit.range(11.0, 13.0) == [(11.0, 1), (12.0, 2), (13.0, 3)]
+    assert unit.range(11.5, 12.5) == [(12.0, 2)]
+    assert unit.range(16.0) == [(16.0, 6)]
+    assert unit.range(0.0, 9.9) == []
+    assert unit.range(16.1) == []
+    assert unit.range(13.0, 12.0) == []
+    assert [sample for _, sample in unit.range(0.0)] == list(range(7))
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_at_boundaries(compressed):
+    unit = make_unit(compressed)
+    assert unit.at(100.0) is None
+    for i in range(7):
+        unit.store(i, 10.0 + i)
+    assert unit.at(9.9) is None
+    assert unit.at(10.0) == (10.0, 0)
+    assert unit.at(12.5) == (12.0, 2)
+    assert unit.at(14.0) == (14.0, 4)
+    assert unit.at(100.0) == (16.0, 6)
+
+
+def test_range_after_wraparound():
+    unit = make_unit(False, length=4)
+    for i in range(10):
+        unit.store(i, float(i))
+    # 被淘汰的sample不再返回
+    assert unit.range(0.0, 7.0) == [(6.0, 6), (7.0, 7)]
+    assert unit.at(5.0) is None
+    assert unit.at(6.0) == (6.0, 6)
+
+
+def test_compressed_range_skips_expired_samples():
+    unit = make_unit(True, length=8)
+    for i in range(20):
+        unit.store(i, float(i))
+    # 淘汰以数据块为单位，但读取结果不超过保留长度
+    assert [sample for _, sample in unit.range(0.0)] == list(range(12, 20))
+    assert unit.at(11.0) is None
+
+
+def test_data_store_range_and_at():
+    data_store = DataStore()
+    data_store.register("x", SensorStoreSettings(length=10))
+    data_store.alias("alias", "x")
+    now = time.monotonic()
+    for i, age in enumerate([30, 20, 10, 0]):
+        data_store.store("x", i, now - age)
+    assert [sample for _, sample in data_store.get_range("alias", 15)] == [2, 3]
+    assert [sample for _, sample in data_store.get_range("x", 25, now - 5)] == [1, 2]
+    assert data_store.get_at("alias", now - 15) == (now - 20, 1)
+    assert data_store.get_range("missing", 10) == []
+    assert data_store.get_at("missing", now) is None
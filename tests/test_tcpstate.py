@@ -0,0 +1,81 @@
+import pytest
+
+from mm.sensor.procfs import ProcNetTcp
+from mm.sensor.simple import TcpStateSensor
+
+TCP = b"""\
+  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 0100007F:0CEA 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 100 1 0000000000000000 100 0 0 10 0
+   1: 00000000:0016 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 101 1 0000000000000000 100 0 0 10 0
+   2: 0100007F:0CEA 0100007F:D2F0 01 00000000:00000000 00:00000000 00000000     0        0 102 2 0000000000000000 20 4 18 18 -1
+   3: 0100007F:D2F0 0100007F:0CEA 01 00000000:00000000 00:00000000 00000000     0        0 103 2 0000000000000000 20 4 18 18 -1
+  10: 0100007F:0CEA 0100007F:D2F2 06 00000000:00000000 03:00000F2A 00000000     0        0 0 3 0000000000000000
+"""
+
+TCP6 = b"""\
+  sl  local_address                         remote_address                        st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 00000000000000000000000000000000:0016 00000000000000000000000000000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 200 1 0000000000000000 100 0 0 10 0
+   1: 0000000000000000FFFF00000100007F:0CEA 0000000000000000FFFF00000100007F:D2F4 01 00000000:00000000 00:00000000 00000000     0        0 201 2 0000000000000000 20 4 18 18 -1
+"""
+
+
+@pytest.fixture
+def proc_net_tcp(tmp_path, monkeypatch):
+    tcp, tcp6 = tmp_path / "tcp", tmp_path / "tcp6"
+    tcp.write_bytes(TCP)
+    tcp6.write_bytes(TCP6)
+    monkeypatch.setattr(ProcNetTcp, "PATH6", str(tcp6))
+
+    def factory(**kwargs):
+        return ProcNetTcp(str(tcp), **kwargs)
+
+    return factory
+
+
+@pytest.mark.parametrize("buffer_size", [64, 256 * 1024])
+def test_counts(proc_net_tcp, buffer_size):
+    # 小缓冲区时行被切分到多个块中
+    proc = proc_net_tcp(buffer_size=buffer_size)
+    try:
+        assert proc.counts() == {b"0A": 3, b"01": 3, b"06": 1}
+        assert proc.counts(by_port=True) == {
+            (b"0CEA", b"0A"): 1, (b"0016", b"0A"): 2, (b"0CEA", b"01"): 2, (b"D2F0", b"01"): 1, (b"0CEA", b"06"): 1,
+        }
+        # 重复读取从头开始
+        assert sum(proc.counts().values()) == 7
+    finally:
+        proc.close()
+
+
+def test_counts_without_ipv6(proc_net_tcp):
+    proc = proc_net_tcp(ipv6=False)
+    try:
+        assert proc.counts() == {b"0A": 2, b"01": 2, b"06": 1}
+    finally:
+        proc.close()
+
+
+def test_stream_yields_complete_lines(proc_net_tcp):
+    proc = proc_net_tcp(buffer_size=64)
+    try:
+        chunks = list(proc.stream(proc.fd))
+    finally:
+        proc.close()
+    assert b"".join(chunks) == TCP
+    assert all(chunks)
+    assert all(chunk.startswith(b"\n") for chunk in chunks[1:])
+
+
+def test_sensor(proc_net_tcp):
+    sensor = TcpStateSensor(local_ports=[3306, 22], backend="psutil")
+    sensor.procfs = proc_net_tcp()
+    try:
+        states = sensor.sync_collect()
+        assert (states["LISTEN"], states["ESTABLISHED"], states["TIME_WAIT"]) == (3, 2, 1)
+        sensor.by_port = True
+        ports = sensor.sync_collect()
+        assert set(ports) == {3306, 22}
+        assert (ports[3306]["LISTEN"], ports[3306]["ESTABLISHED"], ports[3306]["TIME_WAIT"]) == (1, 2, 1)
+        assert ports[22]["LISTEN"] == 2
+    finally:
+        sensor.procfs.close()